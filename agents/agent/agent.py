@@ -1,11 +1,34 @@
-from google.adk.agents import SequentialAgent
+from google.adk.agents import SequentialAgent, ParallelAgent
 from agent.agents.bridgeoutput_agent.agent import root_agent as bridgeoutput_agent
 from agent.agents.google_search_agent.agent import root_agent as google_search_agent
 from agent.agents.gmaps_agent.agent import root_agent as gmaps_agent
 from agent.agents.report_writer_agent.agent import root_agent as report_writer_agent
+from agent import mcp_pool
+
+# Dependency graph of the pipeline:
+#
+#   gmaps ──> bridgeoutput ──┐
+#                            ├──> report_writer
+#   google_search ───────────┘
+#
+# The web search only needs the address as given, so it runs alongside the
+# Maps normalization and MLS work; the report waits for both branches.
+mls_pipeline_agent = SequentialAgent(
+    name="mls_pipeline",
+    description="Normalizes the address, then finds the base property and its comparables in the MLS",
+    sub_agents=[gmaps_agent, bridgeoutput_agent],
+)
+
+research_agent = ParallelAgent(
+    name="property_research",
+    description="Runs the MLS pipeline and the web search concurrently",
+    sub_agents=[mls_pipeline_agent, google_search_agent],
+)
 
 root_agent = SequentialAgent(
     name="real_estate_agent_comparables",
     description="A real estate agent who can find comparables for a base property",
-    sub_agents=[gmaps_agent, google_search_agent, bridgeoutput_agent, report_writer_agent],
-)
\ No newline at end of file
+    sub_agents=[research_agent, report_writer_agent],
+    # Spawns the shared MCP servers once, before the first sub-agent needs them
+    before_agent_callback=mcp_pool.before_agent_callback,
+)
@@ -2,8 +2,8 @@
 import logging
 import os
 from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
 from google.adk.tools import google_search
+from google.adk.tools.tool_context import ToolContext
 google_maps_api_key = os.environ.get("GOOGLE_MAPS_API_KEY")
 
 # Retrieve the API key from an environment variable or directly insert it.
@@ -26,32 +26,45 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.adk.tools import google_search
 from google.genai import types
-from typing import Optional, Literal, List
-from enum import Enum
+from typing import Optional, Literal, List, Dict
+from functools import partial
 
 from dotenv import load_dotenv
 import os
-from agent.agents.bridgeoutput_agent.bridge_api.client import BridgeAPIClient
-from agent.agents.bridgeoutput_agent.bridge_api import data 
+from agent.agents.bridgeoutput_agent.bridge_api.client import BridgeAPIClient, get_shared_client
+from agent.agents.bridgeoutput_agent.bridge_api.query import build_listing_query, InvalidQuery
+from agent.agents.bridgeoutput_agent.bridge_api.profiles import ProfileName
+from agent.agents.gmaps_agent import geocode_cache
+from agent import mcp_pool
+from agent import compaction
+from agent import state_refs
+from agent.agents.bridgeoutput_agent.bridge_api.models import compact_listing, compact_listing_entries, compact_records
+from agent.agents.bridgeoutput_agent.bridge_api.compact import compact_value
+from agent.agents.bridgeoutput_agent.bridge_api.comparables import find_comparables as rank_comparables
 logger = logging.getLogger(__name__)
 
-class PropertyType(str, Enum):
-    RESIDENTIAL = "Residential"
-    COMMERCIAL = "Commercial"
 
+def get_bridge_client() -> BridgeAPIClient:
+    """Return the pooled Bridge client shared by every tool invocation in this process"""
+    return get_shared_client(api_key=bridge_output_data_api_key, dataset_id=bridge_dataset_id)
 
-async def mls_listing(listing_id: str) -> str:
+async def mls_listing(listing_id: str, profile: Optional[ProfileName] = None) -> str:
     """Return the listing details for a given ListingId; 
     
-    This includes property information, photos, broker contact details, on market date, off market date, asking price, closing price, and more.
+    This includes property information, broker contact details, on market date, off market date, asking price, closing price, and more.
+    Photos and virtual tours are only returned with the "media" profile. Pass a profile to get only the fields you need.
+
+    Args:
+        listing_id: The MLS listing ID
+        profile: Optional named field set instead of the full listing: "summary" (status, prices, address, main features, remarks, days on market), "comparable" (comparable scoring fields), "valuation" (price history, dates, taxes, HOA), "media" (photos and virtual tours) or "agent-contact" (listing/buyer agent and office)
     """
-    logger.debug(f"Fetching MLS listing with ID: {listing_id}")
-    api_key, dataset_id = get_bridge_api_credentials()
-    client = BridgeAPIClient(api_key=api_key, dataset_id=dataset_id)
+    logger.debug(f"Fetching MLS listing with ID: {listing_id} (profile={profile})")
+    client = get_bridge_client()
     try:
-        listing_data = await client.get_listing(listing_id)
+        # The full record's Media arrays are skipped while streaming; the "media" profile selects them
+        listing_data = await client.get_listing(listing_id, profile=profile, skip_fields=None if profile else ["Media"])
         logger.debug(f"Successfully retrieved listing data for ID {listing_id}")
-        return listing_data
+        return compact_listing(listing_data)
     except Exception as e:
         logger.error(f"Error fetching listing {listing_id}: {str(e)}")
         # Try to return response body if available
@@ -63,6 +76,24 @@ async def mls_listing(listing_id: str) -> str:
         return f"Error fetching listing: {str(e)}"
 
 
+async def mls_listings(listing_ids: List[str], profile: Optional[ProfileName] = None) -> list:
+    """Return the listing details for several ListingIds in a single call; use it to hydrate every comparable at once.
+
+    Each result contains the ListingId and either the listing (main features, remarks, prices, dates, agent contact) or an error.
+
+    Args:
+        listing_ids: The MLS listing IDs
+        profile: Optional named field set instead of the full listing: "summary" (status, prices, address, main features, remarks, days on market), "comparable" (comparable scoring fields), "valuation" (price history, dates, taxes, HOA), "media" (photos and virtual tours) or "agent-contact" (listing/buyer agent and office)
+    """
+    logger.debug(f"Fetching MLS listings with IDs: {listing_ids}")
+    client = get_bridge_client()
+    try:
+        return compact_listing_entries(await client.get_listings(listing_ids, profile=profile))
+    except Exception as e:
+        logger.error(f"Error fetching listings {listing_ids}: {str(e)}")
+        return f"Error fetching listings: {str(e)}"
+
+
 
 async def search_listings(
     query: str = "",
@@ -135,6 +166,7 @@ async def search_listings(
         "Longitude",
         "SubdivisionName"
     ],
+    profile: Optional[ProfileName] = None,
     StreetName: Optional[str] = None,
     StreetSuffix: Optional[str] = None,
     StreetNumber: Optional[str] = None,
@@ -172,12 +204,13 @@ async def search_listings(
         zipcode: ZIP/Postal code
         latitude: Center point latitude for geo search
         longitude: Center point longitude for geo search
-        distance_miles: Maximum distance in miles from center point
+        distance_miles: Maximum distance in miles from center point; results are limited to this exact radius, sorted nearest first and include distance_km
         mls_status: Filter by MLS status ("Active" or "Closed", defaults to "Active")
         order_by: Field to sort by (e.g., "ListPrice desc", "ListPrice asc", "BedroomsTotal desc")
-        limit: Maximum number of results to return (default: 2)
+        limit: Maximum number of results to return (default: 2); all pages up to this many records are fetched in a single call, so request as many as needed at once (max 2000)
         skip: Number of results to skip for pagination (default: 0)
         fields: Optional list of specific fields to return (defaults to main features)
+        profile: Optional named field set to return instead of fields: "summary" (status, prices, address, main features, remarks, days on market), "comparable" (comparable scoring fields), "valuation" (price history, dates, taxes, HOA), "media" (photos and virtual tours) or "agent-contact" (listing/buyer agent and office)
         StreetName: Optional Street Name
         StreetSuffix: Optional Street Suffix
         StreetNumber: Optional Street Number
@@ -195,95 +228,71 @@ async def search_listings(
         f"status={mls_status}, limit={limit}, skip={skip}, "
         f"StreetName={StreetName}, StreetSuffix={StreetSuffix}, StreetNumber={StreetNumber}, SubdivisionName={SubdivisionName}, ParcelNumber={ParcelNumber}"
     )
-    client = BridgeAPIClient(api_key=bridge_output_data_api_key, dataset_id=bridge_dataset_id)
-    
-    # Build OData filter query
-    filters = []
-    
-    if min_price is not None:
-        filters.append(f"ListPrice ge {min_price}")
-    if max_price is not None:
-        filters.append(f"ListPrice le {max_price}")
-    if beds is not None:
-        filters.append(f"BedroomsTotal eq {beds}")
-    if beds_min is not None:
-        filters.append(f"BedroomsTotal ge {beds_min}")
-    if beds_max is not None:
-        filters.append(f"BedroomsTotal le {beds_max}")
-    if baths is not None:
-        filters.append(f"BathroomsTotalDecimal eq {baths}")
-    if baths_min is not None:
-        filters.append(f"BathroomsTotalDecimal ge {baths_min}")
-    if baths_max is not None:
-        filters.append(f"BathroomsTotalDecimal le {baths_max}")
-    if LivingArea_min is not None:
-        filters.append(f"LivingArea ge {LivingArea_min}")
-    if LivingArea_max is not None:
-        filters.append(f"LivingArea le {LivingArea_max}")
-    if LotSizeSquareFeet_min is not None:
-        filters.append(f"LotSizeSquareFeet ge {LotSizeSquareFeet_min}")
-    if LotSizeSquareFeet_max is not None:
-        filters.append(f"LotSizeSquareFeet le {LotSizeSquareFeet_max}")
-    if on_market_date_from is not None:
-        filters.append(f"OnMarketDate ge {on_market_date_from}")
-    if on_market_date_to is not None:
-        filters.append(f"OnMarketDate le {on_market_date_to}")
-    if off_market_date_from is not None:
-        filters.append(f"OffMarketDate ge {off_market_date_from}")
-    if off_market_date_to is not None:
-        filters.append(f"OffMarketDate le {off_market_date_to}")
-    if property_type is not None:
-        if property_type not in [pt.value for pt in PropertyType]:
-            raise ValueError(f'property_type must be one of: {", ".join(pt.value for pt in PropertyType)}')
-        filters.append(f"PropertyType eq '{property_type}'")
-    if city is not None:
-        filters.append(f"City eq '{city}'")
-    if zipcode is not None:
-        filters.append(f"PostalCode eq '{zipcode}'")
-    if mls_status is not None and mls_status != "Any":
-        if mls_status not in ["Active", "Closed"]:
-            raise ValueError('mls_status must be either "Active" or "Closed"')
-        filters.append(f"MlsStatus eq '{mls_status}'")
-    if YearBuilt_min is not None:
-        filters.append(f"YearBuilt ge {YearBuilt_min}")
-    if YearBuilt_max is not None:
-        filters.append(f"YearBuilt le {YearBuilt_max}")
-    if ListPrice_min is not None:
-        filters.append(f"ListPrice ge {ListPrice_min}")
-    if ListPrice_max is not None:
-        filters.append(f"ListPrice le {ListPrice_max}")
-    if StreetName is not None:
-        filters.append(f"tolower(StreetName) eq '{StreetName.lower()}'")
-    if StreetSuffix is not None:
-        filters.append(f"tolower(StreetSuffix) eq '{StreetSuffix.lower()}'")
-    if StreetNumber is not None:
-        filters.append(f"tolower(StreetNumber) eq '{StreetNumber.lower()}'")
-    if SubdivisionName is not None:
-        filters.append(f"contains(tolower(SubdivisionName), '{SubdivisionName.lower()}')")
-    if ParcelNumber is not None:
-        filters.append(f"ParcelNumber eq '{ParcelNumber}'")
-    
-    if query != "": 
-        query += " and "
-        
-    query += " and ".join(filters) if filters else " 1 eq 1"
+    client = get_bridge_client()
     
+    # Build a canonical OData filter; unknown fields are rejected before any request is sent
+    await client.ensure_schema()
+    try:
+        query = build_listing_query(
+            query,
+            min_price=min_price,
+            max_price=max_price,
+            beds=beds,
+            beds_min=beds_min,
+            beds_max=beds_max,
+            baths=baths,
+            baths_min=baths_min,
+            baths_max=baths_max,
+            LivingArea_min=LivingArea_min,
+            LivingArea_max=LivingArea_max,
+            LotSizeSquareFeet_min=LotSizeSquareFeet_min,
+            LotSizeSquareFeet_max=LotSizeSquareFeet_max,
+            on_market_date_from=on_market_date_from,
+            on_market_date_to=on_market_date_to,
+            off_market_date_from=off_market_date_from,
+            off_market_date_to=off_market_date_to,
+            property_type=property_type,
+            city=city,
+            zipcode=zipcode,
+            mls_status=mls_status,
+            YearBuilt_min=YearBuilt_min,
+            YearBuilt_max=YearBuilt_max,
+            ListPrice_min=ListPrice_min,
+            ListPrice_max=ListPrice_max,
+            StreetName=StreetName,
+            StreetSuffix=StreetSuffix,
+            StreetNumber=StreetNumber,
+            SubdivisionName=SubdivisionName,
+            ParcelNumber=ParcelNumber
+        ).to_odata()
+    except InvalidQuery as e:
+        logger.error(f"Invalid search query: {str(e)}")
+        return f"Invalid search query: {str(e)}"
+
     logger.debug(f"Generated OData query: {query}")
     
     try:
-        results = await client.search_listings(
-            query,
-            latitude=latitude,
-            longitude=longitude,
-            distance_miles=distance_miles,
-            order_by=order_by,
-            top=limit,
-            skip=skip,
-            select_fields=fields
-        )
-        logger.debug(f"Search returned {len(results['value'])} results")
+        # Pages are fetched (and prefetched) automatically up to `limit` records; pages with
+        # Media (the "media" profile) are decoded incrementally instead of buffered whole
+        search = partial(client.search_listings_stream, skip_fields=None) if profile == "media" else client.search_listings_iter
+        results = [
+            record async for record in search(
+                query,
+                latitude=latitude,
+                longitude=longitude,
+                distance_miles=distance_miles,
+                order_by=order_by,
+                skip=skip,
+                select_fields=None if profile else fields,
+                profile=profile,
+                max_records=limit
+            )
+        ]
+        if latitude is not None and longitude is not None and distance_miles is not None:
+            results.sort(key=lambda record: record.get("distance_km", float("inf")))
+        logger.debug(f"Search returned {len(results)} results")
         logger.debug(f"Results: {results}")        
-        return results['value']
+        return compact_value(compact_records(results))
     except Exception as e:
         logger.error(f"Error searching listings: {str(e)}")
         # Try to return response body if available
@@ -295,7 +304,7 @@ async def search_listings(
         return f"Error searching listings: {str(e)}"
 
 
-def get_parcel_public_records(
+async def get_parcel_public_records(
     state: str,
     apn: str,
     zip_code: str,
@@ -329,13 +338,12 @@ def get_parcel_public_records(
     Returns:
         Dict containing the parcel's public records
     """    
-    api_key, dataset_id = get_bridge_api_credentials()
     if not apn:
         raise ValueError("APN (Assessor's Parcel Number) is required and cannot be blank")
-    client = BridgeAPIClient(api_key=api_key, dataset_id=dataset_id)
+    client = get_bridge_client()
     try:
-        records =  client.get_parcel_public_records(state, apn, zip_code)
-        records
+        records = await client.get_parcel_public_records(state, apn, zip_code)
+        return records
     except Exception as e:
         logger.error(f"Error fetching parcel public records: {str(e)}")
         # Try to return response body if available
@@ -347,6 +355,92 @@ def get_parcel_public_records(
         return f"Error fetching parcel public records: {str(e)}"
 
 
+async def get_parcels_public_records(parcels: List[Dict[str, str]]) -> list:
+    """Return the public records of several parcels in a single call; use it to look up the base property and its comparables at once.
+
+    Args:
+        parcels: List of {"state": ..., "apn": ..., "zip_code": ...} dicts
+    Returns:
+        One entry per parcel, in input order, with either the parcel's "records" or an "error"
+    """
+    logger.debug(f"Fetching parcel public records for: {parcels}")
+    client = get_bridge_client()
+    try:
+        return await client.get_parcels_public_records(parcels)
+    except Exception as e:
+        logger.error(f"Error fetching parcel public records: {str(e)}")
+        return f"Error fetching parcel public records: {str(e)}"
+
+
+async def find_comparables(
+    latitude: float,
+    longitude: float,
+    property_type: Optional[Literal["Residential", "Condo"]] = None,
+    SubdivisionName: Optional[str] = None,
+    LivingArea: Optional[float] = None,
+    LotSizeSquareFeet: Optional[float] = None,
+    YearBuilt: Optional[int] = None,
+    BedroomsTotal: Optional[int] = None,
+    BathroomsTotalDecimal: Optional[float] = None,
+    ListingId: Optional[str] = None,
+    ParcelNumber: Optional[str] = None,
+    k: int = 6,
+    radius_miles: float = 1.0,
+    tool_context: Optional[ToolContext] = None,
+) -> dict:
+    """
+    Find and rank the best comparables for a base property in a single call
+
+    Searches active listings and listings from the last year around the base property (widening the radius if needed),
+    scores every candidate on distance, subdivision, living area, lot size, year built, bedrooms and bathrooms,
+    and returns the top k with their score, distance_km and per-feature deltas against the base property.
+
+    Args:
+        latitude: Base property latitude
+        longitude: Base property longitude
+        property_type: Base property type ("Residential" or "Condo")
+        SubdivisionName: Base property subdivision name
+        LivingArea: Base property living area in square feet
+        LotSizeSquareFeet: Base property lot size in square feet
+        YearBuilt: Base property year built
+        BedroomsTotal: Base property bedrooms
+        BathroomsTotalDecimal: Base property bathrooms
+        ListingId: Base property listing ID, excluded from the results
+        ParcelNumber: Base property parcel number (APN), excluded from the results
+        k: Number of comparables to return (default: 6)
+        radius_miles: Initial search radius in miles (default: 1.0)
+    """
+    base = {
+        "Latitude": latitude,
+        "Longitude": longitude,
+        "PropertyType": property_type,
+        "SubdivisionName": SubdivisionName,
+        "LivingArea": LivingArea,
+        "LotSizeSquareFeet": LotSizeSquareFeet,
+        "YearBuilt": YearBuilt,
+        "BedroomsTotal": BedroomsTotal,
+        "BathroomsTotalDecimal": BathroomsTotalDecimal,
+        "ListingId": ListingId,
+        "ParcelNumber": ParcelNumber,
+    }
+    logger.debug(f"Finding comparables for: {base}")
+    client = get_bridge_client()
+    try:
+        result = await rank_comparables(client, base, k=k, radius_miles=radius_miles)
+    except Exception as e:
+        logger.error(f"Error finding comparables: {str(e)}")
+        return f"Error finding comparables: {str(e)}"
+    if tool_context is not None:
+        # Structured copy for the report renderer, which builds the report without the LLM;
+        # the invocation ID keeps a later run from reusing it
+        tool_context.state["comparables_data"] = {
+            "base": {key: value for key, value in base.items() if value is not None},
+            "invocation_id": tool_context.invocation_id,
+            **result,
+        }
+    return result
+
+
 
 root_agent = LlmAgent(
     model='gemini-2.0-flash',
@@ -372,7 +466,11 @@ Start by getting parcel information from the base property (from the county reco
 
 When filtering for subdivision names, make sure to use the important part in the name, not the whole text; for example, if the subdivision name is "WELLEBY UNIT 2", you should filter for "WELLEBY" not "WELLEBY UNIT 2".
 
-Also add asking price, days on market and the distance to the base property in km to each comparable.
+Also add asking price, days on market and the distance to the base property in km to each comparable; search_listings returns distance_km for every result when you search by latitude, longitude and distance_miles around the base property, so don't compute it yourself.
+
+When you need the details of several listings, fetch them all at once with mls_listings instead of calling mls_listing once per listing.
+Likewise, look up the public records of several parcels at once with get_parcels_public_records.
+Pass a profile ("summary", "comparable", "valuation", "media" or "agent-contact") to mls_listing, mls_listings and search_listings to fetch only the fields the current step needs.
 
 Listings include PublicRemarks describing the property; it might be interesting to extract the following information:
 
@@ -385,29 +483,27 @@ Listings include PublicRemarks describing the property; it might be interesting
 * rennovations notes
 * needs work
 
-Find at least 4 comparables; if you can't find 4, keep relaxing filters; prioritize the closest properties even if they're not the same size.
+Once you know the base property features and coordinates, call find_comparables once: it searches around the base property, widens the search when needed and returns the best comparables already ranked, with distance_km and the differences to the base property. Use search_listings only for extra lookups, such as previous listings of the base property.
+
+Find at least 4 comparables; prioritize the closest properties even if they're not the same size.
 
 """,
     tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command='npx',
-                args=[
-                    "-y",
-                    "@modelcontextprotocol/server-google-maps",
-                ],
-                # Pass the API key as an environment variable to the npx process
-                # This is how the MCP server for Google Maps expects the key.
-                env={
-                    "GOOGLE_MAPS_API_KEY": google_maps_api_key
-                }
-            ),
-            # You can filter for specific Maps tools if needed:
-            # tool_filter=['get_directions', 'find_place_by_id']
-        ),        
+        # Same Maps server process as the gmaps agent (see agent/mcp_pool.py)
+        mcp_pool.google_maps_toolset(google_maps_api_key),
         mls_listing,
+        mls_listings,
         get_parcel_public_records,
-        search_listings
+        get_parcels_public_records,
+        search_listings,
+        find_comparables
     ],
-    output_key="comparables"
+    output_key="comparables",
+    # Large outputs are kept out of session state; state only holds a handle and a summary
+    after_agent_callback=state_refs.offloading(None, "comparables", "comparables_data"),
+    # Geocoding goes through the same persistent cache as the gmaps agent
+    before_tool_callback=geocode_cache.before_tool_callback,
+    after_tool_callback=geocode_cache.after_tool_callback,
+    # Tool results are compacted to the prompt budget before every model call
+    before_model_callback=compaction.before_model_callback("mls"),
 )
\ No newline at end of file
@@ -1,5 +1,9 @@
 """Bridge API client package"""
 
-from .client import BridgeAPIClient
+from .client import BridgeAPIClient, get_shared_client, close_shared_clients
+from .cache import ResponseCache, get_default_cache
+from .replica import ListingStore
+from .query import ListingQuery, build_listing_query, InvalidQuery
+from .schema import SchemaRegistry, get_schema
 
-__all__ = ['BridgeAPIClient'] 
\ No newline at end of file
+__all__ = ['BridgeAPIClient', 'get_shared_client', 'close_shared_clients', 'ResponseCache', 'get_default_cache', 'ListingStore', 'ListingQuery', 'build_listing_query', 'InvalidQuery', 'SchemaRegistry', 'get_schema'] 
\ No newline at end of file
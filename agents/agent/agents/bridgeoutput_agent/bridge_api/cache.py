@@ -0,0 +1,233 @@
+"""Two-tier response cache for Bridge API queries.
+
+A small in-process LRU sits in front of a persistent SQLite store, so repeated
+searches are answered from memory within a process and from disk across
+restarts. Entries expire per endpoint: Active listings change often, Closed
+listings and parcel records hardly ever.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+logger = logging.getLogger("bridge_api.cache")
+
+# Time-to-live in seconds per endpoint kind
+DEFAULT_TTLS = {
+    "active": 15 * 60,
+    "listing": 60 * 60,
+    "closed": 24 * 60 * 60,
+    "parcel": 7 * 24 * 60 * 60,
+}
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "BRIDGE_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "bridge_api_cache.sqlite3")
+)
+DEFAULT_MAX_MEMORY_ENTRIES = int(os.environ.get("BRIDGE_CACHE_MAX_MEMORY_ENTRIES", "512"))
+DEFAULT_MAX_DISK_ENTRIES = int(os.environ.get("BRIDGE_CACHE_MAX_DISK_ENTRIES", "20000"))
+
+# Query parameters that never affect the response body
+_IGNORED_PARAMS = {"access_token"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: str) -> str:
+    return _WHITESPACE.sub(" ", value).strip()
+
+
+def canonical_key(dataset_id: str, resource: str, params: Dict[str, str]) -> Tuple:
+    """
+    Build the canonical (dataset, resource, filter, select, orderby, top, skip, other) tuple for a query
+
+    Whitespace is collapsed and the $select list is sorted, so equivalent
+    queries built in different ways share a single cache entry.
+    """
+    params = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+    select = params.pop("$select", None)
+    top = params.pop("$top", None)
+    skip = params.pop("$skip", None)
+    return (
+        dataset_id,
+        resource,
+        _normalize(params.pop("$filter", "")),
+        ",".join(sorted(f.strip() for f in select.split(","))) if select else None,
+        _normalize(params.pop("$orderby", "")) or None,
+        int(top) if top is not None else None,
+        int(skip) if skip else 0,
+        tuple(sorted((k, _normalize(v)) for k, v in params.items())),
+    )
+
+
+class ResponseCache:
+    """Memory LRU + SQLite cache for decoded JSON responses"""
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+        ttls: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            path: SQLite database file; None or "" keeps the cache in memory only
+            max_memory_entries: Maximum number of entries kept in the LRU tier
+            max_disk_entries: Maximum number of entries kept in the SQLite tier
+            ttls: Overrides for DEFAULT_TTLS
+        """
+        self.path = path or None
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        # Values are kept serialized so callers can never mutate a cached entry
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes_since_eviction = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def key_for_url(self, dataset_id: str, url: str) -> Tuple[str, float]:
+        """Return the (cache key, ttl) pair for a request URL"""
+        parts = urlsplit(url)
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        resource = parts.path.rsplit("/", 1)[-1] if "/OData/" in parts.path else parts.path
+        key = canonical_key(dataset_id, resource, params)
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+        return digest, self.ttl_for(resource, key[2])
+
+    def ttl_for(self, resource: str, odata_filter: str) -> float:
+        """Pick the TTL for an endpoint: parcels and Closed searches live long, Active ones short"""
+        if "parcels" in resource:
+            return self.ttls["parcel"]
+        if resource.startswith("Property("):
+            return self.ttls["listing"]
+        statuses = set(re.findall(r"MlsStatus eq '(\w+)'", odata_filter))
+        if statuses == {"Closed"}:
+            return self.ttls["closed"]
+        return self.ttls["active"]
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return json.loads(entry[1])
+                del self._memory[key]
+        if self.path:
+            row = await asyncio.to_thread(self._disk_get, key, now)
+            if row is not None:
+                expires_at, payload = row
+                self._memory_set(key, payload, expires_at)
+                self.stats["disk_hits"] += 1
+                return json.loads(payload)
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value in both tiers"""
+        expires_at = time.time() + ttl
+        payload = json.dumps(value)
+        self._memory_set(key, payload, expires_at)
+        self.stats["stores"] += 1
+        if self.path:
+            await asyncio.to_thread(self._disk_set, key, payload, expires_at)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self.path:
+                self._connection().execute("DELETE FROM responses")
+                self._connection().commit()
+
+    def _memory_set(self, key: str, payload: str, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, payload)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._db.commit()
+        return self._db
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        try:
+            with self._lock:
+                db = self._connection()
+                row = db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+                    return None
+                db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                db.commit()
+            return row[1], row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def _disk_set(self, key: str, payload: str, expires_at: float) -> None:
+        try:
+            with self._lock:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, time.time())
+                )
+                self._writes_since_eviction += 1
+                if self._writes_since_eviction >= 100:
+                    self._writes_since_eviction = 0
+                    self._evict(db)
+                db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Remove expired rows, then the least recently used ones beyond max_disk_entries"""
+        evicted = db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+        excess = db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            evicted += db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            ).rowcount
+        self.stats["evictions"] += evicted
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> ResponseCache:
+    """Return the process-wide response cache used by shared clients"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
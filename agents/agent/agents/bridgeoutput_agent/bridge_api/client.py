@@ -1,11 +1,47 @@
+import asyncio
+import json
 import logging
 import httpx
-from typing import Optional, Dict, Any, List
+from collections import deque
+from contextlib import aclosing
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator, Deque
 import os
+from urllib.parse import urlencode
 from dotenv import load_dotenv
+from .cache import ResponseCache, get_default_cache
+from .ratelimit import RetryPolicy, RETRY_STATUSES, get_rate_limiter, parse_retry_after
+from .replica import ListingStore, UnsupportedQuery
+from .geo import annotate_distance, bounding_box, within_radius
+from .stream import RecordStream
+from .profiles import profile_fields, resolve_select
+from .schema import get_schema, ensure_schema
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 support in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger("bridge_api.client")
 
+# Connection pool defaults; can be overridden per client or through the environment
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get("BRIDGE_HTTP_MAX_CONNECTIONS", "20"))
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("BRIDGE_HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+DEFAULT_KEEPALIVE_EXPIRY = float(os.environ.get("BRIDGE_HTTP_KEEPALIVE_EXPIRY", "120"))
+DEFAULT_TIMEOUT = float(os.environ.get("BRIDGE_HTTP_TIMEOUT", "30"))
+DEFAULT_HTTP2 = os.environ.get("BRIDGE_HTTP2", "1").lower() not in ("0", "false", "no")
+
+# Bridge caps $top at 200 records per request
+MAX_PAGE_SIZE = 200
+# Hard cap on records returned by search_listings_iter
+MAX_SEARCH_RECORDS = 2000
+# IDs per `ListingId eq ... or ...` batch, and batches in flight, for get_listings
+LISTING_BATCH_SIZE = 20
+LISTING_BATCH_CONCURRENCY = 4
+# Public records endpoint, and parcel lookups in flight, for get_parcels_public_records
+PARCELS_URL = "https://api.bridgedataoutput.com/api/v2/pub/parcels/"
+PARCEL_CONCURRENCY = 8
+
 class BridgeAPIClient:
     """Client for interacting with Bridge/RESO Web API"""
     
@@ -31,7 +67,34 @@ class BridgeAPIClient:
         "Longitude"
     ]
     
-    def __init__(self, api_key, dataset_id):
+    def __init__(
+        self,
+        api_key,
+        dataset_id,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float = DEFAULT_TIMEOUT,
+        http2: bool = DEFAULT_HTTP2,
+        cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        replica: Optional[ListingStore] = None,
+    ):
+        """
+        Args:
+            api_key: Bridge API server token
+            dataset_id: Bridge dataset ID (e.g. 'miamire')
+            http_client: Optional externally managed httpx.AsyncClient; when given, the caller owns its lifecycle
+            max_connections: Maximum number of concurrent connections in the pool
+            max_keepalive_connections: Maximum number of idle connections kept alive
+            keepalive_expiry: Seconds an idle connection is kept before being closed
+            timeout: Request timeout in seconds
+            http2: Use HTTP/2 multiplexing when the `h2` package is installed
+            cache: Optional response cache consulted before every GET
+            retry_policy: Backoff policy for throttled and transient failures (defaults to RetryPolicy())
+            replica: Optional local mirror; searches are answered from it while it is fresh
+        """
         load_dotenv()
         self.api_key = api_key 
         self.dataset_id = dataset_id
@@ -46,30 +109,91 @@ class BridgeAPIClient:
             "Authorization": f"Bearer {self.api_key}",
             "Accept": "application/json"
         }
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 10.0))
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = http_client
+        self._owns_client = http_client is None
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Quotas are per API key, so every client for the same key shares one limiter
+        self.rate_limiter = get_rate_limiter(self.api_key)
+        self.replica = replica
+        # Upstream requests currently in flight, keyed on their cache key (or URL)
+        self._inflight: Dict[str, "asyncio.Future[bytes]"] = {}
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Long-lived pooled HTTP client; created lazily and reused by every request"""
+        if self._client is None or self._client.is_closed:
+            if not self._owns_client:
+                raise RuntimeError("The externally provided HTTP client is closed")
+            logger.debug(f"Opening Bridge connection pool (http2={self.http2}, limits={self.limits})")
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+            )
+        return self._client
+
+    @property
+    def is_closed(self) -> bool:
+        return self._client is None or self._client.is_closed
+
+    async def aclose(self) -> None:
+        """Close the connection pool (no-op for externally provided clients)"""
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def ensure_schema(self) -> None:
+        """Refresh the field schema from `$metadata` when its snapshot is missing or stale; checked once per process"""
+        await ensure_schema(self)
+
+    async def __aenter__(self) -> "BridgeAPIClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
     
-    async def get_listing(self, listing_id: str) -> Dict[Any, Any]:
+    async def get_listing(
+        self,
+        listing_id: str,
+        skip_fields: Optional[List[str]] = None,
+        profile: Optional[str] = None
+    ) -> Dict[Any, Any]:
         """
         Fetch a specific listing by ID; this includes much more information, photographs, etc
         
         Args:
             listing_id: The MLS listing ID
+            skip_fields: Members to leave out (e.g. ["Media"]); when given, the body is
+                decoded incrementally and the skipped subtrees are never parsed or cached
+            profile: Named field projection (see profiles.PROFILES); the full record when None
             
         Returns:
             Dict containing the listing data
         """
         url = f"{self.base_url}/Property('{listing_id}')"
-        logger.debug(f"Making GET request to: {url}")
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                headers=self.headers
-            )
-            logger.debug(f"Response status: {response.status_code}, headers: {response.headers}, content length: {len(response.content)}")
-            
-            response.raise_for_status()
-            return response.json()
+        if profile is not None:
+            url += f"?$select={','.join(profile_fields(profile))}"
+        if skip_fields:
+            decoder = RecordStream(array_key=None, skip_fields=skip_fields)
+            async with aclosing(self._stream(url, decoder)) as records:
+                async for record in records:
+                    return record
+            raise ValueError(f"Empty response for listing {listing_id}")
+        return await self._get_json(url)
     
+    def _with_coordinates(self, select_fields: Optional[List[str]]) -> List[str]:
+        """Selected fields plus Latitude/Longitude, which the exact radius filter needs"""
+        fields = list(select_fields if select_fields is not None else self.DEFAULT_SELECT_FIELDS)
+        return fields + [field for field in ("Latitude", "Longitude") if field not in fields]
+
     def _create_geo_filter(
         self,
         latitude: float,
@@ -87,23 +211,13 @@ class BridgeAPIClient:
         Returns:
             String containing the OData filter expression for the bounding box
         """
-        import math
-        # Convert miles to degrees (approximate)
-        # 1 degree of latitude = ~69 miles
-        # 1 degree of longitude = ~69 miles * cos(latitude)
-        lat_degrees = distance_miles / 69.0
-        lon_degrees = distance_miles / (69.0 * math.cos(math.radians(latitude)))
-        
-        # Create bounding box coordinates
-        min_lat = latitude - lat_degrees
-        max_lat = latitude + lat_degrees
-        min_lon = longitude - lon_degrees
-        max_lon = longitude + lon_degrees
+        # The API can only filter on a box; results are trimmed to the exact radius afterwards
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, distance_miles)
         
         return f"Latitude ge {min_lat} and Latitude le {max_lat} and Longitude ge {min_lon} and Longitude le {max_lon}"
 
-    async def search_listings(
-        self, 
+    def _build_search_url(
+        self,
         query: str,
         latitude: Optional[float] = None,
         longitude: Optional[float] = None,
@@ -112,29 +226,15 @@ class BridgeAPIClient:
         top: Optional[int] = None,
         skip: Optional[int] = None,
         select_fields: Optional[List[str]] = None
-    ) -> Dict[Any, Any]:
-        """
-        Search listings using OData query parameters
-        
-        Args:
-            query: OData formatted query string
-            latitude: Center point latitude for geo search
-            longitude: Center point longitude for geo search
-            distance_miles: Maximum distance in miles from center point
-            order_by: Field and direction to sort by
-            top: Maximum number of results to return
-            skip: Number of results to skip
-            select_fields: List of fields to return (defaults to DEFAULT_SELECT_FIELDS)
-            
-        Returns:
-            Dict containing search results
-        """
+    ) -> str:
+        """Build the Property search URL for the given OData query parameters"""
         # If geo search parameters are provided, create bounding box filter
         if all(x is not None for x in [latitude, longitude, distance_miles]):
             geo_filter = self._create_geo_filter(latitude, longitude, distance_miles)
             query = f"({query}) and {geo_filter}" if query else geo_filter
 
-        params = [f"$filter={query}"]
+        # An empty $filter is rejected by the API; omit it to match every listing
+        params = [f"$filter={query}"] if query else []
         
         # Use default fields if none specified
         fields = select_fields if select_fields is not None else self.DEFAULT_SELECT_FIELDS
@@ -147,18 +247,489 @@ class BridgeAPIClient:
         if skip is not None:
             params.append(f"$skip={skip}")
         
-        query_string = "&".join(params)
-        logger.debug(f"Sending request to: {self.base_url}/Property?{query_string} with headers: {self.headers}")
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/Property?{query_string}",
-                headers=self.headers
-            )
+        return f"{self.base_url}/Property?{'&'.join(params)}"
+
+    async def _get_json(self, url: str, params: Optional[Dict[str, str]] = None) -> Dict[Any, Any]:
+        """
+        GET a URL and decode the JSON body
+
+        The response cache is consulted first; concurrent identical requests that
+        miss it share a single in-flight upstream call (single-flight).
+
+        Args:
+            url: Request URL, which is also the cache key
+            params: Extra query parameters sent with the request but kept out of the
+                cache key and the logs (e.g. credentials)
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key, ttl = self.cache.key_for_url(self.dataset_id, url)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Cache hit for: {url}")
+                return cached
+
+        flight_key = cache_key or url
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            logger.debug(f"Joining in-flight request for: {url}")
+            # Shielded so a cancelled waiter doesn't cancel the request for the others;
+            # each waiter decodes its own copy of the body
+            return json.loads(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(self._fetch(url, params=params))
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(flight_key, None) if self._inflight.get(flight_key) is t else None)
+        body = json.loads(await asyncio.shield(task))
+        if cache_key is not None:
+            await self.cache.set(cache_key, body, ttl)
+        return body
+
+    async def _fetch(
+        self,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> bytes:
+        """
+        GET a URL through the shared connection pool and return the raw body
+
+        Requests go through the per-key rate limiter; 429 and transient 5xx
+        responses or transport errors are retried with jittered exponential
+        backoff, honoring Retry-After.
+        """
+        policy = self.retry_policy
+        # Added to the URL's own query string (httpx's params= would replace it); only `url` is logged
+        request_url = httpx.URL(url).copy_merge_params(params) if params else url
+        for attempt in range(policy.max_retries + 1):
+            await self.rate_limiter.acquire()
+            logger.debug(f"Sending request to: {url} (attempt {attempt + 1})")
+            try:
+                response = await self.http.get(request_url, headers={**self.headers, **(headers or {})})
+            except httpx.TransportError as e:
+                if attempt >= policy.max_retries:
+                    raise
+                delay = policy.delay(attempt)
+                logger.warning(f"Transport error for {url}: {e}; retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.rate_limiter.update_from_headers(response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < policy.max_retries:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self.rate_limiter.penalize(retry_after)
+                delay = policy.delay(attempt, retry_after)
+                logger.warning(f"Bridge returned {response.status_code} for {url}; retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
             response.raise_for_status()
-            logger.debug(f"Response status: {response.status_code}, headers: {response.headers}, content length: {len(response.content)}")
-            return response.json() 
+            self.rate_limiter.record_success()
+            logger.debug(f"Response status: {response.status_code}, http_version: {response.http_version}, content length: {len(response.content)}")
+            return response.content
+
+    async def _stream(self, url: str, decoder: RecordStream) -> AsyncIterator[Dict[str, Any]]:
+        """
+        GET a URL and yield records as `decoder` parses them from the response stream
+
+        Uses the same rate limiter and retry policy as `_fetch`; a request is only
+        retried while nothing has been yielded yet, and each attempt starts `decoder`
+        afresh so a partial body from a failed attempt is never carried over. The
+        body is never buffered whole.
+        """
+        policy = self.retry_policy
+        yielded = False
+        for attempt in range(policy.max_retries + 1):
+            decoder.reset()
+            await self.rate_limiter.acquire()
+            logger.debug(f"Streaming request to: {url} (attempt {attempt + 1})")
+            delay = None
+            try:
+                async with self.http.stream("GET", url, headers=self.headers) as response:
+                    self.rate_limiter.update_from_headers(response.headers)
+                    if response.status_code in RETRY_STATUSES and attempt < policy.max_retries:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        if response.status_code == 429:
+                            self.rate_limiter.penalize(retry_after)
+                        delay = policy.delay(attempt, retry_after)
+                        logger.warning(f"Bridge returned {response.status_code} for {url}; retrying in {delay:.2f}s")
+                    else:
+                        if response.is_error:
+                            await response.aread()
+                        response.raise_for_status()
+                        self.rate_limiter.record_success()
+                        async for chunk in response.aiter_text():
+                            for record in decoder.feed(chunk):
+                                yielded = True
+                                yield record
+                        decoder.close()
+                        logger.debug(f"Streamed {decoder.records_parsed} records, http_version: {response.http_version}")
+                        return
+            except httpx.TransportError as e:
+                if attempt >= policy.max_retries or yielded:
+                    raise
+                delay = policy.delay(attempt)
+                logger.warning(f"Transport error for {url}: {e}; retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _search_replica(
+        self,
+        query: str,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        distance_miles: Optional[float],
+        order_by: Optional[str],
+        top: Optional[int],
+        skip: Optional[int],
+        select_fields: Optional[List[str]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Answer a search from the local mirror; None when there is no fresh mirror or it can't serve the query"""
+        if self.replica is None or not self.replica.is_fresh():
+            return None
+        try:
+            records = await asyncio.to_thread(
+                self.replica.search,
+                query,
+                latitude=latitude,
+                longitude=longitude,
+                distance_miles=distance_miles,
+                order_by=order_by,
+                top=top,
+                skip=skip,
+                select_fields=select_fields if select_fields is not None else self.DEFAULT_SELECT_FIELDS
+            )
+        except UnsupportedQuery as e:
+            logger.debug(f"Replica can't serve query, falling back to the API: {e}")
+            return None
+        logger.debug(f"Replica returned {len(records)} results")
+        return records
+
+    async def search_listings(
+        self, 
+        query: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        distance_miles: Optional[float] = None,
+        order_by: Optional[str] = None,
+        top: Optional[int] = None,
+        skip: Optional[int] = None,
+        select_fields: Optional[List[str]] = None,
+        profile: Optional[str] = None
+    ) -> Dict[Any, Any]:
+        """
+        Search listings using OData query parameters
         
-    def get_parcel_public_records(
+        Args:
+            query: OData formatted query string
+            latitude: Center point latitude for geo search
+            longitude: Center point longitude for geo search
+            distance_miles: Maximum distance in miles from center point
+            order_by: Field and direction to sort by
+            top: Maximum number of results to return
+            skip: Number of results to skip
+            select_fields: List of fields to return (defaults to DEFAULT_SELECT_FIELDS)
+            profile: Named field projection (see profiles.PROFILES), used when select_fields is None
+            
+        Returns:
+            Dict containing search results; with a geo search, only listings within the
+            radius are kept, each with a `distance_km` field, sorted nearest first
+        """
+        select_fields = resolve_select(select_fields, profile)
+        geo = all(x is not None for x in [latitude, longitude, distance_miles])
+        if geo:
+            select_fields = self._with_coordinates(select_fields)
+        local = await self._search_replica(query, latitude, longitude, distance_miles, order_by, top, skip, select_fields)
+        if local is not None:
+            results = {"value": local}
+        else:
+            url = self._build_search_url(
+                query,
+                latitude=latitude,
+                longitude=longitude,
+                distance_miles=distance_miles,
+                order_by=order_by,
+                top=top,
+                skip=skip,
+                select_fields=select_fields
+            )
+            results = await self._get_json(url)
+        if geo:
+            # Drop the bounding box corners outside the radius and sort nearest first
+            results["value"] = within_radius(results.get("value", []), latitude, longitude, distance_miles)
+        return results
+
+    async def search_listings_iter(
+        self,
+        query: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        distance_miles: Optional[float] = None,
+        order_by: Optional[str] = None,
+        skip: int = 0,
+        select_fields: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        max_records: int = MAX_SEARCH_RECORDS,
+        page_size: int = MAX_PAGE_SIZE,
+        prefetch: int = 2
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over every listing matching the query, paging automatically.
+
+        Follows `@odata.nextLink` when the API returns one; otherwise walks `$skip`
+        windows. While the caller consumes a page, the next `prefetch` pages are
+        already being fetched concurrently. Records are yielded as soon as their
+        page arrives.
+
+        Args:
+            query: OData formatted query string
+            latitude: Center point latitude for geo search
+            longitude: Center point longitude for geo search
+            distance_miles: Maximum distance in miles from center point
+            order_by: Field and direction to sort by
+            skip: Number of results to skip before the first record
+            select_fields: List of fields to return (defaults to DEFAULT_SELECT_FIELDS)
+            profile: Named field projection (see profiles.PROFILES), used when select_fields is None
+            max_records: Hard cap on the total number of records yielded
+            page_size: Records requested per page (capped at MAX_PAGE_SIZE)
+            prefetch: Number of pages fetched ahead of the consumer
+
+        Yields:
+            Listing records (dicts); with a geo search, only listings within the radius,
+            each with a `distance_km` field
+        """
+        select_fields = resolve_select(select_fields, profile)
+        max_records = min(max_records, MAX_SEARCH_RECORDS)
+        prefetch = max(1, prefetch)
+        if max_records <= 0:
+            return
+
+        geo = all(x is not None for x in [latitude, longitude, distance_miles])
+        if geo:
+            requested_fields = select_fields if select_fields is not None else self.DEFAULT_SELECT_FIELDS
+            select_fields = self._with_coordinates(select_fields)
+
+        local = await self._search_replica(query, latitude, longitude, distance_miles, order_by, max_records, skip, select_fields)
+        if local is not None:
+            # Coordinates were only added for the radius filter
+            added = [field for field in ("Latitude", "Longitude") if geo and field not in requested_fields]
+            for record in local:
+                for field in added:
+                    record.pop(field, None)
+                yield record
+            return
+
+        if geo:
+            # The API only filters on the bounding box and the corners are dropped
+            # here, so keep fetching past max_records until enough fall inside the radius
+            fetch_cap = MAX_SEARCH_RECORDS
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE, 2 * max_records))
+        else:
+            fetch_cap = max_records
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE, max_records))
+
+        def page_top(offset: int) -> int:
+            """$top of the page at `offset`: a full page, or what is left of fetch_cap"""
+            return min(page_size, fetch_cap - (offset - skip))
+
+        def page_url(offset: int) -> str:
+            return self._build_search_url(
+                query,
+                latitude=latitude,
+                longitude=longitude,
+                distance_miles=distance_miles,
+                order_by=order_by,
+                top=page_top(offset),
+                skip=offset,
+                select_fields=select_fields
+            )
+
+        pending: Deque[Tuple[int, "asyncio.Task[Dict[Any, Any]]"]] = deque()
+        yielded = 0
+        fetched = 0
+        try:
+            page = await self._get_json(page_url(skip))
+            # The server decides how to paginate: follow its nextLink chain if it
+            # provides one, otherwise walk $skip windows ourselves
+            follow_links = "@odata.nextLink" in page
+            top = page_top(skip)
+            next_offset = skip + page_size
+            while True:
+                records = page.get("value", [])
+                fetched += len(records)
+                next_link = page.get("@odata.nextLink")
+                if follow_links:
+                    exhausted = not next_link
+                else:
+                    exhausted = len(records) < top
+                exhausted = exhausted or fetched >= fetch_cap or (not geo and yielded + len(records) >= max_records)
+
+                # Schedule upcoming pages before handing records to the caller
+                if not exhausted:
+                    if follow_links:
+                        # Each link is only known once the previous page arrives
+                        pending.append((page_size, asyncio.ensure_future(self._get_json(next_link))))
+                    else:
+                        while len(pending) < prefetch and next_offset - skip < fetch_cap:
+                            pending.append((page_top(next_offset), asyncio.ensure_future(self._get_json(page_url(next_offset)))))
+                            next_offset += page_size
+
+                if geo:
+                    records = annotate_distance(records, latitude, longitude, distance_miles)
+                for record in records:
+                    yield record
+                    yielded += 1
+                    if yielded >= max_records:
+                        return
+                if exhausted or not pending:
+                    return
+                top, task = pending.popleft()
+                page = await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def search_listings_stream(
+        self,
+        query: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        distance_miles: Optional[float] = None,
+        order_by: Optional[str] = None,
+        skip: int = 0,
+        select_fields: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        max_records: int = MAX_SEARCH_RECORDS,
+        page_size: int = MAX_PAGE_SIZE,
+        skip_fields: Optional[List[str]] = ("Media",)
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Like `search_listings_iter`, but decodes each page incrementally from the response stream.
+
+        Records are yielded while their page is still downloading and members in
+        `skip_fields` are never parsed, so memory stays flat regardless of page size.
+        Pages are fetched one at a time and bypass the response cache.
+
+        Args:
+            query: OData formatted query string
+            latitude: Center point latitude for geo search
+            longitude: Center point longitude for geo search
+            distance_miles: Maximum distance in miles from center point
+            order_by: Field and direction to sort by
+            skip: Number of results to skip before the first record
+            select_fields: List of fields to return (defaults to DEFAULT_SELECT_FIELDS)
+            profile: Named field projection (see profiles.PROFILES), used when select_fields is None
+            max_records: Hard cap on the total number of records yielded
+            page_size: Records requested per page (capped at MAX_PAGE_SIZE)
+            skip_fields: Record members to drop while decoding
+
+        Yields:
+            Listing records (dicts); with a geo search, only listings within the radius,
+            each with a `distance_km` field, in API order
+        """
+        select_fields = resolve_select(select_fields, profile)
+        max_records = min(max_records, MAX_SEARCH_RECORDS)
+        if max_records <= 0:
+            return
+
+        geo = all(x is not None for x in [latitude, longitude, distance_miles])
+        if geo:
+            select_fields = self._with_coordinates(select_fields)
+            # Bounding box corners are dropped here, so fetch past max_records as needed
+            fetch_cap = MAX_SEARCH_RECORDS
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE, 2 * max_records))
+        else:
+            fetch_cap = max_records
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE, max_records))
+        yielded = 0
+        fetched = 0
+        url = None
+        while fetched < fetch_cap:
+            top = min(page_size, fetch_cap - fetched)
+            if url is None:
+                url = self._build_search_url(
+                    query,
+                    latitude=latitude,
+                    longitude=longitude,
+                    distance_miles=distance_miles,
+                    order_by=order_by,
+                    top=top,
+                    skip=skip + fetched,
+                    select_fields=select_fields
+                )
+            decoder = RecordStream(skip_fields=skip_fields)
+            # Closed explicitly so an early return releases the connection right away
+            async with aclosing(self._stream(url, decoder)) as records:
+                async for record in records:
+                    if geo and next(annotate_distance([record], latitude, longitude, distance_miles), None) is None:
+                        continue
+                    yield record
+                    yielded += 1
+                    if yielded >= max_records:
+                        return
+            fetched += decoder.records_parsed
+            url = decoder.metadata.get("@odata.nextLink")
+            if decoder.records_parsed == 0 or (url is None and decoder.records_parsed < top):
+                return
+
+    async def get_listings(
+        self,
+        listing_ids: List[str],
+        fields: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        batch_size: int = LISTING_BATCH_SIZE,
+        concurrency: int = LISTING_BATCH_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch many listings at once, grouping IDs into `ListingId eq ... or ...` filter batches
+
+        Batches run concurrently, bounded by a semaphore; a failed batch only
+        affects the IDs it contained.
+
+        Args:
+            listing_ids: MLS listing IDs to fetch
+            fields: List of fields to return (defaults to the schema's main fields)
+            profile: Named field projection (see profiles.PROFILES), used when fields is None
+            batch_size: Number of IDs per request
+            concurrency: Maximum number of batch requests in flight
+
+        Returns:
+            One entry per input ID, in input order: {"ListingId": id, "listing": {...}}
+            or {"ListingId": id, "error": "..."}
+        """
+        await self.ensure_schema()
+        fields = resolve_select(fields, profile) or get_schema().core_fields
+        if "ListingId" not in fields:
+            fields.append("ListingId")
+        unique_ids = list(dict.fromkeys(listing_ids))
+        batches = [unique_ids[i:i + batch_size] for i in range(0, len(unique_ids), max(1, batch_size))]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        found: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+
+        async def fetch_batch(batch: List[str]) -> None:
+            escaped = ["'" + listing_id.replace("'", "''") + "'" for listing_id in batch]
+            query = " or ".join(f"ListingId eq {listing_id}" for listing_id in escaped)
+            async with semaphore:
+                try:
+                    results = await self.search_listings(query, top=len(batch), select_fields=fields)
+                except Exception as e:
+                    logger.error(f"Error fetching listing batch {batch}: {str(e)}")
+                    for listing_id in batch:
+                        errors[listing_id] = f"Error fetching listing: {str(e)}"
+                    return
+            for record in results.get("value", []):
+                found[str(record.get("ListingId"))] = record
+
+        await asyncio.gather(*(fetch_batch(batch) for batch in batches))
+
+        return [
+            {"ListingId": listing_id, "listing": found[listing_id]} if listing_id in found
+            else {"ListingId": listing_id, "error": errors.get(listing_id, "Listing not found")}
+            for listing_id in listing_ids
+        ]
+
+    async def get_parcel_public_records(
         self,
         state: str,
         apn: str,
@@ -166,6 +737,11 @@ class BridgeAPIClient:
     ) -> Dict[Any, Any]:
         """
         Search for a specific parcel and return its public records.
+
+        Requests share the client's connection pool, rate limiter and response
+        cache; parcel records change rarely, so they are cached for days under
+        the normalized (state, APN, zip) key.
+
         Args:
             state: The state where the parcel is located (e.g., 'CA')
             apn: The Assessor's Parcel Number
@@ -175,18 +751,91 @@ class BridgeAPIClient:
         """
         # Use the Bridge Data Output public parcels API
         # See: https://bridgedataoutput.com/docs/explorer/public-data#listParcels
-        base_url = "https://api.bridgedataoutput.com/api/v2/pub/parcels/"
+        # The public data API authenticates with the access_token query parameter; it is
+        # passed separately so it stays out of the cache key and the logs
         params = {
-            "state": state,
-            "apn": apn,
-            "address.zip": zip_code,
-            "access_token": self.api_key
+            "state": state.strip().upper(),
+            "apn": apn.strip(),
+            "address.zip": zip_code.strip()[:5],
         }
-        logger.debug(f"Requesting parcel public records: {base_url} with params: {params}")
-        with httpx.AsyncClient() as client:
-            response = client.get(base_url, params=params)
-            logger.debug(f"Response status: {response.status_code}, headers: {response.headers}, content length: {len(response.content)}")
-            response.raise_for_status()
-            return response.json()
-    
-    
\ No newline at end of file
+        url = f"{PARCELS_URL}?{urlencode(params)}"
+        logger.debug(f"Requesting parcel public records: {url}")
+        return await self._get_json(url, params={"access_token": self.api_key})
+
+    async def get_parcels_public_records(
+        self,
+        parcels: List[Dict[str, str]],
+        concurrency: int = PARCEL_CONCURRENCY
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolve many parcels concurrently
+
+        Args:
+            parcels: Dicts with "state", "apn" and "zip_code" keys
+            concurrency: Maximum number of parcel requests in flight
+
+        Returns:
+            One entry per input parcel, in input order: the parcel keys plus either
+            "records" or "error"
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_parcel(parcel: Dict[str, str]) -> Dict[str, Any]:
+            result = {key: parcel.get(key) for key in ("state", "apn", "zip_code")}
+            async with semaphore:
+                try:
+                    result["records"] = await self.get_parcel_public_records(parcel["state"], parcel["apn"], parcel["zip_code"])
+                except Exception as e:
+                    logger.error(f"Error fetching parcel {result}: {str(e)}")
+                    result["error"] = f"Error fetching parcel public records: {str(e)}"
+            return result
+
+        return list(await asyncio.gather(*(fetch_parcel(parcel) for parcel in parcels)))
+
+
+# Process-wide registry of pooled clients, keyed on credentials, so every tool
+# invocation reuses the same keep-alive connections instead of re-handshaking.
+_shared_clients: Dict[Tuple[str, str], Tuple[BridgeAPIClient, Optional[asyncio.AbstractEventLoop]]] = {}
+
+
+def get_shared_client(api_key, dataset_id, **pool_options) -> BridgeAPIClient:
+    """
+    Return the shared, pooled client for the given credentials, creating it on first use.
+
+    Clients are bound to the event loop they were created on; if the running loop
+    changed (e.g. a new `asyncio.run`), a fresh client is created for it.
+
+    Args:
+        api_key: Bridge API server token
+        dataset_id: Bridge dataset ID
+        pool_options: Extra keyword arguments for BridgeAPIClient (pool limits, http2, timeout, cache);
+            shared clients use the process-wide response cache unless `cache` is given, and the
+            local mirror at BRIDGE_REPLICA_PATH when that variable is set
+    Returns:
+        The shared BridgeAPIClient
+    """
+    key = (api_key, dataset_id)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    entry = _shared_clients.get(key)
+    if entry is None or entry[1] is not loop:
+        pool_options.setdefault("cache", get_default_cache())
+        replica_path = os.environ.get("BRIDGE_REPLICA_PATH")
+        if replica_path and "replica" not in pool_options:
+            pool_options["replica"] = ListingStore(replica_path, dataset_id)
+        entry = (BridgeAPIClient(api_key=api_key, dataset_id=dataset_id, **pool_options), loop)
+        _shared_clients[key] = entry
+    return entry[0]
+
+
+async def close_shared_clients() -> None:
+    """Close every shared client; call on application shutdown"""
+    clients = [client for client, _ in _shared_clients.values()]
+    _shared_clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing Bridge client: {e}")
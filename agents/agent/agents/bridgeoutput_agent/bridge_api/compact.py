@@ -0,0 +1,170 @@
+"""Token-budgeted compaction of tool results and agent outputs.
+
+Everything a tool returns ends up in a Gemini prompt, so its size drives
+latency and cost. `compact_value` shrinks any JSON-like value:
+
+- null, empty string, empty list and empty dict members are dropped
+- numbers are rounded per field: coordinates keep 5 decimals (about 1 m),
+  prices and areas are rounded to the level's digits (whole units at the
+  last level), and other numbers (baths, distances) keep at least 1 decimal
+- remarks are cut to their first sentences, other long strings are truncated
+
+`compact_to_budget` applies increasingly aggressive levels until the value
+fits a token budget; for lists (ranked results come first) it then drops
+items from the tail. Token counts are estimated from the compact JSON
+length, which is close enough for budgeting without a tokenizer.
+"""
+import json
+import re
+from typing import NamedTuple, Optional, Any, Tuple
+
+# Free-text fields shortened to their first sentences
+REMARK_FIELDS = {
+    "PublicRemarks",
+    "PrivateRemarks",
+    "SyndicationRemarks",
+    "Directions",
+    "LongDescription",
+    "ShortDescription",
+}
+
+# Fields rounded to COORDINATE_DIGITS instead of the level's digits
+COORDINATE_FIELDS = {"Latitude", "Longitude", "lat", "lon", "lng", "latitude", "longitude"}
+COORDINATE_DIGITS = 5
+
+# Fields precise enough in whole units (prices, areas), rounded to the level's digits
+COARSE_FIELDS = re.compile(r"(Price|Amount|Fee|Value|Area|SquareFeet|price|area|sqft)(_min|_max|Low|High)?$")
+# Decimals kept by every other number (2.5 baths, 1.2 km) at any level
+MIN_DIGITS = 1
+
+# Average characters per token of compact JSON
+CHARS_PER_TOKEN = 4
+
+
+class CompactionLevel(NamedTuple):
+    """Settings of one compaction step"""
+    digits: int
+    remarks_chars: int
+    max_string: int
+
+
+# From lossless-ish to aggressive; remarks_chars=0 drops the remarks; digits apply in full to COARSE_FIELDS only
+LEVELS = (
+    CompactionLevel(digits=2, remarks_chars=600, max_string=2000),
+    CompactionLevel(digits=2, remarks_chars=300, max_string=800),
+    CompactionLevel(digits=1, remarks_chars=120, max_string=300),
+    CompactionLevel(digits=0, remarks_chars=0, max_string=120),
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class CompactionStats(NamedTuple):
+    """Estimated tokens before and after compaction"""
+    tokens_before: int
+    tokens_after: int
+    dropped_items: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def estimate_tokens(value: Any) -> int:
+    """Estimated prompt tokens of a value (strings as-is, anything else as compact JSON)"""
+    text = value if isinstance(value, str) else json.dumps(value, separators=(",", ":"), default=str)
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def extract_sentences(text: str, max_chars: int) -> str:
+    """Leading whole sentences of `text` within `max_chars`; hard-cut when the first sentence is longer"""
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    kept = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{kept} {sentence}" if kept else sentence
+        if len(candidate) > max_chars:
+            break
+        kept = candidate
+    return kept or text[:max_chars].rstrip() + "…"
+
+
+def _round(value: float, digits: int) -> Any:
+    rounded = round(value, digits)
+    return int(rounded) if rounded == int(rounded) else rounded
+
+
+def _digits(key: Optional[str], level: CompactionLevel) -> int:
+    """Decimals kept for a member: see COORDINATE_FIELDS, COARSE_FIELDS and MIN_DIGITS"""
+    if key in COORDINATE_FIELDS:
+        return COORDINATE_DIGITS
+    if key is not None and COARSE_FIELDS.search(key):
+        return level.digits
+    return max(level.digits, MIN_DIGITS)
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def compact_value(value: Any, level: CompactionLevel = LEVELS[0], key: Optional[str] = None) -> Any:
+    """
+    Compact a JSON-like value
+
+    Args:
+        value: Dicts, lists, strings and numbers, nested in any way
+        level: Compaction settings
+        key: Name of the member holding `value`, which selects the rounding and remarks handling
+    Returns:
+        The compacted copy of `value`; members may be dropped
+    """
+    if isinstance(value, dict):
+        compacted = {}
+        for member, item in value.items():
+            item = compact_value(item, level, member)
+            if not _is_empty(item):
+                compacted[member] = item
+        return compacted
+    if isinstance(value, (list, tuple)):
+        return [item for item in (compact_value(item, level, key) for item in value) if not _is_empty(item)]
+    if isinstance(value, bool) or not isinstance(value, (str, float)):
+        return value
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return None
+        return _round(value, _digits(key, level))
+    if key in REMARK_FIELDS:
+        return extract_sentences(value, level.remarks_chars) if level.remarks_chars else None
+    if len(value) > level.max_string:
+        return value[:level.max_string].rstrip() + "…"
+    return value
+
+
+def compact_to_budget(value: Any, max_tokens: Optional[int] = None) -> Tuple[Any, CompactionStats]:
+    """
+    Compact a value, tightening until it fits a token budget
+
+    Args:
+        value: JSON-like value; lists should have their most relevant items first
+        max_tokens: Token budget; None only applies the first level
+    Returns:
+        Tuple of (compacted value, CompactionStats)
+    """
+    tokens_before = estimate_tokens(value)
+    levels = LEVELS if max_tokens is not None else LEVELS[:1]
+    for level in levels:
+        compacted = compact_value(value, level)
+        tokens = estimate_tokens(compacted)
+        if max_tokens is None or tokens <= max_tokens:
+            return compacted, CompactionStats(tokens_before, tokens)
+    dropped = 0
+    if isinstance(compacted, list) and len(compacted) > 1:
+        # Item sizes are estimated once rather than after every dropped item
+        sizes = [estimate_tokens(item) for item in compacted]
+        while len(compacted) > 1 and tokens > max_tokens:
+            compacted.pop()
+            tokens -= sizes.pop()
+            dropped += 1
+        tokens = estimate_tokens(compacted)
+    return compacted, CompactionStats(tokens_before, tokens, dropped)
@@ -0,0 +1,227 @@
+"""Deterministic comparables ranking.
+
+Instead of letting the LLM relax filters one search at a time, over-fetch one
+wide candidate set around the base property and score every candidate at once
+with NumPy on the same criteria the agent instruction lists: location first,
+then living area and lot size, then year built, bedrooms and bathrooms, with a
+bonus for the same subdivision.
+"""
+import logging
+import re
+from datetime import date, timedelta
+from typing import Optional, Dict, Any, List, Union
+
+import numpy as np
+
+from .client import MAX_SEARCH_RECORDS
+from .geo import KM_PER_MILE
+from .models import ListingBatch
+from .profiles import PROFILES
+from .query import ListingQuery
+
+logger = logging.getLogger("bridge_api.comparables")
+
+# Relative importance of each criterion; normalized when scoring
+DEFAULT_WEIGHTS = {
+    "distance": 0.30,
+    "subdivision": 0.15,
+    "living_area": 0.15,
+    "lot_size": 0.12,
+    "year_built": 0.10,
+    "bedrooms": 0.09,
+    "bathrooms": 0.09,
+}
+
+# Difference at which a criterion's similarity drops to zero
+TOLERANCES = {
+    "living_area": 0.5,   # relative
+    "lot_size": 0.5,      # relative
+    "year_built": 30.0,   # years
+    "bedrooms": 3.0,
+    "bathrooms": 2.0,
+}
+
+# Similarity assumed when either side is missing a value
+UNKNOWN_SIMILARITY = 0.5
+
+COMPARABLE_FIELDS = PROFILES["comparable"]
+
+# (criterion, listing field) pairs reported as deltas against the base property
+DELTA_FIELDS = [
+    ("living_area", "LivingArea"),
+    ("lot_size", "LotSizeSquareFeet"),
+    ("year_built", "YearBuilt"),
+    ("bedrooms", "BedroomsTotal"),
+    ("bathrooms", "BathroomsTotalDecimal"),
+]
+
+# Generic words that don't identify a subdivision ("WELLEBY UNIT 2" -> "WELLEBY")
+_SUBDIVISION_NOISE = {"UNIT", "SEC", "SECTION", "PHASE", "PH", "ADD", "ADDITION", "REPLAT", "PLAT", "THE", "OF", "AT", "NO", "PART", "TRACT"}
+
+
+def subdivision_key(name: Optional[str]) -> Optional[str]:
+    """Significant part of a subdivision name, e.g. 'WELLEBY UNIT 2' -> 'WELLEBY'"""
+    if not name:
+        return None
+    words = [word for word in re.split(r"[^A-Z0-9]+", name.upper()) if word and word not in _SUBDIVISION_NOISE and not word.isdigit()]
+    return words[0] if words else None
+
+
+def _similarity(deltas: np.ndarray, tolerance: float) -> np.ndarray:
+    similarity = np.clip(1.0 - np.abs(deltas) / tolerance, 0.0, 1.0)
+    return np.where(np.isnan(similarity), UNKNOWN_SIMILARITY, similarity)
+
+
+def score_candidates(
+    base: Dict[str, Any],
+    candidates: Union[ListingBatch, List[Dict[str, Any]]],
+    radius_km: float,
+    weights: Optional[Dict[str, float]] = None
+) -> np.ndarray:
+    """
+    Score candidates against the base property
+
+    Args:
+        base: Base property with the listing field names (LivingArea, YearBuilt, ...)
+        candidates: Candidate listings (a ListingBatch or dicts), each with a `distance_km` field
+        radius_km: Distance at which the location similarity drops to zero
+        weights: Overrides for DEFAULT_WEIGHTS
+    Returns:
+        Array of scores in [0, 1], one per candidate
+    """
+    if not isinstance(candidates, ListingBatch):
+        candidates = ListingBatch.from_records(candidates)
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    similarities = {
+        "distance": _similarity(candidates.numeric("distance_km"), radius_km),
+    }
+    for criterion, field in DELTA_FIELDS:
+        values = candidates.numeric(field)
+        base_value = float(base[field]) if base.get(field) is not None else np.nan
+        deltas = values - base_value
+        if criterion in ("living_area", "lot_size"):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                deltas = deltas / base_value if base_value else np.full(len(candidates), np.nan)
+        similarities[criterion] = _similarity(deltas, TOLERANCES[criterion])
+
+    base_subdivision = subdivision_key(base.get("SubdivisionName"))
+    if base_subdivision:
+        similarities["subdivision"] = np.array([
+            1.0 if base_subdivision in (name or "").upper() else 0.0
+            for name in candidates.column("SubdivisionName")
+        ])
+    else:
+        similarities["subdivision"] = np.full(len(candidates), UNKNOWN_SIMILARITY)
+
+    total_weight = sum(weights.values())
+    score = np.zeros(len(candidates))
+    for criterion, weight in weights.items():
+        score += weight * similarities[criterion]
+    return score / total_weight
+
+
+def rank_comparables(
+    base: Dict[str, Any],
+    candidates: Union[ListingBatch, List[Dict[str, Any]]],
+    radius_km: float,
+    k: int = 6,
+    weights: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """Return the top-k candidates with their score and per-feature deltas against the base property"""
+    if not isinstance(candidates, ListingBatch):
+        candidates = ListingBatch.from_records(candidates)
+    if not len(candidates):
+        return []
+    scores = score_candidates(base, candidates, radius_km, weights)
+    # Stable sort on -score keeps the candidates' order (nearest first, see find_comparables) among ties
+    order = np.argsort(-scores, kind="stable")[:k]
+    base_subdivision = subdivision_key(base.get("SubdivisionName"))
+    ranked = []
+    for index in order:
+        candidate = candidates.listing(index).to_dict()
+        deltas = {}
+        for _, field in DELTA_FIELDS:
+            if candidate.get(field) is not None and base.get(field) is not None:
+                deltas[field] = round(float(candidate[field]) - float(base[field]), 2)
+        if base_subdivision:
+            deltas["same_subdivision"] = base_subdivision in (candidate.get("SubdivisionName") or "").upper()
+        candidate["score"] = round(float(scores[index]), 4)
+        candidate["deltas"] = deltas
+        ranked.append(candidate)
+    return ranked
+
+
+async def find_comparables(
+    client,
+    base: Dict[str, Any],
+    k: int = 6,
+    radius_miles: float = 1.0,
+    max_radius_miles: float = 4.0,
+    lookback_days: int = 365,
+    candidate_limit: int = 500,
+    weights: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Find and rank comparables for a base property
+
+    Fetches active listings and listings closed within `lookback_days`
+    inside `radius_miles` of the base property, doubling the radius (up to
+    `max_radius_miles`) until at least `k` candidates are found, then scores
+    the `candidate_limit` nearest of them in one pass.
+
+    Args:
+        client: BridgeAPIClient
+        base: Base property using listing field names; Latitude and Longitude are required,
+            PropertyType, SubdivisionName, LivingArea, LotSizeSquareFeet, YearBuilt, BedroomsTotal,
+            BathroomsTotalDecimal, ListingId and ParcelNumber are used when present
+        k: Number of comparables to return
+        radius_miles: Initial search radius
+        max_radius_miles: Largest radius tried
+        lookback_days: How far back (by CloseDate) closed listings are considered
+        candidate_limit: Maximum candidates scored per search; the nearest ones are kept
+        weights: Overrides for DEFAULT_WEIGHTS
+    Returns:
+        Dict with the radius used, the number of candidates scored and the ranked comparables
+    """
+    if base.get("Latitude") is None or base.get("Longitude") is None:
+        raise ValueError("Base property Latitude and Longitude are required")
+    since = (date.today() - timedelta(days=lookback_days)).isoformat()
+    query = (
+        ListingQuery()
+        .raw(f"MlsStatus eq 'Active' or (MlsStatus eq 'Closed' and CloseDate ge {since})")
+        .where("PropertyType", "eq", base.get("PropertyType") or None)
+        .to_odata()
+    )
+
+    radius = radius_miles
+    while True:
+        records = [
+            record async for record in client.search_listings_iter(
+                query,
+                latitude=base["Latitude"],
+                longitude=base["Longitude"],
+                distance_miles=radius,
+                select_fields=COMPARABLE_FIELDS,
+                max_records=MAX_SEARCH_RECORDS
+            )
+            if not _is_base_property(base, record)
+        ]
+        # The API can't order by distance: fetch the whole radius, then keep the nearest candidates
+        records.sort(key=lambda record: record["distance_km"])
+        candidates = ListingBatch.from_records(records[:candidate_limit])
+        logger.debug(f"Found {len(candidates)} comparable candidates within {radius} miles")
+        if len(candidates) >= k or radius >= max_radius_miles:
+            break
+        radius = min(radius * 2, max_radius_miles)
+
+    return {
+        "radius_miles": radius,
+        "candidates": len(candidates),
+        "comparables": rank_comparables(base, candidates, radius * KM_PER_MILE, k=k, weights=weights),
+    }
+
+
+def _is_base_property(base: Dict[str, Any], record: Dict[str, Any]) -> bool:
+    if base.get("ListingId") and record.get("ListingId") == base["ListingId"]:
+        return True
+    return bool(base.get("ParcelNumber") and record.get("ParcelNumber") == base["ParcelNumber"])
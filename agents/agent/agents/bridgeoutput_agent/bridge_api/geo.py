@@ -0,0 +1,76 @@
+"""Geographic helpers: great-circle distances and exact radius filtering of listings"""
+import math
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometers"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float, distance_miles: float) -> Tuple[float, float, float, float]:
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) of a box that contains the whole search circle
+
+    Args:
+        latitude: Center point latitude
+        longitude: Center point longitude
+        distance_miles: Radius in miles
+    """
+    # 1 degree of latitude = ~69 miles; 1 degree of longitude = ~69 miles * cos(latitude)
+    lat_degrees = distance_miles / 69.0
+    lon_degrees = distance_miles / (69.0 * max(math.cos(math.radians(latitude)), 1e-6))
+    return latitude - lat_degrees, latitude + lat_degrees, longitude - lon_degrees, longitude + lon_degrees
+
+
+def _coordinates(record: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    try:
+        return float(record["Latitude"]), float(record["Longitude"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def annotate_distance(
+    records: Iterable[Dict[str, Any]],
+    latitude: float,
+    longitude: float,
+    distance_miles: Optional[float] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Add a `distance_km` field to each record, dropping the ones outside the radius
+
+    Records are yielded in input order; records without coordinates are dropped
+    when a radius is given and passed through unannotated otherwise.
+    """
+    max_km = distance_miles * KM_PER_MILE if distance_miles is not None else None
+    for record in records:
+        point = _coordinates(record)
+        if point is None:
+            if max_km is None:
+                yield record
+            continue
+        distance_km = haversine_km(latitude, longitude, point[0], point[1])
+        if max_km is not None and distance_km > max_km:
+            continue
+        record["distance_km"] = round(distance_km, 3)
+        yield record
+
+
+def within_radius(
+    records: Iterable[Dict[str, Any]],
+    latitude: float,
+    longitude: float,
+    distance_miles: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Exact radius filter: annotate `distance_km` and sort records nearest first"""
+    return sorted(
+        annotate_distance(records, latitude, longitude, distance_miles),
+        key=lambda record: record.get("distance_km", math.inf)
+    )
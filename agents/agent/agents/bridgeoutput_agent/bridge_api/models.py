@@ -0,0 +1,210 @@
+"""Compact listing records.
+
+Bridge returns each listing as a dict with hundreds of keys, most of them
+null. `Listing` keeps the fields the pipeline works with in typed `__slots__`
+and only the non-null remainder in a small `extra` dict. `ListingBatch`
+stores a result set column by column, with NumPy arrays for the numeric
+fields, so scoring can run on whole columns instead of per-record dict
+lookups.
+"""
+import json
+import sys
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Sequence, Union
+
+import numpy as np
+
+# Core fields converted to numbers (float64 columns, NaN when missing, in a batch)
+FLOAT_FIELDS = (
+    "ListPrice",
+    "ClosePrice",
+    "LivingArea",
+    "LotSizeSquareFeet",
+    "BathroomsTotalDecimal",
+    "Latitude",
+    "Longitude",
+    "distance_km",
+)
+
+# Core fields converted to int
+INT_FIELDS = (
+    "BedroomsTotal",
+    "YearBuilt",
+    "DaysOnMarket",
+    "PhotosCount",
+)
+
+# Low-cardinality strings, interned so repeated values share one object
+CATEGORY_FIELDS = (
+    "MlsStatus",
+    "PropertyType",
+    "PropertySubType",
+    "City",
+    "StateOrProvince",
+    "PostalCode",
+    "StreetSuffix",
+    "SubdivisionName",
+)
+
+STRING_FIELDS = (
+    "ListingId",
+    "ListingKey",
+    "ParcelNumber",
+    "StreetNumber",
+    "StreetName",
+    "UnitNumber",
+    "ListingContractDate",
+    "OnMarketDate",
+    "OffMarketDate",
+    "CloseDate",
+    "PublicRemarks",
+)
+
+CORE_FIELDS = STRING_FIELDS + CATEGORY_FIELDS + FLOAT_FIELDS + INT_FIELDS
+NUMERIC_FIELDS = frozenset(FLOAT_FIELDS + INT_FIELDS)
+_CORE = frozenset(CORE_FIELDS)
+_FLOATS = frozenset(FLOAT_FIELDS)
+_INTS = frozenset(INT_FIELDS)
+_CATEGORIES = frozenset(CATEGORY_FIELDS)
+
+
+def _convert(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        if field in _FLOATS:
+            # Whole numbers (prices, areas) stay ints so they serialize without a trailing .0
+            number = float(value)
+            return int(number) if number.is_integer() else number
+        if field in _INTS:
+            return int(float(value))
+    except (TypeError, ValueError):
+        return None
+    if field in _CATEGORIES and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class Listing:
+    """A listing with typed core fields in slots and the non-null remainder in `extra`"""
+
+    __slots__ = CORE_FIELDS + ("extra",)
+
+    def __init__(self, **fields: Any):
+        extra = {}
+        for field in CORE_FIELDS:
+            setattr(self, field, None)
+        for field, value in fields.items():
+            if field in _CORE:
+                setattr(self, field, _convert(field, value))
+            elif value is not None:
+                extra[field] = value
+        self.extra = extra
+
+    @classmethod
+    def from_json(cls, record: Dict[str, Any]) -> "Listing":
+        """Build a Listing from a decoded Bridge record"""
+        return cls(**record)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        if field in _CORE:
+            value = getattr(self, field)
+            return default if value is None else value
+        return self.extra.get(field, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict with the non-null fields, core fields first"""
+        record = {field: getattr(self, field) for field in CORE_FIELDS if getattr(self, field) is not None}
+        record.update(self.extra)
+        return record
+
+    def __repr__(self) -> str:
+        return f"Listing(ListingId={self.ListingId!r}, ListPrice={self.ListPrice!r})"
+
+
+class ListingBatch:
+    """Columnar result set: float64 arrays for numeric fields, lists for the rest"""
+
+    def __init__(self, columns: Dict[str, Union[np.ndarray, List[Any]]], extras: List[Dict[str, Any]]):
+        self.columns = columns
+        self.extras = extras
+
+    @classmethod
+    def from_records(cls, records: Iterable[Union[Dict[str, Any], Listing]]) -> "ListingBatch":
+        """Build a batch from Bridge records (dicts) or Listings"""
+        listings = [record if isinstance(record, Listing) else Listing.from_json(record) for record in records]
+        columns: Dict[str, Union[np.ndarray, List[Any]]] = {}
+        for field in CORE_FIELDS:
+            values = [getattr(listing, field) for listing in listings]
+            if field in NUMERIC_FIELDS:
+                columns[field] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            else:
+                columns[field] = values
+        return cls(columns, [listing.extra for listing in listings])
+
+    def __len__(self) -> int:
+        return len(self.extras)
+
+    def __iter__(self) -> Iterator[Listing]:
+        return (self.listing(i) for i in range(len(self)))
+
+    def column(self, field: str) -> Union[np.ndarray, List[Any]]:
+        """Column for a field; non-core fields are gathered from the extras"""
+        if field in self.columns:
+            return self.columns[field]
+        return [extra.get(field) for extra in self.extras]
+
+    def numeric(self, field: str) -> np.ndarray:
+        """Column as float64, NaN where missing or not numeric"""
+        column = self.column(field)
+        if isinstance(column, np.ndarray):
+            return column
+        values = np.full(len(self), np.nan)
+        for i, value in enumerate(column):
+            converted = _convert(field, value) if field in _CORE else value
+            try:
+                values[i] = float(converted)
+            except (TypeError, ValueError):
+                pass
+        return values
+
+    def listing(self, index: int) -> Listing:
+        fields = {}
+        for field, column in self.columns.items():
+            value = column[index]
+            if field in NUMERIC_FIELDS:
+                value = None if np.isnan(value) else value.item()
+            fields[field] = value
+        fields.update(self.extras[index])
+        return Listing(**fields)
+
+    def take(self, indices: Sequence[int]) -> "ListingBatch":
+        """New batch with the rows at `indices`, in that order"""
+        indices = np.asarray(indices, dtype=np.intp)
+        columns = {
+            field: column[indices] if isinstance(column, np.ndarray) else [column[i] for i in indices]
+            for field, column in self.columns.items()
+        }
+        return ListingBatch(columns, [self.extras[i] for i in indices])
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Plain dicts with the non-null fields of every row"""
+        return [self.listing(i).to_dict() for i in range(len(self))]
+
+
+def compact_records(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Round-trip records through Listing: typed core fields, null fields dropped"""
+    return [Listing.from_json(record).to_dict() for record in records]
+
+
+def compact_listing(record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return Listing.from_json(record).to_dict() if isinstance(record, dict) else record
+
+
+def compact_listing_entries(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Compact the listings of `BridgeAPIClient.get_listings` results, leaving error entries as they are"""
+    return [{**entry, "listing": compact_listing(entry["listing"])} if "listing" in entry else entry for entry in entries]
+
+
+def to_json(value: Any) -> str:
+    """Serialize without indentation or spaces; tool output is read by a model, not a person"""
+    return json.dumps(value, separators=(",", ":"))
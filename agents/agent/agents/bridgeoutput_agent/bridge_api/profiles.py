@@ -0,0 +1,131 @@
+"""Named field projections.
+
+Each pipeline stage only needs a slice of a listing: the comparables search
+needs the scoring columns, the report needs remarks and prices, the contact
+section needs the agent. A profile name can be passed wherever a `$select`
+list is accepted, so payloads carry just those columns instead of hundreds
+of fields plus media.
+"""
+from typing import Optional, Dict, List, Literal
+
+from .query import InvalidQuery, validate_fields
+
+PROFILES: Dict[str, List[str]] = {
+    "summary": [
+        "ListingId",
+        "MlsStatus",
+        "PropertyType",
+        "PropertySubType",
+        "ListPrice",
+        "ClosePrice",
+        "CloseDate",
+        "DaysOnMarket",
+        "StreetNumber",
+        "StreetName",
+        "StreetSuffix",
+        "UnitNumber",
+        "City",
+        "StateOrProvince",
+        "PostalCode",
+        "BedroomsTotal",
+        "BathroomsTotalDecimal",
+        "LivingArea",
+        "YearBuilt",
+        "PublicRemarks",
+    ],
+    "comparable": [
+        "ListingId",
+        "MlsStatus",
+        "PropertyType",
+        "ListPrice",
+        "ClosePrice",
+        "DaysOnMarket",
+        "BedroomsTotal",
+        "BathroomsTotalDecimal",
+        "LivingArea",
+        "LotSizeSquareFeet",
+        "YearBuilt",
+        "SubdivisionName",
+        "StreetNumber",
+        "StreetName",
+        "StreetSuffix",
+        "City",
+        "StateOrProvince",
+        "PostalCode",
+        "ParcelNumber",
+        "ListingContractDate",
+        "CloseDate",
+        "PublicRemarks",
+        "Latitude",
+        "Longitude",
+    ],
+    "valuation": [
+        "ListingId",
+        "ParcelNumber",
+        "MlsStatus",
+        "PropertyType",
+        "ListPrice",
+        "OriginalListPrice",
+        "PreviousListPrice",
+        "ClosePrice",
+        "ListingContractDate",
+        "OnMarketDate",
+        "OffMarketDate",
+        "CloseDate",
+        "DaysOnMarket",
+        "CumulativeDaysOnMarket",
+        "LivingArea",
+        "LotSizeSquareFeet",
+        "YearBuilt",
+        "BedroomsTotal",
+        "BathroomsTotalDecimal",
+        "TaxAnnualAmount",
+        "TaxAssessedValue",
+        "TaxYear",
+        "AssociationFee",
+        "AssociationFeeFrequency",
+    ],
+    "media": [
+        "ListingId",
+        "PhotosCount",
+        "VirtualTourURLBranded",
+        "VirtualTourURLUnbranded",
+        "Media",
+    ],
+    "agent-contact": [
+        "ListingId",
+        "ListAgentFullName",
+        "ListAgentEmail",
+        "ListAgentDirectPhone",
+        "ListAgentPreferredPhone",
+        "ListAgentMlsId",
+        "ListOfficeName",
+        "ListOfficePhone",
+        "ListOfficeEmail",
+        "CoListAgentFullName",
+        "BuyerAgentFullName",
+        "BuyerOfficeName",
+    ],
+}
+
+PROFILE_NAMES = tuple(PROFILES)
+
+# Tool parameter type listing the profile names
+ProfileName = Literal["summary", "comparable", "valuation", "media", "agent-contact"]
+
+
+def profile_fields(profile: str) -> List[str]:
+    """Return a copy of the `$select` list for a profile; raises InvalidQuery for unknown names"""
+    if profile not in PROFILES:
+        raise InvalidQuery(f"Unknown field profile '{profile}'; expected one of: {', '.join(PROFILE_NAMES)}")
+    return validate_fields(PROFILES[profile])
+
+
+def resolve_select(select_fields: Optional[List[str]] = None, profile: Optional[str] = None) -> Optional[List[str]]:
+    """Explicit select_fields win; otherwise the profile's fields; None when neither is given"""
+    if select_fields is not None:
+        return list(select_fields)
+    if profile is not None:
+        return profile_fields(profile)
+    return None
+
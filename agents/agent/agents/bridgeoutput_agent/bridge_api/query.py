@@ -0,0 +1,195 @@
+"""Structured OData query builder for listing searches.
+
+Both the ADK agent and the MCP server expose the same ~30 search parameters.
+`build_listing_query` maps them onto predicates, validates field names before
+any request goes out, drops duplicates (e.g. `min_price` and `ListPrice_min`),
+keeps only the tightest bound per field, and renders the predicates in a
+canonical order, so equivalent searches produce the same `$filter` string and
+share a cache entry.
+"""
+import difflib
+import re
+from typing import NamedTuple, Optional, Any, Dict, List, Iterable, Tuple
+
+from .schema import get_schema
+
+
+PROPERTY_TYPES = ("Residential", "Commercial")
+MLS_STATUSES = ("Active", "Closed")
+
+# Rendering order of operators within a field
+_OPERATOR_ORDER = {"eq": 0, "ne": 1, "ge": 2, "gt": 3, "le": 4, "lt": 5, "contains": 6}
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}(T[\d:.]+(Z|[+-]\d{2}:\d{2})?)?$")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_IDENTIFIER = re.compile(r"\b([A-Z][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)?)\b")
+
+# Search tool parameter -> (field, operator, case-insensitive)
+PARAMETER_PREDICATES: Dict[str, Tuple[str, str, bool]] = {
+    "min_price": ("ListPrice", "ge", False),
+    "max_price": ("ListPrice", "le", False),
+    "ListPrice_min": ("ListPrice", "ge", False),
+    "ListPrice_max": ("ListPrice", "le", False),
+    "beds": ("BedroomsTotal", "eq", False),
+    "beds_min": ("BedroomsTotal", "ge", False),
+    "beds_max": ("BedroomsTotal", "le", False),
+    "baths": ("BathroomsTotalDecimal", "eq", False),
+    "baths_min": ("BathroomsTotalDecimal", "ge", False),
+    "baths_max": ("BathroomsTotalDecimal", "le", False),
+    "LivingArea_min": ("LivingArea", "ge", False),
+    "LivingArea_max": ("LivingArea", "le", False),
+    "LotSizeSquareFeet_min": ("LotSizeSquareFeet", "ge", False),
+    "LotSizeSquareFeet_max": ("LotSizeSquareFeet", "le", False),
+    "YearBuilt_min": ("YearBuilt", "ge", False),
+    "YearBuilt_max": ("YearBuilt", "le", False),
+    "PhotosCount_min": ("PhotosCount", "ge", False),
+    "PhotosCount_max": ("PhotosCount", "le", False),
+    "on_market_date_from": ("OnMarketDate", "ge", False),
+    "on_market_date_to": ("OnMarketDate", "le", False),
+    "off_market_date_from": ("OffMarketDate", "ge", False),
+    "off_market_date_to": ("OffMarketDate", "le", False),
+    "property_type": ("PropertyType", "eq", False),
+    "city": ("City", "eq", False),
+    "zipcode": ("PostalCode", "eq", False),
+    "mls_status": ("MlsStatus", "eq", False),
+    "StreetName": ("StreetName", "eq", True),
+    "StreetSuffix": ("StreetSuffix", "eq", True),
+    "StreetNumber": ("StreetNumber", "eq", True),
+    "SubdivisionName": ("SubdivisionName", "contains", True),
+    "ParcelNumber": ("ParcelNumber", "eq", False),
+}
+
+
+class InvalidQuery(ValueError):
+    """Raised when a query references unknown fields or invalid values"""
+
+
+def validate_field(field: str, filterable: bool = False) -> str:
+    """Return the field if it exists in the schema (and can be filtered on), otherwise raise InvalidQuery"""
+    schema = get_schema()
+    info = schema.get(field)
+    if info is None:
+        suggestions = difflib.get_close_matches(field, list(schema), n=3)
+        hint = f"; did you mean {', '.join(suggestions)}?" if suggestions else ""
+        raise InvalidQuery(f"Unknown field '{field}'{hint}")
+    if filterable and not info.filterable:
+        raise InvalidQuery(f"Field '{field}' ({info.type}) can't be used in a filter")
+    return field
+
+
+def validate_fields(fields: Iterable[str]) -> List[str]:
+    return [validate_field(field) for field in fields]
+
+
+def _literal(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    value = str(value)
+    if _DATE.match(value):
+        return value
+    return "'" + value.replace("'", "''") + "'"
+
+
+class Predicate(NamedTuple):
+    """A single `field op value` comparison"""
+    field: str
+    op: str
+    value: Any
+    lower: bool = False
+
+    def sort_key(self) -> tuple:
+        return (self.field, _OPERATOR_ORDER[self.op], self.lower, _literal(self.value))
+
+    def to_odata(self) -> str:
+        field = f"tolower({self.field})" if self.lower else self.field
+        value = str(self.value).lower() if self.lower else self.value
+        if self.op == "contains":
+            return f"contains({field}, {_literal(str(value))})"
+        return f"{field} {self.op} {_literal(value)}"
+
+
+class ListingQuery:
+    """Set of predicates (plus optional raw OData expressions) combined with `and`"""
+
+    def __init__(self):
+        self._predicates: set = set()
+        self._raw: set = set()
+
+    def where(self, field: str, op: str, value: Any, lower: bool = False) -> "ListingQuery":
+        """Add a predicate; None values are ignored"""
+        if value is None:
+            return self
+        if op not in _OPERATOR_ORDER:
+            raise InvalidQuery(f"Unsupported operator '{op}'")
+        self._predicates.add(Predicate(validate_field(field, filterable=True), op, value, lower))
+        return self
+
+    def raw(self, expression: Optional[str]) -> "ListingQuery":
+        """Add a raw OData expression after checking the field names it references"""
+        if expression is None or not expression.strip() or expression.strip() == "1 eq 1":
+            return self
+        without_strings = _STRING_LITERAL.sub("''", expression)
+        for identifier in _IDENTIFIER.findall(without_strings):
+            if not _DATE.match(identifier):
+                validate_field(identifier, filterable=True)
+        self._raw.add(" ".join(expression.split()))
+        return self
+
+    def predicates(self) -> List[Predicate]:
+        """Normalized predicates: duplicates removed, only the tightest lower/upper bound per field, canonical order"""
+        bounds: Dict[tuple, Predicate] = {}
+        others = []
+        for predicate in self._predicates:
+            if predicate.op in ("ge", "gt", "le", "lt"):
+                key = (predicate.field, predicate.op, predicate.lower)
+                current = bounds.get(key)
+                tighter = max if predicate.op in ("ge", "gt") else min
+                if current is None or tighter(current.value, predicate.value) != current.value:
+                    bounds[key] = predicate
+            else:
+                others.append(predicate)
+        return sorted(others + list(bounds.values()), key=Predicate.sort_key)
+
+    def to_odata(self) -> str:
+        """Canonical `$filter` string; empty when there are no conditions"""
+        terms = [predicate.to_odata() for predicate in self.predicates()]
+        terms += [f"({expression})" for expression in sorted(self._raw)]
+        return " and ".join(terms)
+
+    @property
+    def cache_key(self) -> str:
+        return self.to_odata()
+
+    def __str__(self) -> str:
+        return self.to_odata()
+
+
+def build_listing_query(query: Optional[str] = "", **params: Any) -> ListingQuery:
+    """
+    Build a ListingQuery from the search tool parameters
+
+    Args:
+        query: Optional raw OData filter supplied by the caller
+        params: Search tool parameters (see PARAMETER_PREDICATES); None values are ignored
+    Returns:
+        The ListingQuery
+    Raises:
+        InvalidQuery: unknown parameter, field or value
+    """
+    listing_query = ListingQuery().raw(query)
+    for name, value in params.items():
+        if name not in PARAMETER_PREDICATES:
+            raise InvalidQuery(f"Unknown search parameter '{name}'")
+        if value is None:
+            continue
+        if name == "property_type" and value not in PROPERTY_TYPES:
+            raise InvalidQuery(f'property_type must be one of: {", ".join(PROPERTY_TYPES)}')
+        if name == "mls_status":
+            if value == "Any":
+                continue
+            if value not in MLS_STATUSES:
+                raise InvalidQuery('mls_status must be either "Active" or "Closed"')
+        field, op, lower = PARAMETER_PREDICATES[name]
+        listing_query.where(field, op, value, lower=lower)
+    return listing_query
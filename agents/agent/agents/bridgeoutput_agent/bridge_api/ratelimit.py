@@ -0,0 +1,172 @@
+"""Adaptive rate limiting and retry policy for the Bridge API.
+
+Bridge enforces request quotas per API key. Each key gets a token bucket that
+starts from a conservative default and then follows the rate-limit headers
+returned by the API; a 429 halves its rate, and successful responses grow it
+back to the initial rate. Throttled (429) and transient (5xx) responses are retried
+with jittered exponential backoff that honors `Retry-After`.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Mapping
+
+logger = logging.getLogger("bridge_api.ratelimit")
+
+DEFAULT_RATE = float(os.environ.get("BRIDGE_RATE_LIMIT_PER_SECOND", "5"))
+DEFAULT_BURST = float(os.environ.get("BRIDGE_RATE_LIMIT_BURST", "20"))
+
+# Status codes worth retrying: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Rate multiplier applied after each successful response, until the initial rate is back
+RECOVERY_FACTOR = 1.25
+
+# Header names used by Bridge (Application-RateLimit-*) and common alternatives
+_LIMIT_HEADERS = ("Application-RateLimit-Limit", "X-RateLimit-Limit", "RateLimit-Limit")
+_REMAINING_HEADERS = ("Application-RateLimit-Remaining", "X-RateLimit-Remaining", "RateLimit-Remaining")
+_RESET_HEADERS = ("Application-RateLimit-Reset", "X-RateLimit-Reset", "RateLimit-Reset")
+
+
+def _first_number(headers: Mapping[str, str], names) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value.split(",")[0].split(";")[0])
+            except ValueError:
+                continue
+    return None
+
+
+def _seconds_until(reset: float) -> float:
+    """Interpret a reset header as epoch milliseconds, epoch seconds or a delay in seconds"""
+    now = time.time()
+    if reset > 1e12:
+        return reset / 1000.0 - now
+    if reset > 1e9:
+        return reset - now
+    return reset
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delay in seconds or an HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Token bucket whose rate adapts to the quota reported by the server"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: float = DEFAULT_BURST, min_rate: float = 0.05):
+        """
+        Args:
+            rate: Initial refill rate in requests per second
+            capacity: Maximum burst size
+            min_rate: Lower bound for the adapted rate
+        """
+        self.rate = rate
+        self.initial_rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        # The rate follows the server's headers until the end of their window
+        self._server_rate_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        now = time.monotonic()
+        self._refill(now)
+        # Reserve a token up front (the balance may go negative) so concurrent
+        # callers queue up fairly without needing a lock
+        self.tokens -= 1
+        wait = max(self.blocked_until - now, -self.tokens / self.rate if self.tokens < 0 else 0.0)
+        if wait > 0:
+            logger.debug(f"Rate limiter delaying request by {wait:.2f}s")
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapt the rate to the remaining quota and reset time advertised by the server"""
+        remaining = _first_number(headers, _REMAINING_HEADERS)
+        if remaining is None:
+            return
+        limit = _first_number(headers, _LIMIT_HEADERS)
+        reset = _first_number(headers, _RESET_HEADERS)
+        now = time.monotonic()
+        self._refill(now)
+        if limit is not None:
+            self.capacity = max(1.0, min(limit, DEFAULT_BURST))
+        self.tokens = min(self.tokens, remaining)
+        if reset is not None:
+            window = _seconds_until(reset)
+            if window > 0:
+                # Spread what's left of the quota evenly over the rest of the window
+                self.rate = max(self.min_rate, remaining / window)
+                self._server_rate_until = now + window
+                if remaining <= 0:
+                    self.blocked_until = max(self.blocked_until, now + window)
+
+    def penalize(self, retry_after: Optional[float]) -> None:
+        """Back off after a 429: drain the bucket, halve the rate and honor Retry-After"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+        self.rate = max(self.min_rate, self.rate / 2)
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def record_success(self) -> None:
+        """Recover after a successful response: grow the rate back toward the initial rate"""
+        now = time.monotonic()
+        if self.rate >= self.initial_rate or now < self._server_rate_until or now < self.blocked_until:
+            return
+        self._refill(now)
+        self.rate = min(self.initial_rate, self.rate * RECOVERY_FACTOR)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff"""
+
+    def __init__(self, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        # "Full jitter": spreads concurrent retries instead of synchronizing them
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(api_key: str) -> TokenBucket:
+    """Return the token bucket shared by every client using this API key"""
+    limiter = _limiters.get(api_key)
+    if limiter is None:
+        limiter = _limiters[api_key] = TokenBucket()
+    return limiter
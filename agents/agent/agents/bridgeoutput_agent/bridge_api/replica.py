@@ -0,0 +1,483 @@
+"""Local replicated MLS listing store.
+
+Mirrors a Bridge dataset into an indexed SQLite database: an initial bulk
+backfill, then incremental syncs on BridgeModificationTimestamp. Progress is
+checkpointed after every page, so an interrupted sync resumes where it stopped.
+`BridgeAPIClient.search_listings` answers from the mirror while it is fresh.
+
+Usage:
+    python -m agent.agents.bridgeoutput_agent.bridge_api.replica sync --db listings.sqlite3
+    python -m agent.agents.bridgeoutput_agent.bridge_api.replica status --db listings.sqlite3
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from . import data
+from .geo import annotate_distance, bounding_box
+
+logger = logging.getLogger("bridge_api.replica")
+
+# Columns kept in the mirror: the main schema fields plus the ones the search tools filter on
+REPLICA_COLUMNS = list(dict.fromkeys(data.FIELDS + [
+    "BathroomsTotalDecimal",
+    "ParcelNumber",
+    "OnMarketDate",
+    "OffMarketDate",
+    "CloseDate",
+    "DaysOnMarket",
+    "ModificationTimestamp",
+    "BridgeModificationTimestamp",
+]))
+
+INDEXED_COLUMNS = [
+    "PostalCode",
+    "City",
+    "SubdivisionName",
+    "MlsStatus",
+    "ListPrice",
+    "ParcelNumber",
+    "BridgeModificationTimestamp",
+]
+
+DEFAULT_TIMESTAMP_FIELD = "BridgeModificationTimestamp"
+DEFAULT_MAX_STALENESS = float(os.environ.get("BRIDGE_REPLICA_MAX_STALENESS", "3600"))
+
+
+class UnsupportedQuery(ValueError):
+    """Raised when a query can't be answered from the mirror"""
+
+
+class ListingStore:
+    """SQLite mirror of the Property resource of one dataset"""
+
+    def __init__(self, path: str, dataset_id: str, max_staleness: float = DEFAULT_MAX_STALENESS):
+        """
+        Args:
+            path: SQLite database file
+            dataset_id: Bridge dataset ID being mirrored
+            max_staleness: Seconds after the last sync during which the mirror may answer searches
+        """
+        self.path = path
+        self.dataset_id = dataset_id
+        self.max_staleness = max_staleness
+        self._lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        columns = ", ".join(f'"{column}"' for column in REPLICA_COLUMNS if column != "ListingKey")
+        self._db.execute(f'CREATE TABLE IF NOT EXISTS listings ("ListingKey" TEXT PRIMARY KEY, {columns})')
+        existing = {row["name"] for row in self._db.execute("PRAGMA table_info(listings)")}
+        for column in REPLICA_COLUMNS:
+            if column not in existing:
+                self._db.execute(f'ALTER TABLE listings ADD COLUMN "{column}"')
+        for column in INDEXED_COLUMNS:
+            if column in REPLICA_COLUMNS:
+                self._db.execute(f'CREATE INDEX IF NOT EXISTS "listings_{column}" ON listings ("{column}")')
+        self._db.execute('CREATE INDEX IF NOT EXISTS listings_geo ON listings ("Latitude", "Longitude")')
+        self.has_rtree = self._create_rtree()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            "dataset_id TEXT PRIMARY KEY, watermark TEXT, synced_at REAL, backfill_complete INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+    def _create_rtree(self) -> bool:
+        """Spatial R-tree over listing coordinates, kept in sync by triggers; False when SQLite lacks R-tree support"""
+        exists = self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'listings_rtree'").fetchone()
+        if exists:
+            return True
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE listings_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite R-tree unavailable, geo searches use the B-tree index: {e}")
+            return False
+        has_point = 'new."Latitude" IS NOT NULL AND new."Longitude" IS NOT NULL'
+        self._db.executescript(f"""
+            CREATE TRIGGER listings_rtree_insert AFTER INSERT ON listings WHEN {has_point} BEGIN
+                INSERT OR REPLACE INTO listings_rtree VALUES (new.rowid, new."Latitude", new."Latitude", new."Longitude", new."Longitude");
+            END;
+            CREATE TRIGGER listings_rtree_update AFTER UPDATE OF "Latitude", "Longitude" ON listings BEGIN
+                DELETE FROM listings_rtree WHERE id = old.rowid;
+                INSERT INTO listings_rtree SELECT new.rowid, new."Latitude", new."Latitude", new."Longitude", new."Longitude" WHERE {has_point};
+            END;
+            CREATE TRIGGER listings_rtree_delete AFTER DELETE ON listings BEGIN
+                DELETE FROM listings_rtree WHERE id = old.rowid;
+            END;
+            INSERT INTO listings_rtree
+                SELECT rowid, "Latitude", "Latitude", "Longitude", "Longitude" FROM listings
+                WHERE "Latitude" IS NOT NULL AND "Longitude" IS NOT NULL;
+        """)
+        return True
+
+    # Sync state
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """Return the sync checkpoint: watermark, time of the last completed sync and backfill status"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM sync_state WHERE dataset_id = ?", (self.dataset_id,)).fetchone()
+        if row is None:
+            return {"dataset_id": self.dataset_id, "watermark": None, "synced_at": None, "backfill_complete": False}
+        return {**dict(row), "backfill_complete": bool(row["backfill_complete"])}
+
+    def _save_checkpoint(self, watermark: Optional[str], synced_at: Optional[float] = None, backfill_complete: Optional[bool] = None) -> None:
+        current = self.checkpoint()
+        self._db.execute(
+            "INSERT OR REPLACE INTO sync_state (dataset_id, watermark, synced_at, backfill_complete) VALUES (?, ?, ?, ?)",
+            (
+                self.dataset_id,
+                watermark,
+                synced_at if synced_at is not None else current["synced_at"],
+                int(backfill_complete if backfill_complete is not None else current["backfill_complete"]),
+            )
+        )
+
+    def is_fresh(self) -> bool:
+        """True when the backfill completed and the last sync is within max_staleness"""
+        state = self.checkpoint()
+        return bool(state["backfill_complete"] and state["synced_at"] and time.time() - state["synced_at"] <= self.max_staleness)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM listings").fetchone()[0]
+
+    # Writes
+
+    def upsert(self, records: List[Dict[str, Any]], watermark: Optional[str] = None) -> None:
+        """Insert or update records and advance the watermark in the same transaction"""
+        columns = REPLICA_COLUMNS
+        placeholders = ", ".join("?" for _ in columns)
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        # An upsert (rather than INSERT OR REPLACE) keeps rowids stable for the R-tree
+        updates = ", ".join(f'"{column}" = excluded."{column}"' for column in columns if column != "ListingKey")
+        rows = [tuple(record.get(column) for column in columns) for record in records if record.get("ListingKey")]
+        with self._lock:
+            self._db.executemany(
+                f'INSERT INTO listings ({quoted}) VALUES ({placeholders}) ON CONFLICT("ListingKey") DO UPDATE SET {updates}',
+                rows
+            )
+            if watermark is not None:
+                self._save_checkpoint(watermark)
+            self._db.commit()
+
+    def mark_synced(self, backfill_complete: bool = True) -> None:
+        with self._lock:
+            self._save_checkpoint(self.checkpoint()["watermark"], synced_at=time.time(), backfill_complete=backfill_complete)
+            self._db.commit()
+
+    def reset(self) -> None:
+        """Drop every mirrored listing and the checkpoint (for a full re-backfill)"""
+        with self._lock:
+            self._db.execute("DELETE FROM listings")
+            self._db.execute("DELETE FROM sync_state WHERE dataset_id = ?", (self.dataset_id,))
+            self._db.commit()
+
+    # Reads
+
+    def search(
+        self,
+        query: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        distance_miles: Optional[float] = None,
+        order_by: Optional[str] = None,
+        top: Optional[int] = None,
+        skip: Optional[int] = None,
+        select_fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Run a search_listings query against the mirror
+
+        With a geo search, candidates come from the spatial index and are then
+        filtered on the exact radius, annotated with `distance_km`.
+
+        Raises:
+            UnsupportedQuery: the filter, ordering or selected fields can't be served locally
+        """
+        fields = select_fields or REPLICA_COLUMNS
+        missing = [field for field in fields if field not in REPLICA_COLUMNS]
+        if missing:
+            raise UnsupportedQuery(f"Fields not mirrored: {missing}")
+        where, params = ODataToSQL(query).translate() if query and query.strip() else ("1", [])
+        geo = all(x is not None for x in [latitude, longitude, distance_miles])
+        if geo:
+            where, params = self._add_geo_filter(where, params, latitude, longitude, distance_miles)
+
+        columns = ", ".join(f'"{field}"' for field in fields)
+        sql = f"SELECT {columns} FROM listings WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {self._translate_order_by(order_by)}"
+        if not geo:
+            sql += " LIMIT ? OFFSET ?"
+            params += [top if top is not None else -1, skip or 0]
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        records = [dict(row) for row in rows]
+        if geo:
+            # Paging applies after the exact radius filter
+            records = list(annotate_distance(records, latitude, longitude, distance_miles))
+            start = skip or 0
+            records = records[start:start + top] if top is not None else records[start:]
+        return records
+
+    def _add_geo_filter(self, where: str, params: list, latitude: float, longitude: float, distance_miles: float) -> Tuple[str, list]:
+        min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, distance_miles)
+        if self.has_rtree:
+            where = (
+                f"({where}) AND rowid IN (SELECT id FROM listings_rtree "
+                "WHERE min_lat >= ? AND max_lat <= ? AND min_lon >= ? AND max_lon <= ?)"
+            )
+        else:
+            where = f'({where}) AND "Latitude" BETWEEN ? AND ? AND "Longitude" BETWEEN ? AND ?'
+        return where, params + [min_lat, max_lat, min_lon, max_lon]
+
+    @staticmethod
+    def _translate_order_by(order_by: str) -> str:
+        terms = []
+        for term in order_by.split(","):
+            parts = term.split()
+            if not parts or parts[0] not in REPLICA_COLUMNS or len(parts) > 2 or (len(parts) == 2 and parts[1].lower() not in ("asc", "desc")):
+                raise UnsupportedQuery(f"Unsupported $orderby: {order_by}")
+            terms.append(f'"{parts[0]}" {parts[1].upper() if len(parts) == 2 else "ASC"}')
+        return ", ".join(terms)
+
+
+_TOKEN = re.compile(r"\s*(?:(?P<string>'(?:[^']|'')*')|(?P<punct>[(),])|(?P<word>[^\s(),']+))")
+_COMPARISONS = {"eq": "=", "ne": "!=", "gt": ">", "ge": ">=", "lt": "<", "le": "<="}
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}(T[\d:.]+(Z|[+-]\d{2}:\d{2})?)?$")
+
+
+class ODataToSQL:
+    """Recursive-descent translator for the OData $filter subset produced by the search tools"""
+
+    def __init__(self, query: str):
+        self.tokens = self._tokenize(query)
+        self.pos = 0
+        self.params: List[Any] = []
+
+    @staticmethod
+    def _tokenize(query: str) -> List[str]:
+        tokens, pos = [], 0
+        query = query.strip()
+        while pos < len(query):
+            match = _TOKEN.match(query, pos)
+            if not match or match.end() == pos:
+                raise UnsupportedQuery(f"Can't tokenize filter at: {query[pos:]}")
+            tokens.append(match.group(match.lastgroup))
+            pos = match.end()
+            while pos < len(query) and query[pos].isspace():
+                pos += 1
+        return tokens
+
+    def translate(self) -> Tuple[str, List[Any]]:
+        sql = self._expression()
+        if self.pos != len(self.tokens):
+            raise UnsupportedQuery(f"Unexpected token: {self.tokens[self.pos]}")
+        return sql, self.params
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise UnsupportedQuery("Unexpected end of filter")
+        self.pos += 1
+        return token
+
+    def _expect(self, token: str) -> None:
+        if self._next() != token:
+            raise UnsupportedQuery(f"Expected '{token}'")
+
+    def _expression(self) -> str:
+        terms = [self._term()]
+        while self._peek() == "or":
+            self._next()
+            terms.append(self._term())
+        return terms[0] if len(terms) == 1 else "(" + " OR ".join(terms) + ")"
+
+    def _term(self) -> str:
+        factors = [self._factor()]
+        while self._peek() == "and":
+            self._next()
+            factors.append(self._factor())
+        return factors[0] if len(factors) == 1 else " AND ".join(factors)
+
+    def _factor(self) -> str:
+        token = self._peek()
+        if token == "(":
+            self._next()
+            inner = self._expression()
+            self._expect(")")
+            return f"({inner})"
+        if token == "not":
+            self._next()
+            return f"NOT {self._factor()}"
+        if token in ("contains", "startswith", "endswith"):
+            return self._string_function()
+        left = self._operand()
+        op = self._next()
+        if op not in _COMPARISONS:
+            raise UnsupportedQuery(f"Unsupported operator: {op}")
+        right = self._operand()
+        if right == "NULL":
+            return f"{left} IS {'NOT ' if op == 'ne' else ''}NULL"
+        return f"{left} {_COMPARISONS[op]} {right}"
+
+    def _string_function(self) -> str:
+        function = self._next()
+        self._expect("(")
+        column = self._operand()
+        self._expect(",")
+        value = self._operand()
+        self._expect(")")
+        pattern = {"contains": "'%' || {} || '%'", "startswith": "{} || '%'", "endswith": "'%' || {}"}[function]
+        return f"{column} LIKE {pattern.format(value)}"
+
+    def _operand(self) -> str:
+        token = self._next()
+        if token == "tolower" or token == "toupper":
+            self._expect("(")
+            inner = self._operand()
+            self._expect(")")
+            return f"{'lower' if token == 'tolower' else 'upper'}({inner})"
+        if token.startswith("'"):
+            self.params.append(token[1:-1].replace("''", "'"))
+            return "?"
+        if token == "null":
+            return "NULL"
+        if token in ("true", "false"):
+            self.params.append(1 if token == "true" else 0)
+            return "?"
+        if _NUMBER.match(token):
+            self.params.append(float(token) if "." in token else int(token))
+            return "?"
+        if _DATE.match(token):
+            self.params.append(token)
+            return "?"
+        if token in REPLICA_COLUMNS:
+            return f'"{token}"'
+        raise UnsupportedQuery(f"Field not mirrored or unsupported token: {token}")
+
+
+async def sync(
+    client,
+    store: ListingStore,
+    full: bool = False,
+    batch_size: int = 2000,
+    timestamp_field: str = DEFAULT_TIMESTAMP_FIELD
+) -> int:
+    """
+    Backfill or incrementally sync the mirror from the Bridge API
+
+    Walks the dataset in (BridgeModificationTimestamp, ListingKey) order,
+    re-querying after the last record of each batch so no deep $skip is needed;
+    the ListingKey tiebreak moves past batches that share one timestamp. The
+    watermark is committed with every page, so a failed run resumes from its
+    checkpoint.
+
+    Args:
+        client: BridgeAPIClient for the mirrored dataset (preferably without a response cache)
+        store: Destination ListingStore
+        full: Drop the mirror and re-run the backfill from scratch
+        batch_size: Records fetched per watermark query (at most the client's MAX_SEARCH_RECORDS)
+        timestamp_field: Modification timestamp used as watermark
+    Returns:
+        Number of records written
+    """
+    from .client import MAX_SEARCH_RECORDS
+
+    # search_listings_iter caps max_records; a larger batch would look short and end the sync early
+    batch_size = max(1, min(batch_size, MAX_SEARCH_RECORDS))
+    if full:
+        store.reset()
+    state = store.checkpoint()
+    backfill = not state["backfill_complete"]
+    watermark = state["watermark"]
+    written = 0
+    # ListingKey of the last record read at the watermark timestamp
+    cursor_key = None
+    logger.info(f"Starting {'backfill' if backfill else 'incremental sync'} of {store.dataset_id} from watermark {watermark}")
+    while True:
+        if watermark and cursor_key:
+            key = cursor_key.replace("'", "''")
+            query = f"{timestamp_field} gt {watermark} or ({timestamp_field} eq {watermark} and ListingKey gt '{key}')"
+        elif watermark:
+            # On resume, 'ge' re-reads the records sharing the watermark timestamp; upserts make that harmless
+            query = f"{timestamp_field} ge {watermark}"
+        else:
+            query = f"{timestamp_field} ne null"
+        page: List[Dict[str, Any]] = []
+        batch_count = 0
+        async for record in client.search_listings_iter(
+            query,
+            order_by=f"{timestamp_field} asc,ListingKey asc",
+            select_fields=REPLICA_COLUMNS,
+            max_records=batch_size
+        ):
+            page.append(record)
+            batch_count += 1
+            cursor_key = record.get("ListingKey") or cursor_key
+            if len(page) >= 200:
+                watermark = page[-1].get(timestamp_field) or watermark
+                await asyncio.to_thread(store.upsert, page, watermark)
+                written += len(page)
+                page = []
+        if page:
+            watermark = page[-1].get(timestamp_field) or watermark
+            await asyncio.to_thread(store.upsert, page, watermark)
+            written += len(page)
+        logger.info(f"Synced {written} records, watermark {watermark}")
+        if batch_count < batch_size:
+            break
+    store.mark_synced(backfill_complete=True)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+    from .client import BridgeAPIClient
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Maintain a local mirror of a Bridge MLS dataset")
+    parser.add_argument("command", choices=["sync", "status"])
+    parser.add_argument("--db", default=os.environ.get("BRIDGE_REPLICA_PATH", "bridge_listings.sqlite3"), help="SQLite database file")
+    parser.add_argument("--dataset", default=os.environ.get("BRIDGE_DATASET_ID"), help="Bridge dataset ID")
+    parser.add_argument("--full", action="store_true", help="Drop the mirror and backfill from scratch")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Records per watermark query (at most 2000)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if not args.dataset:
+        parser.error("--dataset or BRIDGE_DATASET_ID is required")
+    store = ListingStore(args.db, args.dataset)
+
+    if args.command == "status":
+        print({**store.checkpoint(), "listings": store.count(), "fresh": store.is_fresh()})
+        return 0
+
+    api_key = os.environ.get("BRIDGE_OUTPUT_DATA_API_KEY") or os.environ.get("BRIDGE_DATA_OUTPUT_API_KEY")
+
+    async def run() -> int:
+        async with BridgeAPIClient(api_key=api_key, dataset_id=args.dataset) as client:
+            return await sync(client, store, full=args.full, batch_size=args.batch_size)
+
+    written = asyncio.run(run())
+    print(f"Synced {written} listings into {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
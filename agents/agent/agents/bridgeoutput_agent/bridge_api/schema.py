@@ -0,0 +1,317 @@
+"""Typed registry of the Bridge Property fields.
+
+The registry is built lazily on first use, from the first of these sources
+that is available:
+
+1. A JSON snapshot previously written by `refresh_schema` (BRIDGE_SCHEMA_PATH),
+   which was parsed from the dataset's OData `$metadata`.
+2. The bundled field lists in `data.py`, with types inferred from the RESO
+   field naming conventions; `data` is only imported for this fallback (and
+   by a refresh, to order the main fields).
+
+The snapshot is refreshed lazily: `ensure_schema(client)`, awaited by the
+search tools, downloads `$metadata` once per process when the snapshot is
+missing or older than BRIDGE_SCHEMA_MAX_AGE seconds. It can also be
+refreshed on demand:
+
+    python -m agent.agents.bridgeoutput_agent.bridge_api.schema refresh --dataset <id>
+
+Every field maps to a `FieldInfo` (type, nullability, filterability) in a
+dict, so lookups are O(1). The payload served by the MCP schema resource is
+computed once and cached.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import NamedTuple, Optional, Dict, List, Iterator
+
+logger = logging.getLogger("bridge_api.schema")
+
+DEFAULT_SCHEMA_PATH = os.environ.get(
+    "BRIDGE_SCHEMA_PATH",
+    os.path.join(tempfile.gettempdir(), "bridge_api_schema.json")
+)
+
+# Snapshot age (seconds) after which ensure_schema refreshes it; 0 disables lazy refreshes
+SCHEMA_MAX_AGE = int(os.environ.get("BRIDGE_SCHEMA_MAX_AGE", str(7 * 24 * 3600)))
+
+_EDM_NAMESPACE = "{http://docs.oasis-open.org/odata/ns/edm}"
+
+# RESO naming conventions used to type the bundled field lists
+_TYPE_RULES = [
+    (re.compile(r"YN$"), "Edm.Boolean"),
+    (re.compile(r"Timestamp$"), "Edm.DateTimeOffset"),
+    (re.compile(r"Date$"), "Edm.Date"),
+    (re.compile(r"(Count|Total|Integer|Spaces|Stories|Year|YearBuilt|DaysOnMarket|Full|Half|Numeric|Quarter|Partial)$"), "Edm.Int32"),
+    (re.compile(r"(Price|Amount|Fee|Fee2|Value|Area|SquareFeet|Acres|Latitude|Longitude|Decimal|Rate|Percent)$"), "Edm.Decimal"),
+]
+
+
+class FieldInfo(NamedTuple):
+    """Type information for one Property field"""
+    name: str
+    type: str
+    nullable: bool = True
+    filterable: bool = True
+
+    @property
+    def is_collection(self) -> bool:
+        return self.type.startswith("Collection(")
+
+
+def infer_type(name: str) -> str:
+    """Best-effort EDM type for a RESO field name"""
+    for pattern, edm_type in _TYPE_RULES:
+        if pattern.search(name):
+            return edm_type
+    return "Edm.String"
+
+
+def parse_metadata(xml_text: str, entity_type: str = "Property") -> Dict[str, FieldInfo]:
+    """
+    Parse the fields of an entity type from an OData CSDL `$metadata` document
+
+    Args:
+        xml_text: The `$metadata` XML
+        entity_type: Name of the entity type to read
+    Returns:
+        Dict of field name to FieldInfo; complex and collection fields are not filterable
+    """
+    root = ET.fromstring(xml_text)
+    fields: Dict[str, FieldInfo] = {}
+    for entity in root.iter(f"{_EDM_NAMESPACE}EntityType"):
+        if entity.get("Name") != entity_type:
+            continue
+        for prop in entity:
+            if prop.tag not in (f"{_EDM_NAMESPACE}Property", f"{_EDM_NAMESPACE}NavigationProperty"):
+                continue
+            edm_type = prop.get("Type", "Edm.String")
+            fields[prop.get("Name")] = FieldInfo(
+                name=prop.get("Name"),
+                type=edm_type,
+                nullable=prop.get("Nullable", "true").lower() != "false",
+                filterable=edm_type.startswith("Edm.") and prop.tag.endswith("}Property"),
+            )
+    if not fields:
+        raise ValueError(f"No {entity_type} entity type found in $metadata")
+    return fields
+
+
+def _fields_from_data() -> Dict[str, FieldInfo]:
+    from . import data
+
+    names = list(data.FIELDS) + list(data.ALL_FIELDS)
+    # Nested collections (Media.MediaURL, ...) can only be selected as a whole
+    collections = {name.split(".", 1)[0] for name in names if "." in name}
+    fields: Dict[str, FieldInfo] = {}
+    for name in names:
+        name = name.split(".", 1)[0]
+        if name in fields:
+            continue
+        if name in collections:
+            fields[name] = FieldInfo(name, f"Collection({name})", filterable=False)
+        else:
+            fields[name] = FieldInfo(name, infer_type(name), nullable=name != "ListingKey")
+    return fields
+
+
+def _core_fields_from_data(fields: Dict[str, FieldInfo]) -> List[str]:
+    from . import data
+
+    return [name for name in data.FIELDS if name in fields]
+
+
+class SchemaRegistry:
+    """Lazily loaded field registry with O(1) lookups"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_SCHEMA_PATH):
+        """
+        Args:
+            path: JSON snapshot written by `refresh_schema`; the bundled data.py lists are used when missing
+        """
+        self.path = path or None
+        self.source: Optional[str] = None
+        self._fields: Optional[Dict[str, FieldInfo]] = None
+        self._core_fields: Optional[List[str]] = None
+        self._payload: Optional[str] = None
+        self._lock = threading.Lock()
+        # Set once ensure_schema has checked (and possibly refreshed) the snapshot in this process
+        self.refresh_checked = False
+
+    @property
+    def fields(self) -> Dict[str, FieldInfo]:
+        """Field name -> FieldInfo; loaded on first access"""
+        if self._fields is None:
+            with self._lock:
+                if self._fields is None:
+                    self._load()
+        return self._fields
+
+    def _load(self) -> None:
+        fields = core_fields = None
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                fields = {entry["name"]: FieldInfo(**entry) for entry in snapshot["fields"]}
+                core_fields = snapshot.get("core_fields")
+                self.source = self.path
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable schema snapshot {self.path}: {e}")
+                fields = None
+        if fields is None:
+            fields = _fields_from_data()
+            self.source = "data.py"
+        if core_fields is None:
+            core_fields = _core_fields_from_data(fields)
+        self._core_fields = [name for name in core_fields if name in fields]
+        self._fields = fields
+        logger.debug(f"Loaded {len(fields)} fields from {self.source}")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.fields
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def get(self, name: str) -> Optional[FieldInfo]:
+        return self.fields.get(name)
+
+    @property
+    def core_fields(self) -> List[str]:
+        """Main listing fields, in data.FIELDS order"""
+        if self._fields is None:
+            self.fields
+        return list(self._core_fields)
+
+    def payload(self) -> str:
+        """JSON served by the mls://schema/ resource: the main fields with their types; computed once"""
+        if self._payload is None:
+            self._payload = json.dumps([
+                {"name": info.name, "type": info.type, "nullable": info.nullable, "filterable": info.filterable}
+                for info in (self.fields[name] for name in self.core_fields)
+            ])
+        return self._payload
+
+    def is_stale(self, max_age: float = SCHEMA_MAX_AGE) -> bool:
+        """True when there is no snapshot, or it was written more than max_age seconds ago"""
+        if not self.path or not os.path.exists(self.path):
+            return True
+        return time.time() - os.path.getmtime(self.path) > max_age
+
+    def replace(self, fields: Dict[str, FieldInfo], source: str) -> None:
+        """Swap in a new field set (e.g. freshly parsed $metadata) and persist it as the snapshot"""
+        core_fields = _core_fields_from_data(fields)
+        with self._lock:
+            self._fields = fields
+            self._core_fields = core_fields
+            self._payload = None
+            self.source = source
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"fields": [info._asdict() for info in fields.values()], "core_fields": core_fields}, f)
+            os.replace(tmp_path, self.path)
+
+
+async def refresh_schema(client, registry: Optional["SchemaRegistry"] = None) -> SchemaRegistry:
+    """
+    Download the dataset's `$metadata`, parse it and store it as the registry snapshot
+
+    Args:
+        client: BridgeAPIClient
+        registry: Registry to update (defaults to the process-wide one)
+    Returns:
+        The updated registry
+    """
+    registry = registry if registry is not None else get_schema()
+    url = f"{client.base_url}/$metadata"
+    fields = parse_metadata((await client._fetch(url, headers={"Accept": "application/xml"})).decode("utf-8"))
+    registry.replace(fields, url)
+    logger.info(f"Schema refreshed from {url}: {len(fields)} fields")
+    return registry
+
+
+async def ensure_schema(client, registry: Optional["SchemaRegistry"] = None, max_age: float = SCHEMA_MAX_AGE) -> SchemaRegistry:
+    """
+    Refresh the snapshot from `$metadata` when it is missing or stale; checked once per process
+
+    A failed refresh is logged and the registry keeps its current fields (the
+    stale snapshot or the bundled lists).
+
+    Args:
+        client: BridgeAPIClient
+        registry: Registry to check (defaults to the process-wide one)
+        max_age: Snapshot age in seconds after which it is refreshed; 0 disables refreshing
+    Returns:
+        The registry
+    """
+    registry = registry if registry is not None else get_schema()
+    if registry.refresh_checked or max_age <= 0:
+        return registry
+    # Set before awaiting, so concurrent callers don't refresh again
+    registry.refresh_checked = True
+    if registry.is_stale(max_age):
+        try:
+            await refresh_schema(client, registry)
+        except Exception as e:
+            logger.warning(f"Schema refresh failed, keeping {registry.source or 'the current fields'}: {e}")
+    return registry
+
+
+_default_schema: Optional[SchemaRegistry] = None
+
+
+def get_schema() -> SchemaRegistry:
+    """Return the process-wide schema registry"""
+    global _default_schema
+    if _default_schema is None:
+        _default_schema = SchemaRegistry()
+    return _default_schema
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+    from .client import BridgeAPIClient
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Refresh the Bridge Property field snapshot from $metadata")
+    parser.add_argument("command", choices=["refresh", "status"])
+    parser.add_argument("--dataset", default=os.environ.get("BRIDGE_DATASET_ID"), help="Bridge dataset ID")
+    parser.add_argument("--path", default=DEFAULT_SCHEMA_PATH, help="Snapshot file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    registry = SchemaRegistry(args.path)
+
+    if args.command == "status":
+        print({"path": args.path, "fields": len(registry), "source": registry.source, "stale": registry.is_stale()})
+        return 0
+
+    if not args.dataset:
+        parser.error("--dataset or BRIDGE_DATASET_ID is required")
+    api_key = os.environ.get("BRIDGE_OUTPUT_DATA_API_KEY") or os.environ.get("BRIDGE_DATA_OUTPUT_API_KEY")
+
+    async def run() -> SchemaRegistry:
+        async with BridgeAPIClient(api_key=api_key, dataset_id=args.dataset) as client:
+            return await refresh_schema(client, registry)
+
+    asyncio.run(run())
+    print(f"Wrote {len(registry)} fields to {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Column statistics of a comparables table.
+
+`comparables_stats` computes, with NumPy over whole columns:
+
+- per column: count, mean, standard deviation, min, max and quartiles;
+- per cell: z-score and percentile rank within the comparables, and whether
+  the value deviates strongly from the others (|z| >= `high_deviation_z`);
+- per cell: a better / worse / different / same flag against the base
+  property, using DIRECTIONS (e.g. a larger living area is better).
+
+The report renders these directly, so none of it is left to the LLM.
+"""
+from typing import NamedTuple, Optional, Dict, Any, List, Sequence, Union
+
+import numpy as np
+
+from .models import ListingBatch
+
+# 1: higher is better, -1: lower is better, 0: no better/worse (only "different")
+DIRECTIONS = {
+    "LivingArea": 1,
+    "LotSizeSquareFeet": 1,
+    "BedroomsTotal": 1,
+    "BathroomsTotalDecimal": 1,
+    "YearBuilt": 1,
+    "ListPrice": 0,
+    "ClosePrice": 0,
+    "DaysOnMarket": 0,
+    "distance_km": -1,
+}
+
+STAT_FIELDS = tuple(DIRECTIONS)
+
+# Absolute differences under which two values count as the same
+DEFAULT_TOLERANCES = {
+    "BathroomsTotalDecimal": 0.01,
+    "distance_km": 0.01,
+}
+
+HIGH_DEVIATION_Z = 1.5
+
+BETTER = "better"
+WORSE = "worse"
+DIFFERENT = "different"
+SAME = "same"
+
+
+class ColumnStats(NamedTuple):
+    """Summary of one numeric column over the comparables"""
+    field: str
+    count: int
+    mean: Optional[float]
+    std: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    p25: Optional[float]
+    p50: Optional[float]
+    p75: Optional[float]
+
+
+class TableStats(NamedTuple):
+    """Statistics of a comparables table; per-cell arrays are indexed like the comparables"""
+    columns: Dict[str, ColumnStats]
+    z_scores: Dict[str, np.ndarray]
+    percentiles: Dict[str, np.ndarray]
+    high_deviation: Dict[str, np.ndarray]
+    flags: Dict[str, List[Optional[str]]]
+
+    def cell(self, field: str, index: int) -> Dict[str, Any]:
+        """Statistics of one comparable's value; None where the value is missing"""
+        z = self.z_scores[field][index]
+        percentile = self.percentiles[field][index]
+        return {
+            "z": None if np.isnan(z) else round(float(z), 2),
+            "percentile": None if np.isnan(percentile) else round(float(percentile)),
+            "high_deviation": bool(self.high_deviation[field][index]),
+            "flag": self.flags[field][index],
+        }
+
+
+def column_stats(field: str, values: np.ndarray) -> ColumnStats:
+    valid = values[~np.isnan(values)]
+    if not len(valid):
+        return ColumnStats(field, 0, None, None, None, None, None, None, None)
+    p25, p50, p75 = np.percentile(valid, [25, 50, 75])
+    # Sample standard deviation: the comparables are a sample of the market
+    std = valid.std(ddof=1) if len(valid) > 1 else 0.0
+    return ColumnStats(field, len(valid), float(valid.mean()), float(std), float(valid.min()), float(valid.max()), float(p25), float(p50), float(p75))
+
+
+def z_scores(values: np.ndarray, stats: ColumnStats) -> np.ndarray:
+    """Z-score of every value; 0 when the column has no spread, NaN where missing"""
+    if not stats.count or not stats.std:
+        return np.where(np.isnan(values), np.nan, 0.0)
+    return (values - stats.mean) / stats.std
+
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Percentile rank (0-100) of every value within its column; ties share the mid rank"""
+    valid = np.sort(values[~np.isnan(values)])
+    ranks = np.full(len(values), np.nan)
+    if not len(valid):
+        return ranks
+    present = ~np.isnan(values)
+    below = np.searchsorted(valid, values[present], side="left")
+    not_above = np.searchsorted(valid, values[present], side="right")
+    ranks[present] = (below + not_above) / 2 / len(valid) * 100
+    return ranks
+
+
+def compare_to_base(values: np.ndarray, base_value: Optional[float], direction: int, tolerance: float = 0.0) -> List[Optional[str]]:
+    """Flag every value against the base property's; None where either side is missing"""
+    if base_value is None:
+        return [None] * len(values)
+    deltas = values - float(base_value)
+    same = np.abs(deltas) <= tolerance
+    if direction:
+        better = deltas * direction > 0
+        labels = np.where(same, SAME, np.where(better, BETTER, WORSE))
+    else:
+        labels = np.where(same, SAME, DIFFERENT)
+    return [None if missing else str(label) for missing, label in zip(np.isnan(values), labels)]
+
+
+def comparables_stats(
+    base: Dict[str, Any],
+    comparables: Union[ListingBatch, Sequence[Dict[str, Any]]],
+    fields: Sequence[str] = STAT_FIELDS,
+    directions: Optional[Dict[str, int]] = None,
+    tolerances: Optional[Dict[str, float]] = None,
+    high_deviation_z: float = HIGH_DEVIATION_Z
+) -> TableStats:
+    """
+    Compute the statistics of a comparables table
+
+    Args:
+        base: Base property with the listing field names
+        comparables: Comparables (a ListingBatch or dicts)
+        fields: Numeric fields to analyze
+        directions: Overrides for DIRECTIONS
+        tolerances: Overrides for DEFAULT_TOLERANCES
+        high_deviation_z: |z-score| from which a value counts as a high deviation
+    Returns:
+        TableStats
+    """
+    if not isinstance(comparables, ListingBatch):
+        comparables = ListingBatch.from_records(comparables)
+    directions = {**DIRECTIONS, **(directions or {})}
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    columns, scores, percentiles, high_deviation, flags = {}, {}, {}, {}, {}
+    for field in fields:
+        values = comparables.numeric(field)
+        stats = columns[field] = column_stats(field, values)
+        scores[field] = z_scores(values, stats)
+        percentiles[field] = percentile_ranks(values)
+        with np.errstate(invalid="ignore"):
+            high_deviation[field] = np.abs(scores[field]) >= high_deviation_z
+        base_value = base.get(field)
+        flags[field] = compare_to_base(
+            values,
+            float(base_value) if base_value is not None else None,
+            directions.get(field, 0),
+            tolerances.get(field, 0.0),
+        )
+    return TableStats(columns, scores, percentiles, high_deviation, flags)
@@ -0,0 +1,236 @@
+"""Incremental JSON decoding of Bridge responses.
+
+`RecordStream` is fed the response body chunk by chunk and returns listing
+records as soon as each one is complete, instead of buffering and parsing the
+whole page. Members listed in `skip_fields` (e.g. the nested `Media` array)
+are scanned past without ever being decoded, and their bytes are dropped as
+they stream in, so memory per request is bounded by one record rather than
+by the page size.
+"""
+import json
+import re
+from json.decoder import scanstring
+from typing import Optional, Dict, Any, List, Iterable
+
+_WHITESPACE = " \t\r\n"
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r'[\s,\]}]')
+
+
+class _ValueScanner:
+    """Resumable scan for the end of a single JSON value"""
+
+    def __init__(self):
+        self.started = False
+        self.scalar = False
+        self.in_string = False
+        self.depth = 0
+
+    def scan(self, buf: str, pos: int):
+        """Return (position, done); when not done, call again with more data from `position`"""
+        n = len(buf)
+        while pos < n:
+            if self.in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    return n, False
+                if match.group() == "\\":
+                    if match.end() >= n:
+                        # Resume on the backslash once the escaped character arrives
+                        return match.start(), False
+                    pos = match.end() + 1
+                    continue
+                self.in_string = False
+                pos = match.end()
+                if self.depth == 0:
+                    return pos, True
+                continue
+            if not self.started:
+                char = buf[pos]
+                if char in _WHITESPACE:
+                    pos += 1
+                    continue
+                self.started = True
+                if char == '"':
+                    self.in_string = True
+                elif char in "[{":
+                    self.depth = 1
+                else:
+                    self.scalar = True
+                pos += 1
+                continue
+            if self.scalar:
+                match = _SCALAR_END.search(buf, pos)
+                if match is None:
+                    return n, False
+                return match.start(), True
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                return n, False
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos, True
+        return pos, False
+
+
+class RecordStream:
+    """
+    Push parser for `{"value": [record, ...], ...}` bodies (or a single record object)
+
+    Feed it text chunks; each call returns the records completed so far. Other
+    top-level members (e.g. `@odata.nextLink`) are collected in `metadata`.
+    """
+
+    def __init__(self, array_key: Optional[str] = "value", skip_fields: Optional[Iterable[str]] = None):
+        """
+        Args:
+            array_key: Top-level member holding the records; None when the body is itself a single record
+            skip_fields: Record members to skip without decoding (e.g. ["Media"])
+        """
+        self.array_key = array_key
+        self.skip_fields = frozenset(skip_fields or ())
+        self.reset()
+
+    def reset(self) -> None:
+        """Discard all parse state, to decode a new body from its start (e.g. a retried request)"""
+        self.metadata: Dict[str, Any] = {}
+        self.records_parsed = 0
+        self._buf = ""
+        self._pos = 0
+        self._state = "start"
+        # 0 = top-level object, 1 = record object
+        self._level = 0
+        self._record: Dict[str, Any] = {}
+        self._key: Optional[str] = None
+        self._keep = True
+        self._scanner: Optional[_ValueScanner] = None
+        self._scan_pos = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of the body and return the records it completed"""
+        # Drop everything already consumed; a kept value in progress starts at _pos
+        self._buf = self._buf[self._pos:] + text
+        self._scan_pos -= self._pos
+        self._pos = 0
+        records: List[Dict[str, Any]] = []
+        while self._state != "done" and self._step(records):
+            pass
+        return records
+
+    def close(self) -> None:
+        """Raise ValueError if the body ended before the JSON document was complete"""
+        if self._state != "done":
+            raise ValueError("Truncated JSON response")
+
+    def _skip_whitespace(self) -> Optional[str]:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buf[pos] if pos < len(buf) else None
+
+    def _step(self, records: List[Dict[str, Any]]) -> bool:
+        """Advance the state machine; False when more data is needed"""
+        if self._state == "value":
+            return self._step_value()
+        char = self._skip_whitespace()
+        if char is None:
+            return False
+
+        if self._state == "start":
+            if char != "{":
+                raise ValueError(f"Expected a JSON object, got {char!r}")
+            self._pos += 1
+            self._level = 0 if self.array_key is not None else 1
+            self._state = "key"
+            return True
+
+        if self._state == "key":
+            if char == ",":
+                self._pos += 1
+                return True
+            if char == "}":
+                self._pos += 1
+                if self._level == 1:
+                    records.append(self._record)
+                    self.records_parsed += 1
+                    self._record = {}
+                    self._level = 0
+                    self._state = "array" if self.array_key is not None else "done"
+                else:
+                    self._state = "done"
+                return True
+            if char != '"':
+                raise ValueError(f"Expected a member name, got {char!r}")
+            try:
+                key, end = scanstring(self._buf, self._pos + 1)
+            except json.JSONDecodeError:
+                return False
+            while end < len(self._buf) and self._buf[end] in _WHITESPACE:
+                end += 1
+            if end >= len(self._buf):
+                return False
+            if self._buf[end] != ":":
+                raise ValueError(f"Expected ':' after member {key!r}")
+            self._pos = end + 1
+            if self._level == 0 and key == self.array_key:
+                self._state = "array_start"
+                return True
+            self._key = key
+            self._keep = not (self._level == 1 and key in self.skip_fields)
+            self._scanner = _ValueScanner()
+            self._scan_pos = self._pos
+            self._state = "value"
+            return True
+
+        if self._state == "array_start":
+            if char != "[":
+                raise ValueError(f"Expected an array for {self.array_key!r}, got {char!r}")
+            self._pos += 1
+            self._state = "array"
+            return True
+
+        if self._state == "array":
+            if char == ",":
+                self._pos += 1
+            elif char == "]":
+                self._pos += 1
+                self._state = "key"
+            elif char == "{":
+                self._pos += 1
+                self._level = 1
+                self._state = "key"
+            else:
+                raise ValueError(f"Expected a record object, got {char!r}")
+            return True
+
+        raise ValueError(f"Unexpected parser state {self._state}")
+
+    def _step_value(self) -> bool:
+        end, complete = self._scanner.scan(self._buf, self._scan_pos)
+        self._scan_pos = end
+        if not self._keep:
+            # Skipped members are never buffered beyond the current chunk
+            self._pos = end
+        if not complete:
+            return False
+        if self._keep:
+            value = json.loads(self._buf[self._pos:end])
+            target = self._record if self._level == 1 else self.metadata
+            target[self._key] = value
+        self._pos = end
+        self._scanner = None
+        self._state = "key"
+        return True
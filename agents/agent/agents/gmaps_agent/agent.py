@@ -1,8 +1,9 @@
 # ./adk_agent_samples/mcp_agent/agent.py
 import os
 from google.adk.agents import LlmAgent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
 from dotenv import load_dotenv
+from agent.agents.gmaps_agent import geocode_cache
+from agent import mcp_pool
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,22 +28,15 @@ root_agent = LlmAgent(
     model='gemini-2.0-flash',
     name='maps_assistant_agent',
     instruction='Georeference and normalize addresses',
+    # Shared with the MLS agent, which runs next in the same branch
+    output_key=geocode_cache.NORMALIZED_ADDRESS_KEY,
+    # Known addresses skip the LLM turn and the Maps server altogether
+    before_agent_callback=geocode_cache.before_agent_callback,
+    after_agent_callback=geocode_cache.after_agent_callback,
+    before_tool_callback=geocode_cache.before_tool_callback,
+    after_tool_callback=geocode_cache.after_tool_callback,
     tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command='npx',
-                args=[
-                    "-y",
-                    "@modelcontextprotocol/server-google-maps",
-                ],
-                # Pass the API key as an environment variable to the npx process
-                # This is how the MCP server for Google Maps expects the key.
-                env={
-                    "GOOGLE_MAPS_API_KEY": google_maps_api_key
-                }
-            ),
-            # You can filter for specific Maps tools if needed:
-            # tool_filter=['get_directions', 'find_place_by_id']
-        )
+        # Shared, pre-spawned Maps server (see agent/mcp_pool.py)
+        mcp_pool.google_maps_toolset(google_maps_api_key),
     ],
 )
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""Persistent geocoding cache for the Maps tools.
+
+Addresses are canonicalized (case, punctuation, whitespace and common street
+suffixes), and geocoding results are stored on disk with the normalized
+address, coordinates and place ID. The callbacks below plug the cache into
+any agent that uses the Google Maps MCP toolset:
+
+- `before_tool_callback` answers `maps_geocode` calls from the cache, so the
+  MCP subprocess is never called for a known address.
+- `after_tool_callback` stores fresh geocoding results.
+- `before_agent_callback` / `after_agent_callback` let the gmaps agent skip
+  its LLM turn entirely when the same address was normalized before.
+"""
+import json
+import logging
+import os
+import re
+from typing import Optional, Dict, Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+import google.genai.types as types
+
+from agent.kvcache import KVCache
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_CACHE_TTL = float(os.environ.get("GEOCODE_CACHE_TTL", str(30 * 24 * 60 * 60)))
+
+# Maps MCP tools whose `address` argument is cached
+GEOCODE_TOOLS = {"maps_geocode"}
+
+# State key the gmaps agent writes its answer to (its output_key)
+NORMALIZED_ADDRESS_KEY = "normalized_address"
+
+_SUFFIXES = {
+    "street": "st",
+    "avenue": "ave",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "road": "rd",
+    "lane": "ln",
+    "court": "ct",
+    "place": "pl",
+    "terrace": "ter",
+    "circle": "cir",
+    "highway": "hwy",
+    "parkway": "pkwy",
+    "north": "n",
+    "south": "s",
+    "east": "e",
+    "west": "w",
+    "apartment": "apt",
+    "suite": "ste",
+}
+_PUNCTUATION = re.compile(r"[.,#;:]+")
+
+geocode_cache = KVCache("geocode", ttl=GEOCODE_CACHE_TTL)
+normalized_address_cache = KVCache("normalized_address", ttl=GEOCODE_CACHE_TTL)
+
+
+def canonical_address(raw: str) -> str:
+    """Canonical cache key for a raw address, e.g. '123 Main Street, Miami' -> '123 main st miami'"""
+    words = _PUNCTUATION.sub(" ", raw.lower()).split()
+    return " ".join(_SUFFIXES.get(word, word) for word in words)
+
+
+def _as_dict(response: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(response, dict):
+        return response
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json", exclude_none=True)
+    return None
+
+
+def _geocode_entry(response: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Extract the normalized address, coordinates and place ID from a maps_geocode result"""
+    if response.get("isError") or response.get("is_error"):
+        return None
+    for part in response.get("content") or []:
+        try:
+            result = json.loads(part.get("text") or "")
+        except (TypeError, ValueError):
+            continue
+        location = result.get("location") or {}
+        if "lat" in location and "lng" in location:
+            return {
+                "normalized_address": result.get("formatted_address"),
+                "lat": location["lat"],
+                "lon": location["lng"],
+                "place_id": result.get("place_id"),
+            }
+    return None
+
+
+def before_tool_callback(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> Optional[Dict]:
+    """Answer geocoding calls for known addresses without calling the Maps server"""
+    if tool.name not in GEOCODE_TOOLS or not args.get("address"):
+        return None
+    cached = geocode_cache.get(canonical_address(args["address"]))
+    if cached is None:
+        return None
+    logger.debug(f"Geocode cache hit for: {args['address']}")
+    return cached["response"]
+
+
+def after_tool_callback(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any) -> Optional[Dict]:
+    """Store successful geocoding results"""
+    if tool.name not in GEOCODE_TOOLS or not args.get("address"):
+        return None
+    response = _as_dict(tool_response)
+    entry = _geocode_entry(response) if response is not None else None
+    if entry is not None:
+        geocode_cache.set(canonical_address(args["address"]), {**entry, "response": response})
+    return None
+
+
+def user_text(callback_context: CallbackContext) -> Optional[str]:
+    """The text of the message that started this run"""
+    content = callback_context.user_content
+    if content is None or not content.parts:
+        return None
+    text = " ".join(part.text for part in content.parts if part.text)
+    return text or None
+
+
+def before_agent_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Skip the agent when this address was already normalized; its previous answer is reused"""
+    text = user_text(callback_context)
+    if text is None:
+        return None
+    cached = normalized_address_cache.get(canonical_address(text))
+    if cached is None:
+        return None
+    logger.debug(f"Normalized address cache hit for: {text}")
+    callback_context.state[NORMALIZED_ADDRESS_KEY] = cached
+    return types.Content(role="model", parts=[types.Part(text=cached)])
+
+
+def after_agent_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Remember the agent's answer for this address"""
+    text = user_text(callback_context)
+    answer = callback_context.state.get(NORMALIZED_ADDRESS_KEY)
+    if text is not None and answer:
+        normalized_address_cache.set(canonical_address(text), answer)
+    return None
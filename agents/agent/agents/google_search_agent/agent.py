@@ -3,6 +3,8 @@ from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types
 from google.adk.tools import google_search
+from agent.agents.google_search_agent import search_cache
+from agent import state_refs
 
 root_agent = Agent(
     name="basic_search_agent",
@@ -14,7 +16,11 @@ root_agent = Agent(
     Find last sold date and price; property features (like pool, garden, shed; renovations done or needed, etc). 
     Other information that could be useful: robberies, murders, fires,etc.
     Don't assume anything, only return facts""",
-    output_key="website_data",
+    output_key=search_cache.WEBSITE_DATA_KEY,
+    # Re-runs for an already researched property skip the search entirely;
+    # the findings are then moved out of session state, which keeps a handle
+    before_agent_callback=state_refs.offloading(search_cache.before_agent_callback, search_cache.WEBSITE_DATA_KEY),
+    after_agent_callback=state_refs.offloading(search_cache.after_agent_callback, search_cache.WEBSITE_DATA_KEY),
     tools=[google_search]
 )
 
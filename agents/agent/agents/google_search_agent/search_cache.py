@@ -0,0 +1,86 @@
+"""Persistent cache of the web search agent's `website_data`.
+
+Regenerating a report for the same property reuses the previous search
+results instead of running the search-grounded LLM call again. Entries are
+keyed on the canonical address (see `geocode_cache.canonical_address`):
+
+- the address as the user typed it, which is all that is known when the
+  search runs (it runs in parallel with the Maps normalization), and
+- the Maps-normalized address, when this text was normalized before (see
+  `geocode_cache.normalized_address_cache`), so differently typed versions of
+  an already geocoded address share the same entry.
+
+`state["normalized_address"]` is not used: the search runs alongside the
+Maps agent, so in a session's second run it still holds the previous
+property's address.
+
+A refresh is forced with WEBSITE_DATA_REFRESH=1 or by setting the
+`refresh_website_data` state key to a truthy value.
+"""
+import logging
+import os
+from typing import Optional, List
+
+from google.adk.agents.callback_context import CallbackContext
+import google.genai.types as types
+
+from agent.kvcache import KVCache
+from agent.agents.gmaps_agent import geocode_cache
+from agent.agents.gmaps_agent.geocode_cache import canonical_address, user_text
+
+logger = logging.getLogger(__name__)
+
+WEBSITE_DATA_CACHE_TTL = float(os.environ.get("WEBSITE_DATA_CACHE_TTL", str(7 * 24 * 60 * 60)))
+WEBSITE_DATA_REFRESH = os.environ.get("WEBSITE_DATA_REFRESH", "").lower() in ("1", "true", "yes")
+
+# State key the search agent writes its answer to (its output_key)
+WEBSITE_DATA_KEY = "website_data"
+# State flag that bypasses the cache for the current run
+REFRESH_KEY = "refresh_website_data"
+
+website_data_cache = KVCache("website_data", ttl=WEBSITE_DATA_CACHE_TTL)
+
+
+def _cache_keys(callback_context: CallbackContext) -> List[str]:
+    """Cache keys for the address of this run, most specific first"""
+    text = user_text(callback_context)
+    if text is None:
+        return []
+    keys = []
+    normalized = geocode_cache.normalized_address_cache.get(canonical_address(text))
+    if normalized:
+        keys.append(canonical_address(normalized))
+    key = canonical_address(text)
+    if key not in keys:
+        keys.append(key)
+    return keys
+
+
+def _refresh_requested(callback_context: CallbackContext) -> bool:
+    return WEBSITE_DATA_REFRESH or bool(callback_context.state.get(REFRESH_KEY))
+
+
+def before_agent_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Skip the search when this property was researched before; the previous answer is reused"""
+    if _refresh_requested(callback_context):
+        return None
+    for key in _cache_keys(callback_context):
+        cached = website_data_cache.get(key)
+        if isinstance(cached, str):
+            logger.debug(f"Website data cache hit for: {key}")
+            callback_context.state[WEBSITE_DATA_KEY] = cached
+            return types.Content(role="model", parts=[types.Part(text=cached)])
+    return None
+
+
+def after_agent_callback(callback_context: CallbackContext) -> Optional[types.Content]:
+    """Remember the search results for this property"""
+    answer = callback_context.state.get(WEBSITE_DATA_KEY)
+    if not answer or not isinstance(answer, str):
+        # Nothing to cache, or already offloaded to a state_refs handle
+        return None
+    for key in _cache_keys(callback_context):
+        website_data_cache.set(key, answer)
+    if callback_context.state.get(REFRESH_KEY):
+        callback_context.state[REFRESH_KEY] = False
+    return None
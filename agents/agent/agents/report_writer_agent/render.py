@@ -0,0 +1,311 @@
+"""Deterministic rendering of the comparables report.
+
+The HTML layout lives in `templates/report.html.j2` and is compiled once per
+process (and cached as bytecode across processes). Everything that can be
+computed is computed here rather than by the LLM:
+
+- property cards and the summary table from the structured base property and
+  the ranked comparables returned by `find_comparables`;
+- the `highlight-diff` / `highlight-better-diff` / `highlight-worse-diff`
+  and `highdeviation` classes, and the column means and standard deviations,
+  from `bridge_api.stats`;
+- the Google Maps links and the static map URL with one marker per property.
+
+The LLM only writes the narrative (summary, additional features, notes and
+sources), which `parse_narrative` reads from its JSON answer.
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Optional, Dict, Any, List, Iterator
+from urllib.parse import urlencode
+
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+
+from agent.agents.bridgeoutput_agent.bridge_api.comparables import subdivision_key
+from agent.agents.bridgeoutput_agent.bridge_api.stats import comparables_stats, TableStats, BETTER, WORSE, DIFFERENT
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+REPORT_TEMPLATE = "report.html.j2"
+
+STATIC_MAP_URL = "https://maps.googleapis.com/maps/api/staticmap"
+MAPS_SEARCH_URL = "https://www.google.com/maps/search/"
+
+SQFT_PER_ACRE = 43560
+
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)\s*```", re.S)
+
+
+def _number(value: Any, digits: int = 0) -> str:
+    return f"{float(value):,.{digits}f}"
+
+
+def _short(value: Any, digits: int = 1) -> str:
+    """3 -> '3', 2.5 -> '2.5', 1987.333 -> '1987.3'"""
+    return f"{round(float(value), digits):g}"
+
+
+def _acres(value: Any) -> str:
+    return f"{float(value) / SQFT_PER_ACRE:.2f} acres"
+
+
+def _price(value: Any) -> str:
+    return f"${_number(value)}"
+
+
+def _distance(value: Any) -> str:
+    return f"{float(value):.2f} km"
+
+
+# (label, field, formatter) of the features compared against the base property
+FEATURES = [
+    ("Bedrooms", "BedroomsTotal", _short),
+    ("Bathrooms", "BathroomsTotalDecimal", lambda value: _short(value, 2)),
+    ("Living Area", "LivingArea", lambda value: f"{_number(value)} sq ft"),
+    ("Lot Size", "LotSizeSquareFeet", _acres),
+    ("Year Built", "YearBuilt", _short),
+]
+
+# (label, field, formatter) of the other columns of the summary table, only checked for high deviation
+MARKET_COLUMNS = [
+    ("Asking Price", "ListPrice", _price),
+    ("Days on Market", "DaysOnMarket", _short),
+    ("Distance", "distance_km", _distance),
+]
+
+_FLAG_CLASSES = {
+    BETTER: "highlight-diff highlight-better-diff",
+    WORSE: "highlight-diff highlight-worse-diff",
+    DIFFERENT: "highlight-diff",
+}
+
+_environment: Optional[Environment] = None
+
+
+def get_environment() -> Environment:
+    """Template environment; templates are compiled on first use and kept for the life of the process"""
+    global _environment
+    if _environment is None:
+        _environment = Environment(
+            loader=FileSystemLoader(TEMPLATES_PATH),
+            autoescape=select_autoescape(["html", "j2"]),
+            bytecode_cache=FileSystemBytecodeCache(tempfile.gettempdir(), "report_template_%s.cache"),
+            auto_reload=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+    return _environment
+
+
+def format_address(record: Dict[str, Any]) -> Optional[str]:
+    """'123 Main St, Miami, FL 33101' from the listing address fields"""
+    street = " ".join(str(record[field]) for field in ("StreetNumber", "StreetName", "StreetSuffix") if record.get(field))
+    if record.get("UnitNumber"):
+        street = f"{street} #{record['UnitNumber']}"
+    region = " ".join(str(record[field]) for field in ("StateOrProvince", "PostalCode") if record.get(field))
+    parts = [part for part in (street, record.get("City"), region) if part]
+    return ", ".join(parts) or None
+
+
+def maps_link(address: Optional[str], record: Dict[str, Any]) -> Optional[str]:
+    if address:
+        query = address
+    elif record.get("Latitude") is not None and record.get("Longitude") is not None:
+        query = f"{record['Latitude']},{record['Longitude']}"
+    else:
+        return None
+    return f"{MAPS_SEARCH_URL}?{urlencode({'api': 1, 'query': query})}"
+
+
+# Ranks 1-9 fit a static map marker label
+MAX_LABELED_MARKERS = 9
+
+
+def _marker_location(property_view: Dict[str, Any]) -> Optional[str]:
+    record = property_view["record"]
+    if record.get("Latitude") is not None and record.get("Longitude") is not None:
+        return f"{record['Latitude']},{record['Longitude']}"
+    return property_view["address"]
+
+
+def static_map_url(base: Dict[str, Any], comparables: List[Dict[str, Any]], api_key: Optional[str]) -> Optional[str]:
+    """Static map with a red "B" marker for the base property and blue markers numbered by rank for the comparables
+
+    Marker labels are a single character, so comparables ranked after MAX_LABELED_MARKERS get
+    small unlabeled markers rather than a digit that would repeat an earlier rank.
+    """
+    markers = []
+    location = _marker_location(base)
+    if location:
+        markers.append(f"color:red|label:B|{location}")
+    for property_view in comparables:
+        location = _marker_location(property_view)
+        if location:
+            if property_view["rank"] <= MAX_LABELED_MARKERS:
+                markers.append(f"color:blue|label:{property_view['rank']}|{location}")
+            else:
+                markers.append(f"size:small|color:blue|{location}")
+    if not markers or not api_key:
+        return None
+    return f"{STATIC_MAP_URL}?{urlencode([('size', '600x300'), *(('markers', marker) for marker in markers), ('key', api_key)])}"
+
+
+def diff_class(base_value: Any, value: Any) -> str:
+    """"highlight-diff" when a comparable's text value differs from the base property's"""
+    if base_value is None or value is None:
+        return ""
+    return "" if str(base_value).strip().lower() == str(value).strip().lower() else "highlight-diff"
+
+
+def _cell(stats: TableStats, field: str, index: int, flagged: bool = True) -> Dict[str, str]:
+    """CSS classes and tooltip of a comparable's value"""
+    cell = stats.cell(field, index)
+    classes = [_FLAG_CLASSES.get(cell["flag"], "")] if flagged else []
+    if cell["high_deviation"]:
+        classes.append("highdeviation")
+    title = f"z = {cell['z']}, {cell['percentile']}th percentile" if cell["z"] is not None else ""
+    return {"class": " ".join(c for c in classes if c), "title": title}
+
+
+def _column_summary(stats: TableStats, label: str, field: str, formatter) -> Dict[str, Any]:
+    column = stats.columns[field]
+    return {
+        "label": label,
+        "mean": formatter(column.mean) if column.mean is not None else None,
+        "std": formatter(column.std) if column.std is not None else None,
+    }
+
+
+def _property_view(record: Dict[str, Any], address: Optional[str], features: List[str]) -> Dict[str, Any]:
+    address = address or format_address(record)
+    return {
+        "record": record,
+        "address": address,
+        "maps_link": maps_link(address, record),
+        "subdivision": record.get("SubdivisionName"),
+        "features": [
+            {"label": label, "field": field, "value": formatter(record[field]) if record.get(field) is not None else None, "class": "", "title": ""}
+            for label, field, formatter in FEATURES
+        ],
+        "market": [
+            {"label": label, "field": field, "value": formatter(record[field]) if record.get(field) is not None else None, "class": "", "title": ""}
+            for label, field, formatter in MARKET_COLUMNS
+        ],
+        "additional_features": [{"text": text, "class": ""} for text in features],
+        "list_price": _price(record["ListPrice"]) if record.get("ListPrice") is not None else None,
+        "close_price": _price(record["ClosePrice"]) if record.get("ClosePrice") is not None else None,
+        "days_on_market": record.get("DaysOnMarket"),
+        "status": record.get("MlsStatus"),
+    }
+
+
+def build_context(
+    base: Dict[str, Any],
+    comparables: List[Dict[str, Any]],
+    narrative: Optional[Dict[str, Any]] = None,
+    base_address: Optional[str] = None,
+    api_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Template context for the report
+
+    Args:
+        base: Base property, with listing field names
+        comparables: Ranked comparables as returned by `find_comparables`
+        narrative: Sections written by the LLM (see `parse_narrative`)
+        base_address: Normalized base property address, when the base record has no address fields
+        api_key: Google Maps API key for the static map
+    Returns:
+        Dict passed to the report template
+    """
+    narrative = narrative or {}
+    features = narrative.get("features") or {}
+    base_view = _property_view(base, base_address, narrative.get("base_features") or [])
+    base_features = {feature["text"].strip().lower() for feature in base_view["additional_features"]}
+    base_subdivision = subdivision_key(base.get("SubdivisionName"))
+    stats = comparables_stats(base, comparables, [field for _, field, _ in FEATURES + MARKET_COLUMNS])
+
+    comparable_views = []
+    for rank, record in enumerate(comparables, start=1):
+        view = _property_view(record, None, features.get(str(record.get("ListingId"))) or [])
+        view["rank"] = rank
+        view["distance"] = _distance(record["distance_km"]) if record.get("distance_km") is not None else None
+        view["score"] = record.get("score")
+        if base_subdivision:
+            view["subdivision_class"] = "" if base_subdivision in (record.get("SubdivisionName") or "").upper() else "highlight-diff"
+        else:
+            view["subdivision_class"] = diff_class(base.get("SubdivisionName"), record.get("SubdivisionName"))
+        for feature in view["features"]:
+            feature.update(_cell(stats, feature["field"], rank - 1))
+        for column in view["market"]:
+            column.update(_cell(stats, column["field"], rank - 1, flagged=False))
+        for feature in view["additional_features"]:
+            if base_features and feature["text"].strip().lower() not in base_features:
+                feature["class"] = "highlight-diff"
+        comparable_views.append(view)
+
+    return {
+        "base": base_view,
+        "comparables": comparable_views,
+        "map_url": static_map_url(base_view, comparable_views, api_key),
+        "max_labeled_markers": MAX_LABELED_MARKERS,
+        "column_summaries": [_column_summary(stats, label, field, formatter) for label, field, formatter in FEATURES + MARKET_COLUMNS],
+        "summary": _paragraphs(narrative.get("summary")),
+        "notes": narrative.get("notes") or [],
+        "sources": narrative.get("sources") or [],
+        "estimated_value": narrative.get("estimated_value"),
+    }
+
+
+def _paragraphs(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [paragraph.strip() for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value if item]
+
+
+def parse_narrative(text: str) -> Dict[str, Any]:
+    """
+    Read the narrative sections from the LLM answer
+
+    The answer is expected to be a JSON object (optionally in a ```json fence) with
+    "summary", "base_features", "features" (ListingId -> list), "notes", "sources"
+    and "estimated_value"; any other answer is used as the summary.
+    """
+    fenced = _JSON_FENCE.search(text)
+    payload = fenced.group(1) if fenced else text.strip()
+    try:
+        narrative = json.loads(payload)
+    except ValueError:
+        narrative = None
+    if not isinstance(narrative, dict):
+        logger.warning("Report narrative is not a JSON object; using it as the summary")
+        return {"summary": text.strip()}
+    return {
+        "summary": narrative.get("summary") or "",
+        "base_features": _as_list(narrative.get("base_features")),
+        "features": {str(key): _as_list(value) for key, value in (narrative.get("features") or {}).items()},
+        "notes": _as_list(narrative.get("notes")),
+        "sources": _as_list(narrative.get("sources")),
+        "estimated_value": narrative.get("estimated_value"),
+    }
+
+
+def stream_report(context: Dict[str, Any]) -> Iterator[str]:
+    """Render the report incrementally; yields HTML chunks as the template is evaluated"""
+    return get_environment().get_template(REPORT_TEMPLATE).generate(**context)
+
+
+def render_report(context: Dict[str, Any]) -> str:
+    return "".join(stream_report(context))
@@ -0,0 +1,503 @@
+"""Content-addressed, compressed artifact service.
+
+`ContentAddressedArtifactService` implements ADK's artifact service on top
+of a plain blob store:
+
+- every artifact payload is stored once, under its SHA-256, compressed with
+  gzip (or brotli when installed and selected) unless it is already a
+  compressed format; identical reports share one blob across versions,
+  sessions and users;
+- saving a payload identical to the latest version of the same file returns
+  that version instead of creating a new one;
+- each file's versions are a small JSON manifest pointing at blobs.
+
+`open_artifact` returns the stored bytes as they are, with the matching
+Content-Encoding header, so HTTP handlers can serve reports without
+decompressing them (main.py serves it under
+`/artifact-content/{app}/{user}/{session}/{name}`).
+Deleted artifacts leave their blobs behind until `collect_garbage()` runs:
+main.py runs it every ARTIFACT_GC_INTERVAL seconds, or on demand with
+
+    python -m agent.artifact_store gc [cas-uri]
+
+Blob stores: `LocalBlobStore` (a directory, the default) and `GCSBlobStore`
+(a bucket, used when ARTIFACT_STORE_BUCKET is set).
+
+`register_service_scheme()` makes the service available to ADK's service
+registry as `cas://` URIs; main.py registers it and serves the app with
+ARTIFACT_SERVICE_URI (default `cas://`):
+
+- `cas://`: `get_artifact_service()`, configured from the environment;
+- `cas:///path/to/dir`: a local directory;
+- `cas://bucket/prefix`: a Cloud Storage bucket.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlparse, unquote
+
+from google.adk.artifacts.base_artifact_service import BaseArtifactService, ArtifactVersion
+import google.genai.types as types
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_STORE_PATH = os.environ.get(
+    "ARTIFACT_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "agent_artifacts")
+)
+ARTIFACT_STORE_BUCKET = os.environ.get("ARTIFACT_STORE_BUCKET")
+ARTIFACT_COMPRESSION = os.environ.get("ARTIFACT_COMPRESSION", "gzip")
+# Unreferenced blobs younger than this (seconds) are kept: another process may be about to write their manifest
+ARTIFACT_GC_MIN_AGE = int(os.environ.get("ARTIFACT_GC_MIN_AGE", "3600"))
+
+# URI scheme registered with ADK's service registry
+SERVICE_SCHEME = "cas"
+
+# Payloads smaller than this are stored uncompressed
+COMPRESS_MIN_BYTES = 256
+
+# Formats that are already compressed
+_INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/")
+_INCOMPRESSIBLE_TYPES = {"application/zip", "application/gzip", "application/pdf", "application/x-brotli"}
+
+# Prefix of in-progress local writes, which are never listed
+_PARTIAL_PREFIX = ".partial-"
+
+# Content-Encoding -> blob key suffix
+_SUFFIXES = {"gzip": ".gz", "br": ".br", "identity": ""}
+
+
+class LocalBlobStore:
+    """Blob store in a local directory; writes are atomic (write to a temp file, then rename)"""
+
+    def __init__(self, root: str = ARTIFACT_STORE_PATH):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def uri(self, key: str) -> str:
+        return "file://" + os.path.abspath(self._path(key))
+
+    def modified(self, key: str) -> Optional[float]:
+        """Last write time (epoch seconds), or None when the key doesn't exist"""
+        try:
+            return os.path.getmtime(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key: str, data: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=_PARTIAL_PREFIX, dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix: str) -> List[str]:
+        """Keys under a prefix ending with '/'"""
+        base = self._path(prefix)
+        keys = []
+        for directory, _, files in os.walk(base):
+            relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            keys.extend(f"{relative}/{name}" for name in files if not name.startswith(_PARTIAL_PREFIX))
+        return keys
+
+
+class GCSBlobStore:
+    """Blob store in a Cloud Storage bucket; blobs carry their Content-Encoding, so GCS can serve them as-is"""
+
+    def __init__(self, bucket_name: str = ARTIFACT_STORE_BUCKET, prefix: str = ""):
+        from google.cloud import storage
+
+        self.bucket = storage.Client().bucket(bucket_name)
+        self.prefix = prefix
+
+    def exists(self, key: str) -> bool:
+        return self.bucket.blob(self.prefix + key).exists()
+
+    def uri(self, key: str) -> str:
+        return f"gs://{self.bucket.name}/{self.prefix}{key}"
+
+    def modified(self, key: str) -> Optional[float]:
+        blob = self.bucket.get_blob(self.prefix + key)
+        return blob.updated.timestamp() if blob is not None and blob.updated else None
+
+    def read(self, key: str) -> Optional[bytes]:
+        blob = self.bucket.blob(self.prefix + key)
+        if not blob.exists():
+            return None
+        # raw_download: return the stored (compressed) bytes, without transcoding
+        return blob.download_as_bytes(raw_download=True)
+
+    def write(self, key: str, data: bytes, content_type: Optional[str] = None, content_encoding: Optional[str] = None) -> None:
+        blob = self.bucket.blob(self.prefix + key)
+        if content_encoding and content_encoding != "identity":
+            blob.content_encoding = content_encoding
+        blob.upload_from_string(data, content_type=content_type or "application/octet-stream")
+
+    def delete(self, key: str) -> None:
+        blob = self.bucket.blob(self.prefix + key)
+        if blob.exists():
+            blob.delete()
+
+    def list(self, prefix: str) -> List[str]:
+        return [blob.name[len(self.prefix):] for blob in self.bucket.list_blobs(prefix=self.prefix + prefix)]
+
+
+def compress(data: bytes, mime_type: str, encoding: str = ARTIFACT_COMPRESSION) -> Tuple[bytes, str]:
+    """
+    Compress a payload for storage
+
+    Args:
+        data: Uncompressed payload
+        mime_type: Payload type; already compressed formats are stored as-is
+        encoding: "gzip" or "br" (falls back to gzip when brotli is not installed)
+    Returns:
+        Tuple of (stored bytes, Content-Encoding)
+    """
+    if len(data) < COMPRESS_MIN_BYTES or mime_type.startswith(_INCOMPRESSIBLE_PREFIXES) or mime_type in _INCOMPRESSIBLE_TYPES:
+        return data, "identity"
+    if encoding == "br" and brotli is not None:
+        compressed = brotli.compress(data)
+    else:
+        # mtime=0 keeps the output deterministic for identical payloads
+        compressed, encoding = gzip.compress(data, mtime=0), "gzip"
+    if len(compressed) >= len(data):
+        return data, "identity"
+    return compressed, encoding
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        if brotli is None:
+            raise RuntimeError("brotli is required to read this artifact")
+        return brotli.decompress(data)
+    return data
+
+
+def _payload(artifact: types.Part) -> Tuple[bytes, str, bool]:
+    """(bytes, mime type, is text) of an artifact Part"""
+    if artifact.inline_data is not None:
+        return artifact.inline_data.data, artifact.inline_data.mime_type or "application/octet-stream", False
+    if artifact.text is not None:
+        return artifact.text.encode("utf-8"), "text/plain", True
+    raise ValueError("Artifact has neither inline data nor text")
+
+
+class ContentAddressedArtifactService(BaseArtifactService):
+    """ADK artifact service storing de-duplicated, compressed blobs in a blob store"""
+
+    def __init__(self, store=None, compression: str = ARTIFACT_COMPRESSION):
+        """
+        Args:
+            store: LocalBlobStore, GCSBlobStore or any object with exists/uri/modified/read/write/delete/list
+            compression: "gzip" or "br"
+        """
+        self.store = store if store is not None else LocalBlobStore()
+        self.compression = compression
+        self.stats = {"saves": 0, "deduplicated_versions": 0, "shared_blobs": 0, "bytes_in": 0, "bytes_stored": 0}
+        # Serializes manifest read-modify-write within the process
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _manifest_prefix(app_name: str, user_id: str, session_id: Optional[str], filename: Optional[str] = None) -> str:
+        # "user:" artifacts are shared by all the sessions of a user
+        if filename is not None and filename.startswith("user:"):
+            session_id = "user"
+        prefix = f"manifests/{app_name}/{user_id}/{session_id or 'user'}/"
+        return prefix if filename is None else prefix + filename + ".json"
+
+    def _read_manifest(self, key: str) -> List[Dict[str, Any]]:
+        data = self.store.read(key)
+        return json.loads(data) if data else []
+
+    def _blob_key(self, digest: str, encoding: str) -> str:
+        return f"blobs/{digest[:2]}/{digest}{_SUFFIXES[encoding]}"
+
+    def _existing_blob(self, digest: str) -> Optional[str]:
+        """Encoding of the stored blob for a digest, or None when it is not stored"""
+        for encoding in _SUFFIXES:
+            if self.store.exists(self._blob_key(digest, encoding)):
+                return encoding
+        return None
+
+    def _save(
+        self,
+        app_name: str,
+        user_id: str,
+        session_id: Optional[str],
+        filename: str,
+        artifact: types.Part,
+        custom_metadata: Optional[Dict[str, Any]] = None
+    ) -> int:
+        data, mime_type, is_text = _payload(artifact)
+        digest = hashlib.sha256(data).hexdigest()
+        key = self._manifest_prefix(app_name, user_id, session_id, filename)
+        with self._lock:
+            versions = self._read_manifest(key)
+            self.stats["saves"] += 1
+            self.stats["bytes_in"] += len(data)
+            latest = versions[-1] if versions else None
+            if latest and latest["sha256"] == digest and latest["mime_type"] == mime_type and latest.get("custom_metadata", {}) == (custom_metadata or {}):
+                self.stats["deduplicated_versions"] += 1
+                return latest["version"]
+            encoding = self._existing_blob(digest)
+            if encoding is None:
+                stored, encoding = compress(data, mime_type, self.compression)
+                self.store.write(self._blob_key(digest, encoding), stored, content_type=mime_type, content_encoding=encoding)
+                self.stats["bytes_stored"] += len(stored)
+            else:
+                self.stats["shared_blobs"] += 1
+            version = latest["version"] + 1 if latest else 0
+            versions.append({
+                "version": version,
+                "sha256": digest,
+                "mime_type": mime_type,
+                "encoding": encoding,
+                "size": len(data),
+                "text": is_text,
+                "custom_metadata": custom_metadata or {},
+                "created_at": time.time(),
+            })
+            self.store.write(key, json.dumps(versions).encode("utf-8"), content_type="application/json")
+        logger.debug(f"Saved artifact {filename} v{version} ({len(data)} bytes, {encoding}, blob {digest[:12]})")
+        return version
+
+    def _entry(self, app_name: str, user_id: str, session_id: Optional[str], filename: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        versions = self._read_manifest(self._manifest_prefix(app_name, user_id, session_id, filename))
+        if not versions:
+            return None
+        if version is None:
+            return versions[-1]
+        return next((entry for entry in versions if entry["version"] == version), None)
+
+    def _artifact_version(self, entry: Dict[str, Any]) -> ArtifactVersion:
+        return ArtifactVersion(
+            version=entry["version"],
+            canonical_uri=self.store.uri(self._blob_key(entry["sha256"], entry["encoding"])),
+            custom_metadata=entry.get("custom_metadata") or {},
+            create_time=entry.get("created_at") or 0.0,
+            mime_type=entry["mime_type"],
+        )
+
+    def _load(self, app_name: str, user_id: str, session_id: Optional[str], filename: str, version: Optional[int]) -> Optional[types.Part]:
+        entry = self._entry(app_name, user_id, session_id, filename, version)
+        if entry is None:
+            return None
+        stored = self.store.read(self._blob_key(entry["sha256"], entry["encoding"]))
+        if stored is None:
+            logger.error(f"Blob {entry['sha256']} of artifact {filename} v{entry['version']} is missing")
+            return None
+        data = decompress(stored, entry["encoding"])
+        if entry.get("text"):
+            return types.Part(text=data.decode("utf-8"))
+        return types.Part.from_bytes(data=data, mime_type=entry["mime_type"])
+
+    def _list_keys(self, app_name: str, user_id: str, session_id: Optional[str]) -> List[str]:
+        keys = set()
+        prefixes = {self._manifest_prefix(app_name, user_id, session_id), self._manifest_prefix(app_name, user_id, "user")}
+        for prefix in prefixes:
+            for key in self.store.list(prefix):
+                name = key[len(prefix):]
+                if name.endswith(".json") and "/" not in name:
+                    keys.add(name[:-len(".json")])
+        return sorted(keys)
+
+    def _delete(self, app_name: str, user_id: str, session_id: Optional[str], filename: str) -> None:
+        # Blobs may be shared with other artifacts; collect_garbage() removes the unreferenced ones
+        with self._lock:
+            self.store.delete(self._manifest_prefix(app_name, user_id, session_id, filename))
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: types.Part,
+        session_id: Optional[str] = None,
+        custom_metadata: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> int:
+        return await asyncio.to_thread(self._save, app_name, user_id, session_id, filename, artifact, custom_metadata)
+
+    async def load_artifact(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None, version: Optional[int] = None, **kwargs) -> Optional[types.Part]:
+        return await asyncio.to_thread(self._load, app_name, user_id, session_id, filename, version)
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: Optional[str] = None, **kwargs) -> List[str]:
+        return await asyncio.to_thread(self._list_keys, app_name, user_id, session_id)
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None, **kwargs) -> None:
+        await asyncio.to_thread(self._delete, app_name, user_id, session_id, filename)
+
+    async def list_versions(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None, **kwargs) -> List[int]:
+        versions = await asyncio.to_thread(self._read_manifest, self._manifest_prefix(app_name, user_id, session_id, filename))
+        return [entry["version"] for entry in versions]
+
+    async def list_artifact_versions(self, *, app_name: str, user_id: str, filename: str, session_id: Optional[str] = None, **kwargs) -> List[ArtifactVersion]:
+        versions = await asyncio.to_thread(self._read_manifest, self._manifest_prefix(app_name, user_id, session_id, filename))
+        return [self._artifact_version(entry) for entry in versions]
+
+    async def get_artifact_version(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+        **kwargs
+    ) -> Optional[ArtifactVersion]:
+        entry = await asyncio.to_thread(self._entry, app_name, user_id, session_id, filename, version)
+        return self._artifact_version(entry) if entry is not None else None
+
+    async def open_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+        accept_encoding: str = ""
+    ) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """
+        Stored bytes of an artifact and the HTTP headers to serve them with
+
+        Args:
+            accept_encoding: The request's Accept-Encoding header; the blob is decompressed when the client doesn't accept its encoding
+        Returns:
+            Tuple of (body, headers), or None when the artifact doesn't exist
+        """
+        entry = await asyncio.to_thread(self._entry, app_name, user_id, session_id, filename, version)
+        if entry is None:
+            return None
+        body = await asyncio.to_thread(self.store.read, self._blob_key(entry["sha256"], entry["encoding"]))
+        if body is None:
+            return None
+        encoding = entry["encoding"]
+        accepted = {token.split(";")[0].strip() for token in accept_encoding.split(",")}
+        if encoding != "identity" and encoding not in accepted and "*" not in accepted:
+            body, encoding = decompress(body, encoding), "identity"
+        headers = {
+            "Content-Type": entry["mime_type"],
+            "Content-Length": str(len(body)),
+            "ETag": f'"{entry["sha256"]}"',
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return body, headers
+
+    def collect_garbage(self, min_age: float = ARTIFACT_GC_MIN_AGE) -> int:
+        """
+        Delete blobs no manifest refers to
+
+        Args:
+            min_age: Keep unreferenced blobs written less than this many seconds ago
+        Returns:
+            Number of blobs deleted
+        """
+        cutoff = time.time() - min_age
+        with self._lock:
+            referenced = set()
+            for key in self.store.list("manifests/"):
+                for entry in self._read_manifest(key):
+                    referenced.add(self._blob_key(entry["sha256"], entry["encoding"]))
+            removed = 0
+            for key in self.store.list("blobs/"):
+                if key in referenced:
+                    continue
+                modified = self.store.modified(key)
+                if modified is not None and modified <= cutoff:
+                    self.store.delete(key)
+                    removed += 1
+        logger.info(f"Artifact GC removed {removed} unreferenced blobs")
+        return removed
+
+
+_default_service: Optional[ContentAddressedArtifactService] = None
+# Services created from URIs, so the app and its routes share one instance per URI
+_uri_services: Dict[str, ContentAddressedArtifactService] = {}
+
+
+def get_artifact_service() -> ContentAddressedArtifactService:
+    """Process-wide artifact service: GCS when ARTIFACT_STORE_BUCKET is set, else ARTIFACT_STORE_PATH"""
+    global _default_service
+    if _default_service is None:
+        store = GCSBlobStore(ARTIFACT_STORE_BUCKET) if ARTIFACT_STORE_BUCKET else LocalBlobStore(ARTIFACT_STORE_PATH)
+        _default_service = ContentAddressedArtifactService(store)
+    return _default_service
+
+
+def create_artifact_service(uri: str, **kwargs) -> ContentAddressedArtifactService:
+    """
+    Artifact service for a `cas://` URI; the factory registered with ADK's service registry
+
+    Args:
+        uri: `cas://` (environment configuration), `cas:///path/to/dir` or `cas://bucket/prefix`
+    Returns:
+        ContentAddressedArtifactService, the same instance for the same URI
+    """
+    parsed = urlparse(uri)
+    path = unquote(parsed.path)
+    if not parsed.netloc and not path:
+        return get_artifact_service()
+    if uri not in _uri_services:
+        if parsed.netloc:
+            prefix = path.strip("/")
+            store = GCSBlobStore(parsed.netloc, prefix + "/" if prefix else "")
+        else:
+            store = LocalBlobStore(path)
+        _uri_services[uri] = ContentAddressedArtifactService(store)
+    return _uri_services[uri]
+
+
+def register_service_scheme() -> None:
+    """Register `cas://` artifact URIs with ADK's service registry (`--artifact_service_uri`)"""
+    from google.adk.cli.service_registry import get_service_registry
+
+    get_service_registry().register_artifact_service(SERVICE_SCHEME, create_artifact_service)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the content-addressed artifact store")
+    parser.add_argument("command", choices=["gc"], help="gc: delete blobs no artifact refers to")
+    parser.add_argument("uri", nargs="?", default=f"{SERVICE_SCHEME}://", help="Store URI (default: configured from the environment)")
+    parser.add_argument("--min-age", type=float, default=ARTIFACT_GC_MIN_AGE, help="Keep unreferenced blobs younger than this (seconds)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(f"Removed {create_artifact_service(args.uri).collect_garbage(args.min_age)} unreferenced blobs")
@@ -1,12 +1,19 @@
 from dotenv import load_dotenv
 import os
-from .src.bridge_api.client import BridgeAPIClient
-from .src.bridge_api import data 
+from .src.bridge_api.client import BridgeAPIClient, get_shared_client, close_shared_clients
+from .src.bridge_api.schema import get_schema
+from .src.bridge_api.query import build_listing_query, InvalidQuery
+from .src.bridge_api.profiles import ProfileName
+from .src.bridge_api.models import compact_listing, compact_listing_entries, compact_records, to_json
+from .src.bridge_api.compact import compact_value
+from .src.bridge_api.cache import get_default_cache
+from .src.bridge_api.comparables import find_comparables as rank_comparables
 import json
-from typing import Optional, Literal, List
-from enum import Enum
+from typing import Optional, Literal, List, Dict
+from functools import partial
 import logging
 import sys
+from contextlib import asynccontextmanager
 from fastmcp.server.context import Context
 from fastmcp.server.dependencies import get_http_headers
 # from src.flood_api.client import FloodZonesClient
@@ -31,17 +38,26 @@ load_dotenv()
 
 from fastmcp import FastMCP
 
-mcp = FastMCP("RE MCP")
-mcp.logger = logger
+@asynccontextmanager
+async def lifespan(server):
+    """Keep the pooled Bridge clients alive for the server lifetime and close them on shutdown"""
+    try:
+        yield
+    finally:
+        await close_shared_clients()
 
-class PropertyType(str, Enum):
-    RESIDENTIAL = "Residential"
-    COMMERCIAL = "Commercial"
+mcp = FastMCP("RE MCP", lifespan=lifespan)
+mcp.logger = logger
 
 @mcp.resource("mls://schema/")
 def mls_schema() -> str:
-    """Fields available to filter"""
-    return json.dumps(data.FIELDS)
+    """Fields available to filter, with their types"""
+    return get_schema().payload()
+
+@mcp.resource("mls://cache/stats")
+def mls_cache_stats() -> str:
+    """Hit/miss counters of the Bridge response cache"""
+    return json.dumps(get_default_cache().stats)
 
 def get_bridge_api_credentials():
     """
@@ -68,18 +84,24 @@ def get_bridge_api_credentials():
     return api_key, dataset_id
 
 @mcp.tool()
-async def mls_listing(listing_id: str, ctx: Context = None) -> str:
+async def mls_listing(listing_id: str, profile: Optional[ProfileName] = None, ctx: Context = None) -> str:
     """Return the listing details for a given ListingId; 
     
-    This includes property information, photos, broker contact details, on market date, off market date, asking price, closing price, and more.
+    This includes property information, broker contact details, on market date, off market date, asking price, closing price, and more.
+    Photos and virtual tours are only returned with the "media" profile. Pass a profile to get only the fields you need.
+
+    Args:
+        listing_id: The MLS listing ID
+        profile: Optional named field set instead of the full listing: "summary" (status, prices, address, main features, remarks, days on market), "comparable" (comparable scoring fields), "valuation" (price history, dates, taxes, HOA), "media" (photos and virtual tours) or "agent-contact" (listing/buyer agent and office)
     """
-    logger.debug(f"Fetching MLS listing with ID: {listing_id}")
+    logger.debug(f"Fetching MLS listing with ID: {listing_id} (profile={profile})")
     api_key, dataset_id = get_bridge_api_credentials()
-    client = BridgeAPIClient(api_key=api_key, dataset_id=dataset_id)
+    client = get_shared_client(api_key=api_key, dataset_id=dataset_id)
     try:
-        listing_data = await client.get_listing(listing_id)
+        # The full record's Media arrays are skipped while streaming; the "media" profile selects them
+        listing_data = await client.get_listing(listing_id, profile=profile, skip_fields=None if profile else ["Media"])
         logger.debug(f"Successfully retrieved listing data for ID {listing_id}")
-        return json.dumps(listing_data, indent=2)
+        return to_json(compact_listing(listing_data))
     except Exception as e:
         logger.error(f"Error fetching listing {listing_id}: {str(e)}")
         # Try to return response body if available
@@ -90,8 +112,29 @@ async def mls_listing(listing_id: str, ctx: Context = None) -> str:
                 pass
         return f"Error fetching listing: {str(e)}"
 
-@mcp.prompt()
-def find_comparables(property_info: str) -> str:
+@mcp.tool()
+async def mls_listings(listing_ids: List[str], profile: Optional[ProfileName] = None, ctx: Context = None) -> str:
+    """Return the listing details for several ListingIds in a single call; use it to hydrate every comparable at once.
+
+    Each result contains the ListingId and either the listing (main features, remarks, prices, dates, agent contact) or an error.
+
+    Args:
+        listing_ids: The MLS listing IDs
+        profile: Optional named field set instead of the full listing: "summary" (status, prices, address, main features, remarks, days on market), "comparable" (comparable scoring fields), "valuation" (price history, dates, taxes, HOA), "media" (photos and virtual tours) or "agent-contact" (listing/buyer agent and office)
+    """
+    logger.debug(f"Fetching MLS listings with IDs: {listing_ids}")
+    api_key, dataset_id = get_bridge_api_credentials()
+    client = get_shared_client(api_key=api_key, dataset_id=dataset_id)
+    try:
+        listings = await client.get_listings(listing_ids, profile=profile)
+        logger.debug(f"Successfully retrieved {len(listings)} listings")
+        return to_json(compact_listing_entries(listings))
+    except Exception as e:
+        logger.error(f"Error fetching listings {listing_ids}: {str(e)}")
+        return f"Error fetching listings: {str(e)}"
+
+@mcp.prompt(name="find_comparables")
+def find_comparables_prompt(property_info: str) -> str:
     """Find comparable properties based on provided property information.
     
     Args:
@@ -189,6 +232,7 @@ async def search_listings(
         "Longitude",
         "SubdivisionName"
     ],
+    profile: Optional[ProfileName] = None,
     StreetName: str = None,
     StreetSuffix: str = None,
     StreetNumber: str = None,
@@ -228,12 +272,13 @@ async def search_listings(
         zipcode: ZIP/Postal code
         latitude: Center point latitude for geo search
         longitude: Center point longitude for geo search
-        distance_miles: Maximum distance in miles from center point
+        distance_miles: Maximum distance in miles from center point; results are limited to this exact radius, sorted nearest first and include distance_km
         mls_status: Filter by MLS status ("Active" or "Closed", defaults to "Active")
         order_by: Field to sort by (e.g., "ListPrice desc", "ListPrice asc", "BedroomsTotal desc")
-        limit: Maximum number of results to return (default: 2)
+        limit: Maximum number of results to return (default: 2); all pages up to this many records are fetched in a single call, so request as many as needed at once (max 2000)
         skip: Number of results to skip for pagination (default: 0)
         fields: Optional list of specific fields to return (defaults to main features)
+        profile: Optional named field set to return instead of fields: "summary" (status, prices, address, main features, remarks, days on market), "comparable" (comparable scoring fields), "valuation" (price history, dates, taxes, HOA), "media" (photos and virtual tours) or "agent-contact" (listing/buyer agent and office)
         StreetName: Optional Street Name
         StreetSuffix: Optional Street Suffix
         StreetNumber: Optional Street Number
@@ -252,95 +297,73 @@ async def search_listings(
         f"StreetName={StreetName}, StreetSuffix={StreetSuffix}, StreetNumber={StreetNumber}, SubdivisionName={SubdivisionName}, ParcelNumber={ParcelNumber}"
     )
     api_key, dataset_id = get_bridge_api_credentials()
-    client = BridgeAPIClient(api_key=api_key, dataset_id=dataset_id)
-    
-    # Build OData filter query
-    filters = []
-    
-    if min_price is not None:
-        filters.append(f"ListPrice ge {min_price}")
-    if max_price is not None:
-        filters.append(f"ListPrice le {max_price}")
-    if beds is not None:
-        filters.append(f"BedroomsTotal eq {beds}")
-    if beds_min is not None:
-        filters.append(f"BedroomsTotal ge {beds_min}")
-    if beds_max is not None:
-        filters.append(f"BedroomsTotal le {beds_max}")
-    if baths is not None:
-        filters.append(f"BathroomsTotalDecimal eq {baths}")
-    if baths_min is not None:
-        filters.append(f"BathroomsTotalDecimal ge {baths_min}")
-    if baths_max is not None:
-        filters.append(f"BathroomsTotalDecimal le {baths_max}")
-    if LivingArea_min is not None:
-        filters.append(f"LivingArea ge {LivingArea_min}")
-    if LivingArea_max is not None:
-        filters.append(f"LivingArea le {LivingArea_max}")
-    if LotSizeSquareFeet_min is not None:
-        filters.append(f"LotSizeSquareFeet ge {LotSizeSquareFeet_min}")
-    if LotSizeSquareFeet_max is not None:
-        filters.append(f"LotSizeSquareFeet le {LotSizeSquareFeet_max}")
-    if on_market_date_from is not None:
-        filters.append(f"OnMarketDate ge {on_market_date_from}")
-    if on_market_date_to is not None:
-        filters.append(f"OnMarketDate le {on_market_date_to}")
-    if off_market_date_from is not None:
-        filters.append(f"OffMarketDate ge {off_market_date_from}")
-    if off_market_date_to is not None:
-        filters.append(f"OffMarketDate le {off_market_date_to}")
-    if property_type is not None:
-        if property_type not in [pt.value for pt in PropertyType]:
-            raise ValueError(f'property_type must be one of: {", ".join(pt.value for pt in PropertyType)}')
-        filters.append(f"PropertyType eq '{property_type}'")
-    if city is not None:
-        filters.append(f"City eq '{city}'")
-    if zipcode is not None:
-        filters.append(f"PostalCode eq '{zipcode}'")
-    if mls_status is not None and mls_status != "Any":
-        if mls_status not in ["Active", "Closed"]:
-            raise ValueError('mls_status must be either "Active" or "Closed"')
-        filters.append(f"MlsStatus eq '{mls_status}'")
-    if YearBuilt_min is not None:
-        filters.append(f"YearBuilt ge {YearBuilt_min}")
-    if YearBuilt_max is not None:
-        filters.append(f"YearBuilt le {YearBuilt_max}")
-    if ListPrice_min is not None:
-        filters.append(f"ListPrice ge {ListPrice_min}")
-    if ListPrice_max is not None:
-        filters.append(f"ListPrice le {ListPrice_max}")
-    if StreetName is not None:
-        filters.append(f"tolower(StreetName) eq '{StreetName.lower()}'")
-    if StreetSuffix is not None:
-        filters.append(f"tolower(StreetSuffix) eq '{StreetSuffix.lower()}'")
-    if StreetNumber is not None:
-        filters.append(f"tolower(StreetNumber) eq '{StreetNumber.lower()}'")
-    if SubdivisionName is not None:
-        filters.append(f"contains(tolower(SubdivisionName), '{SubdivisionName.lower()}')")
-    if ParcelNumber is not None:
-        filters.append(f"ParcelNumber eq '{ParcelNumber}'")
-    
-    if query != "": 
-        query += " and "
-        
-    query += " and ".join(filters) if filters else " 1 eq 1"
+    client = get_shared_client(api_key=api_key, dataset_id=dataset_id)
     
+    # Build a canonical OData filter; unknown fields are rejected before any request is sent
+    await client.ensure_schema()
+    try:
+        query = build_listing_query(
+            query,
+            min_price=min_price,
+            max_price=max_price,
+            beds=beds,
+            beds_min=beds_min,
+            beds_max=beds_max,
+            baths=baths,
+            baths_min=baths_min,
+            baths_max=baths_max,
+            LivingArea_min=LivingArea_min,
+            LivingArea_max=LivingArea_max,
+            LotSizeSquareFeet_min=LotSizeSquareFeet_min,
+            LotSizeSquareFeet_max=LotSizeSquareFeet_max,
+            on_market_date_from=on_market_date_from,
+            on_market_date_to=on_market_date_to,
+            off_market_date_from=off_market_date_from,
+            off_market_date_to=off_market_date_to,
+            property_type=property_type,
+            city=city,
+            zipcode=zipcode,
+            mls_status=mls_status,
+            YearBuilt_min=YearBuilt_min,
+            YearBuilt_max=YearBuilt_max,
+            ListPrice_min=ListPrice_min,
+            ListPrice_max=ListPrice_max,
+            PhotosCount_min=PhotosCount_min,
+            PhotosCount_max=PhotosCount_max,
+            StreetName=StreetName,
+            StreetSuffix=StreetSuffix,
+            StreetNumber=StreetNumber,
+            SubdivisionName=SubdivisionName,
+            ParcelNumber=ParcelNumber
+        ).to_odata()
+    except InvalidQuery as e:
+        logger.error(f"Invalid search query: {str(e)}")
+        return f"Invalid search query: {str(e)}"
+
     logger.debug(f"Generated OData query: {query}")
     
     try:
-        results = await client.search_listings(
-            query,
-            latitude=latitude,
-            longitude=longitude,
-            distance_miles=distance_miles,
-            order_by=order_by,
-            top=limit,
-            skip=skip,
-            select_fields=fields
-        )
-        logger.debug(f"Search returned {len(results['value'])} results")
+        # Pages are fetched (and prefetched) automatically up to `limit` records; pages with
+        # Media (the "media" profile) are decoded incrementally instead of buffered whole
+        search = partial(client.search_listings_stream, skip_fields=None) if profile == "media" else client.search_listings_iter
+        results = [
+            record async for record in search(
+                query,
+                latitude=latitude,
+                longitude=longitude,
+                distance_miles=distance_miles,
+                order_by=order_by,
+                skip=skip,
+                select_fields=None if profile else fields,
+                profile=profile,
+                max_records=limit
+            )
+        ]
+        if latitude is not None and longitude is not None and distance_miles is not None:
+            results.sort(key=lambda record: record.get("distance_km", float("inf")))
+        logger.debug(f"Search returned {len(results)} results")
         logger.debug(f"Results: {results}")        
-        return json.dumps(results['value'])
+        return to_json(compact_value(compact_records(results)))
     except Exception as e:
         logger.error(f"Error searching listings: {str(e)}")
         # Try to return response body if available
@@ -351,6 +374,68 @@ async def search_listings(
                 pass
         return f"Error searching listings: {str(e)}"
 
+@mcp.tool()
+async def find_comparables(
+    latitude: float,
+    longitude: float,
+    property_type: Optional[Literal["Residential", "Condo"]] = None,
+    SubdivisionName: Optional[str] = None,
+    LivingArea: Optional[float] = None,
+    LotSizeSquareFeet: Optional[float] = None,
+    YearBuilt: Optional[int] = None,
+    BedroomsTotal: Optional[int] = None,
+    BathroomsTotalDecimal: Optional[float] = None,
+    ListingId: Optional[str] = None,
+    ParcelNumber: Optional[str] = None,
+    k: int = 6,
+    radius_miles: float = 1.0,
+    ctx: Context = None
+) -> str:
+    """
+    Find and rank the best comparables for a base property in a single call
+
+    Searches active listings and listings from the last year around the base property (widening the radius if needed),
+    scores every candidate on distance, subdivision, living area, lot size, year built, bedrooms and bathrooms,
+    and returns the top k with their score, distance_km and per-feature deltas against the base property.
+
+    Args:
+        latitude: Base property latitude
+        longitude: Base property longitude
+        property_type: Base property type ("Residential" or "Condo")
+        SubdivisionName: Base property subdivision name
+        LivingArea: Base property living area in square feet
+        LotSizeSquareFeet: Base property lot size in square feet
+        YearBuilt: Base property year built
+        BedroomsTotal: Base property bedrooms
+        BathroomsTotalDecimal: Base property bathrooms
+        ListingId: Base property listing ID, excluded from the results
+        ParcelNumber: Base property parcel number (APN), excluded from the results
+        k: Number of comparables to return (default: 6)
+        radius_miles: Initial search radius in miles (default: 1.0)
+    """
+    base = {
+        "Latitude": latitude,
+        "Longitude": longitude,
+        "PropertyType": property_type,
+        "SubdivisionName": SubdivisionName,
+        "LivingArea": LivingArea,
+        "LotSizeSquareFeet": LotSizeSquareFeet,
+        "YearBuilt": YearBuilt,
+        "BedroomsTotal": BedroomsTotal,
+        "BathroomsTotalDecimal": BathroomsTotalDecimal,
+        "ListingId": ListingId,
+        "ParcelNumber": ParcelNumber,
+    }
+    logger.debug(f"Finding comparables for: {base}")
+    api_key, dataset_id = get_bridge_api_credentials()
+    client = get_shared_client(api_key=api_key, dataset_id=dataset_id)
+    try:
+        results = await rank_comparables(client, base, k=k, radius_miles=radius_miles)
+        return to_json(results)
+    except Exception as e:
+        logger.error(f"Error finding comparables: {str(e)}")
+        return f"Error finding comparables: {str(e)}"
+
 @mcp.prompt()
 def prompt_with_parcel_id(parcel_id: str) -> str:
     """Prompt to get more information about a parcel"""
@@ -645,7 +730,7 @@ async def get_parcel_public_records(
     api_key, dataset_id = get_bridge_api_credentials()
     if not apn:
         raise ValueError("APN (Assessor's Parcel Number) is required and cannot be blank")
-    client = BridgeAPIClient(api_key=api_key, dataset_id=dataset_id)
+    client = get_shared_client(api_key=api_key, dataset_id=dataset_id)
     try:
         records = await client.get_parcel_public_records(state, apn, zip_code)
         return json.dumps(records, indent=2)
@@ -658,5 +743,24 @@ async def get_parcel_public_records(
             except Exception:
                 pass
         return f"Error fetching parcel public records: {str(e)}"
+
+
+@mcp.tool()
+async def get_parcels_public_records(parcels: List[Dict[str, str]], ctx: Context = None) -> str:
+    """
+    Return the public records of several parcels in a single call; use it to look up the base property and its comparables at once.
+
+    Args:
+        parcels: List of {"state": ..., "apn": ..., "zip_code": ...} dicts
+    Returns:
+        One entry per parcel, in input order, with either the parcel's "records" or an "error"
+    """
+    api_key, dataset_id = get_bridge_api_credentials()
+    client = get_shared_client(api_key=api_key, dataset_id=dataset_id)
+    try:
+        return json.dumps(await client.get_parcels_public_records(parcels), indent=2)
+    except Exception as e:
+        logger.error(f"Error fetching parcel public records: {str(e)}")
+        return f"Error fetching parcel public records: {str(e)}"
 if __name__ == "__main__":
     mcp.run(transport="streamable-http", host="0.0.0.0", port=int(os.environ.get("PORT",'8080')), path="/mcp")
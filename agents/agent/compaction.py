@@ -0,0 +1,143 @@
+"""Prompt compaction for the pipeline's LLM calls.
+
+`before_model_callback(stage, max_tokens)` builds an ADK before-model
+callback that compacts the request contents before they reach Gemini:
+
+- tool results (function responses) of the agent itself;
+- outputs of earlier agents, which ADK passes on as "[agent] said: ..." and
+  "[agent] `tool` tool returned result: ..." text parts, when they hold JSON
+  or a Python literal (the tool results of the MLS agent, for instance).
+
+Values are compacted with `bridge_api.compact`; when the whole request is
+over the stage budget, each large payload gets a share of the budget in
+proportion to its size. Small parts and the user's own messages are left
+alone. Savings are logged and accumulated in `state["compaction_stats"]`.
+"""
+import ast
+import json
+import logging
+import os
+import re
+from typing import Optional, Any, List, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+import google.genai.types as types
+
+from agent.agents.bridgeoutput_agent.bridge_api.compact import compact_to_budget, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "24000"))
+
+# Parts smaller than this are not worth compacting
+MIN_COMPACT_TOKENS = 200
+
+STATS_KEY = "compaction_stats"
+
+_TOOL_RESULT = re.compile(r"^(\[[^\]]+\] `[^`]+` tool returned result: )(.*)$", re.S)
+_AGENT_SAID = re.compile(r"^(\[[^\]]+\] said: )(.*)$", re.S)
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.S)
+
+
+def _parse_payload(text: str) -> Optional[Any]:
+    """JSON (optionally fenced) or Python literal held by a text part, else None"""
+    text = text.strip()
+    fenced = _JSON_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    if not text or text[0] not in "[{":
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _payloads(llm_request: LlmRequest) -> List[Tuple[int, int, Any, str]]:
+    """(content index, part index, value, text prefix) of every compactable payload; prefix is None for function responses"""
+    found = []
+    for i, content in enumerate(llm_request.contents or []):
+        for j, part in enumerate(content.parts or []):
+            if part.function_response is not None and part.function_response.response:
+                found.append((i, j, part.function_response.response, None))
+            elif part.text:
+                match = _TOOL_RESULT.match(part.text) or _AGENT_SAID.match(part.text)
+                if match is None and content.role == "user":
+                    continue
+                prefix, body = (match.group(1), match.group(2)) if match else ("", part.text)
+                value = _parse_payload(body)
+                if value is not None:
+                    found.append((i, j, value, prefix))
+    return found
+
+
+def compact_request(llm_request: LlmRequest, max_tokens: int = PROMPT_TOKEN_BUDGET) -> Tuple[int, int]:
+    """
+    Compact the payloads of a request in place
+
+    Args:
+        llm_request: Request about to be sent to the model
+        max_tokens: Token budget for all the payloads together
+    Returns:
+        Tuple of (estimated tokens before, estimated tokens after)
+    """
+    payloads = [entry for entry in _payloads(llm_request) if estimate_tokens(entry[2]) >= MIN_COMPACT_TOKENS]
+    sizes = [estimate_tokens(value) for _, _, value, _ in payloads]
+    total = sum(sizes)
+    before = after = 0
+    for (i, j, value, prefix), size in zip(payloads, sizes):
+        # Only squeeze below the first level when the request is over budget
+        budget = max(MIN_COMPACT_TOKENS, max_tokens * size // total) if total > max_tokens else None
+        compacted, stats = compact_to_budget(value, budget)
+        before += stats.tokens_before
+        after += stats.tokens_after
+        content = llm_request.contents[i]
+        part = content.parts[j]
+        if prefix is None:
+            if not isinstance(compacted, dict):
+                compacted = {"result": compacted}
+            part = types.Part(function_response=types.FunctionResponse(
+                id=part.function_response.id,
+                name=part.function_response.name,
+                response=compacted,
+            ))
+        else:
+            part = types.Part(text=prefix + json.dumps(compacted, separators=(",", ":"), ensure_ascii=False))
+        # New Content/Part objects, so the session events are never modified
+        parts = list(content.parts)
+        parts[j] = part
+        llm_request.contents[i] = types.Content(role=content.role, parts=parts)
+    return before, after
+
+
+def before_model_callback(stage: str, max_tokens: int = PROMPT_TOKEN_BUDGET):
+    """
+    Build a before-model callback that compacts the prompt of an agent
+
+    Args:
+        stage: Name the savings are reported under
+        max_tokens: Token budget for the tool results and earlier agents' outputs in the prompt
+    Returns:
+        Callback for `LlmAgent(before_model_callback=...)`
+    """
+    def callback(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        before, after = compact_request(llm_request, max_tokens)
+        if before:
+            logger.info(f"{stage}: compacted prompt payloads from ~{before} to ~{after} tokens (saved ~{before - after})")
+            stats = dict(callback_context.state.get(STATS_KEY) or {})
+            totals = stats.get(stage) or {"calls": 0, "tokens_before": 0, "tokens_after": 0, "tokens_saved": 0}
+            stats[stage] = {
+                "calls": totals["calls"] + 1,
+                "tokens_before": totals["tokens_before"] + before,
+                "tokens_after": totals["tokens_after"] + after,
+                "tokens_saved": totals["tokens_saved"] + before - after,
+            }
+            callback_context.state[STATS_KEY] = stats
+        return None
+
+    return callback
@@ -0,0 +1,114 @@
+"""Small persistent key-value cache shared by the agents.
+
+Values are JSON-serialized into a single SQLite file and expire after a TTL.
+Each user of the cache works in its own namespace, so the geocoder, the web
+search cache, etc. can share one file without key collisions.
+
+Expired entries are purged when the file is first opened by the process, and
+then by every AGENT_CACHE_PURGE_EVERY-th write of a namespace, so the file
+doesn't grow with entries nobody reads again.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional, Any, Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KV_PATH = os.environ.get(
+    "AGENT_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "agent_kvcache.sqlite3")
+)
+
+# Writes of a namespace between purges of its expired entries
+PURGE_EVERY = int(os.environ.get("AGENT_CACHE_PURGE_EVERY", "100"))
+
+_connections: Dict[str, sqlite3.Connection] = {}
+_lock = threading.Lock()
+
+
+def _connection(path: str) -> sqlite3.Connection:
+    connection = _connections.get(path)
+    if connection is None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        purged = connection.execute("DELETE FROM kv WHERE expires_at <= ?", (time.time(),)).rowcount
+        connection.commit()
+        if purged:
+            logger.debug(f"Purged {purged} expired cache entries from {path}")
+        _connections[path] = connection
+    return connection
+
+
+class KVCache:
+    """Namespaced, TTL-bound JSON store backed by SQLite"""
+
+    def __init__(self, namespace: str, ttl: float, path: Optional[str] = DEFAULT_KV_PATH):
+        """
+        Args:
+            namespace: Key prefix isolating this cache's entries
+            ttl: Default time-to-live in seconds
+            path: SQLite database file
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.path = path
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+        self._writes_since_purge = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None when missing or expired"""
+        with _lock:
+            row = _connection(self.path).execute(
+                "SELECT expires_at, value FROM kv WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+        if row is None or row[0] <= time.time():
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(row[1])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with _lock:
+            connection = _connection(self.path)
+            connection.execute(
+                "INSERT INTO kv (namespace, key, expires_at, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET expires_at = excluded.expires_at, value = excluded.value",
+                (self.namespace, key, expires_at, json.dumps(value))
+            )
+            connection.commit()
+        self.stats["stores"] += 1
+        self._writes_since_purge += 1
+        if self._writes_since_purge >= PURGE_EVERY:
+            self._writes_since_purge = 0
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        with _lock:
+            connection = _connection(self.path)
+            connection.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (self.namespace, key))
+            connection.commit()
+
+    def purge_expired(self) -> int:
+        """Drop expired entries of this namespace; returns the number removed"""
+        with _lock:
+            connection = _connection(self.path)
+            cursor = connection.execute(
+                "DELETE FROM kv WHERE namespace = ? AND expires_at <= ?",
+                (self.namespace, time.time())
+            )
+            connection.commit()
+        return cursor.rowcount
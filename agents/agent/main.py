@@ -0,0 +1,110 @@
+"""Service entry point: the ADK API server and web UI for this agent.
+
+Serves the same app as `adk api_server --with_ui`, but owns the app lifespan:
+the shared MCP servers (see mcp_pool) are spawned at start-up rather than by
+the first request, and terminated on shutdown. Artifacts (the reports) go to
+the content-addressed, compressed store of artifact_store unless
+ARTIFACT_SERVICE_URI names another ADK artifact service; with that store, the
+stored (compressed) bytes of an artifact are served as-is from
+`/artifact-content/{app}/{user}/{session}/{name}`, and unreferenced blobs
+are garbage-collected every ARTIFACT_GC_INTERVAL seconds (0 disables it).
+
+    python main.py
+"""
+import asyncio
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import uvicorn
+from fastapi import HTTPException, Request, Response
+from google.adk.cli.fast_api import get_fast_api_app
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# ADK serves every sub-directory of AGENTS_DIR as an app; this package is the "agent" app
+AGENTS_DIR = os.path.dirname(PACKAGE_DIR)
+sys.path.insert(0, AGENTS_DIR)
+
+from agent import artifact_store, mcp_pool
+
+PORT = int(os.environ.get("PORT", "8080"))
+SERVE_WEB_INTERFACE = os.environ.get("SERVE_WEB_INTERFACE", "true").lower() == "true"
+TRACE_TO_CLOUD = os.environ.get("TRACE_TO_CLOUD", "false").lower() == "true"
+SESSION_SERVICE_URI = os.environ.get("SESSION_SERVICE_URI")
+ARTIFACT_SERVICE_URI = os.environ.get("ARTIFACT_SERVICE_URI", f"{artifact_store.SERVICE_SCHEME}://")
+ARTIFACT_GC_INTERVAL = int(os.environ.get("ARTIFACT_GC_INTERVAL", "21600"))
+
+logger = logging.getLogger(__name__)
+
+artifact_store.register_service_scheme()
+# The instance the app uses: create_artifact_service returns one service per URI
+artifact_service = (
+    artifact_store.create_artifact_service(ARTIFACT_SERVICE_URI)
+    if ARTIFACT_SERVICE_URI.startswith(f"{artifact_store.SERVICE_SCHEME}://")
+    else None
+)
+
+
+async def collect_artifact_garbage(interval: int) -> None:
+    """Delete unreferenced artifact blobs every `interval` seconds"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(artifact_service.collect_garbage)
+        except Exception as e:
+            logger.warning(f"Artifact garbage collection failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Importing the agents registers their MCP toolsets in the pool
+    import agent.agent  # noqa: F401
+    gc_task = None
+    if artifact_service is not None and ARTIFACT_GC_INTERVAL > 0:
+        gc_task = asyncio.create_task(collect_artifact_garbage(ARTIFACT_GC_INTERVAL))
+    try:
+        async with mcp_pool.lifespan(app):
+            yield
+    finally:
+        if gc_task is not None:
+            gc_task.cancel()
+
+app = get_fast_api_app(
+    agents_dir=AGENTS_DIR,
+    session_service_uri=SESSION_SERVICE_URI,
+    artifact_service_uri=ARTIFACT_SERVICE_URI,
+    web=SERVE_WEB_INTERFACE,
+    trace_to_cloud=TRACE_TO_CLOUD,
+    lifespan=lifespan,
+)
+
+
+if artifact_service is not None:
+    @app.get("/artifact-content/{app_name}/{user_id}/{session_id}/{artifact_name:path}")
+    async def artifact_content(
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        artifact_name: str,
+        request: Request,
+        version: Optional[int] = None,
+    ) -> Response:
+        """An artifact's bytes, compressed as stored when the client accepts the encoding"""
+        opened = await artifact_service.open_artifact(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=session_id,
+            filename=artifact_name,
+            version=version,
+            accept_encoding=request.headers.get("accept-encoding", ""),
+        )
+        if opened is None:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        body, headers = opened
+        return Response(content=body, headers=headers)
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=PORT)
@@ -0,0 +1,156 @@
+"""Shared, long-lived MCP stdio servers.
+
+Every agent that needs the Google Maps tools gets the same `MCPToolset`
+from this pool, so a single server process is spawned per service rather
+than one per agent (and per session). The pool prefers the globally
+installed server binary (see requirements.sh) over `npx -y`, which would
+resolve the npm package on every spawn.
+
+`start()` pre-spawns every registered server and then health-checks them
+periodically; a server that stops answering `tools/list` is closed and is
+re-spawned on the next check or tool call. `close()` terminates them.
+
+The service entry point (main.py) runs both through `lifespan`, so the
+servers are up before the first request and are not orphaned on shutdown.
+Under `adk web` / `adk api_server`, which don't expose the app lifespan,
+the root agent's `before_agent_callback` starts the pool on the first run.
+"""
+import asyncio
+import logging
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List
+
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = float(os.environ.get("MCP_POOL_HEALTH_CHECK_INTERVAL", "60"))
+HEALTH_CHECK_TIMEOUT = float(os.environ.get("MCP_POOL_HEALTH_CHECK_TIMEOUT", "15"))
+
+GOOGLE_MAPS = "google-maps"
+GOOGLE_MAPS_PACKAGE = "@modelcontextprotocol/server-google-maps"
+GOOGLE_MAPS_BINARY = "mcp-server-google-maps"
+
+
+def stdio_params(binary: str, package: str, env: Optional[Dict[str, str]] = None) -> StdioServerParameters:
+    """Run the globally installed `binary` when available, else fall back to `npx -y package`"""
+    path = shutil.which(binary)
+    if path:
+        return StdioServerParameters(command=path, args=[], env=env)
+    logger.warning(f"{binary} is not installed globally; falling back to npx (slower start-up)")
+    return StdioServerParameters(command="npx", args=["-y", package], env=env)
+
+
+class MCPToolsetPool:
+    """Registry of shared MCP toolsets with warm-up and health checks"""
+
+    def __init__(self, health_check_interval: float = HEALTH_CHECK_INTERVAL, health_check_timeout: float = HEALTH_CHECK_TIMEOUT):
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self._toolsets: Dict[str, MCPToolset] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self.stats = {"restarts": 0, "failed_checks": 0}
+
+    def register(self, name: str, connection_params: StdioServerParameters, tool_filter: Optional[List[str]] = None) -> MCPToolset:
+        """Return the shared toolset for `name`, creating it on first registration"""
+        toolset = self._toolsets.get(name)
+        if toolset is None:
+            toolset = self._toolsets[name] = MCPToolset(connection_params=connection_params, tool_filter=tool_filter)
+        return toolset
+
+    def get(self, name: str) -> MCPToolset:
+        return self._toolsets[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._toolsets
+
+    async def check(self, name: str) -> bool:
+        """List the server's tools (spawning it if needed); close it for a restart if that fails"""
+        toolset = self._toolsets[name]
+        try:
+            await asyncio.wait_for(toolset.get_tools(), timeout=self.health_check_timeout)
+            return True
+        except Exception as e:
+            self.stats["failed_checks"] += 1
+            logger.warning(f"MCP server {name} failed its health check: {e}; restarting")
+            try:
+                await toolset.close()
+            except Exception as close_error:
+                logger.debug(f"Error closing MCP server {name}: {close_error}")
+            self.stats["restarts"] += 1
+            return False
+
+    async def warm_up(self) -> Dict[str, bool]:
+        """Spawn every registered server concurrently"""
+        names = list(self._toolsets)
+        results = await asyncio.gather(*(self.check(name) for name in names))
+        return dict(zip(names, results))
+
+    async def start(self) -> None:
+        """Pre-spawn the servers and start the periodic health checks; safe to call repeatedly"""
+        if self._health_task is not None and not self._health_task.done():
+            return
+        started = await self.warm_up()
+        logger.info(f"MCP pool started: {started}")
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await self.warm_up()
+
+    async def close(self) -> None:
+        """Stop the health checks and terminate every server"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for toolset in self._toolsets.values():
+            await toolset.close()
+
+
+pool = MCPToolsetPool()
+
+
+def google_maps_toolset(api_key: Optional[str] = None) -> MCPToolset:
+    """
+    The shared Google Maps MCP toolset
+
+    Args:
+        api_key: Google Maps API key (defaults to GOOGLE_MAPS_API_KEY); only the first registration spawns the server
+    Returns:
+        The MCPToolset every agent should list in its tools
+    """
+    if GOOGLE_MAPS in pool:
+        return pool.get(GOOGLE_MAPS)
+    return pool.register(
+        GOOGLE_MAPS,
+        stdio_params(
+            GOOGLE_MAPS_BINARY,
+            GOOGLE_MAPS_PACKAGE,
+            # The Maps MCP server reads its key from the environment
+            env={"GOOGLE_MAPS_API_KEY": api_key or os.environ.get("GOOGLE_MAPS_API_KEY", "")},
+        ),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app=None):
+    """Start the pool with an app and close it on shutdown; for FastAPI / FastMCP `lifespan=`"""
+    await pool.start()
+    try:
+        yield
+    finally:
+        await pool.close()
+
+
+async def before_agent_callback(callback_context) -> None:
+    """
+    Pre-spawn the pool at the start of the first run, when it wasn't started with the service
+
+    Attached to the root agent, so the Maps server is up before the first
+    tool call even under the ADK CLI; a no-op once `lifespan` started the pool.
+    """
+    await pool.start()
+    return None
@@ -0,0 +1,184 @@
+"""Reference-based session state for large agent outputs.
+
+ADK copies session state into every later event, so a long `website_data` or
+`comparables` output makes every subsequent event and prompt bigger. The
+callbacks built by `offloading` move state values above
+STATE_OFFLOAD_THRESHOLD bytes into an artifact store and keep only a
+small handle in state:
+
+    {"$ref": "state-website_data-<sha256 prefix>.txt", "store": "artifact",
+     "version": 0, "sha256": "...", "size": 18234, "summary": "First sentences ..."}
+
+The payload goes to the Runner's ArtifactService when one is configured
+(main.py serves the app with `artifact_store`), else to local
+content-addressed files (STATE_STORE_PATH). Identical payloads share one
+file. `load_state_value` is the tool downstream agents use to load
+the full value when the summary is not enough.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+from typing import Optional, Any, Dict, Callable, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools.tool_context import ToolContext
+import google.genai.types as types
+
+from agent.agents.bridgeoutput_agent.bridge_api.compact import extract_sentences
+
+logger = logging.getLogger(__name__)
+
+STATE_OFFLOAD_THRESHOLD = int(os.environ.get("STATE_OFFLOAD_THRESHOLD", "2000"))
+STATE_STORE_PATH = os.environ.get(
+    "STATE_STORE_PATH",
+    os.path.join(tempfile.gettempdir(), "agent_state_store")
+)
+SUMMARY_CHARS = 300
+
+REF_KEY = "$ref"
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and REF_KEY in value
+
+
+def _serialize(value: Any) -> Tuple[bytes, str]:
+    """(bytes, mime type) of a state value"""
+    if isinstance(value, str):
+        return value.encode("utf-8"), "text/plain"
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), "application/json"
+
+
+def _deserialize(data: bytes, mime_type: str) -> Any:
+    text = data.decode("utf-8")
+    return json.loads(text) if mime_type == "application/json" else text
+
+
+def _summary(value: Any) -> str:
+    if isinstance(value, str):
+        return extract_sentences(value, SUMMARY_CHARS)
+    if isinstance(value, list):
+        return f"List of {len(value)} items"
+    if isinstance(value, dict):
+        return f"Object with keys: {', '.join(list(value)[:20])}"
+    return str(value)[:SUMMARY_CHARS]
+
+
+def _local_path(sha256: str) -> str:
+    return os.path.join(STATE_STORE_PATH, sha256[:2], sha256)
+
+
+def _write_local(sha256: str, data: bytes) -> None:
+    path = _local_path(sha256)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so a concurrent reader never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+async def store_value(callback_context: CallbackContext, key: str, value: Any) -> Dict[str, Any]:
+    """
+    Store a state value out of band and return its handle
+
+    Args:
+        callback_context: Context of the agent producing the value
+        key: State key, used in the artifact name
+        value: String or JSON-serializable value
+    Returns:
+        Handle to keep in state instead of the value
+    """
+    data, mime_type = _serialize(value)
+    sha256 = hashlib.sha256(data).hexdigest()
+    extension = "txt" if mime_type == "text/plain" else "json"
+    handle = {
+        REF_KEY: f"state-{key}-{sha256[:16]}.{extension}",
+        "mime_type": mime_type,
+        "sha256": sha256,
+        "size": len(data),
+        "summary": _summary(value),
+    }
+    try:
+        handle["version"] = await callback_context.save_artifact(
+            filename=handle[REF_KEY],
+            artifact=types.Part.from_bytes(data=data, mime_type=mime_type),
+        )
+        handle["store"] = "artifact"
+    except ValueError:
+        # No ArtifactService configured in the Runner
+        _write_local(sha256, data)
+        handle["store"] = "local"
+    logger.debug(f"Offloaded state[{key}] ({len(data)} bytes) to {handle['store']} {handle[REF_KEY]}")
+    return handle
+
+
+async def load_value(context: CallbackContext, handle: Dict[str, Any]) -> Any:
+    """Load the full value behind a handle"""
+    if handle.get("store") == "artifact":
+        part = await context.load_artifact(filename=handle[REF_KEY], version=handle.get("version"))
+        if part is None or part.inline_data is None:
+            raise ValueError(f"Artifact {handle[REF_KEY]} not found")
+        data = part.inline_data.data
+    else:
+        with open(_local_path(handle["sha256"]), "rb") as f:
+            data = f.read()
+    return _deserialize(data, handle.get("mime_type", "text/plain"))
+
+
+async def offload_state(callback_context: CallbackContext, *keys: str) -> None:
+    """Replace the large values of `keys` in state with handles"""
+    for key in keys:
+        value = callback_context.state.get(key)
+        if value is None or is_ref(value):
+            continue
+        if len(_serialize(value)[0]) <= STATE_OFFLOAD_THRESHOLD:
+            continue
+        callback_context.state[key] = await store_value(callback_context, key, value)
+
+
+def offloading(callback: Optional[Callable], *keys: str) -> Callable:
+    """
+    Wrap an agent callback so the given state keys are offloaded after it runs
+
+    Args:
+        callback: Existing before/after agent callback, or None
+        keys: State keys to offload
+    Returns:
+        Callback for `before_agent_callback` / `after_agent_callback`
+    """
+    async def wrapper(callback_context: CallbackContext) -> Optional[types.Content]:
+        result = callback(callback_context) if callback is not None else None
+        if inspect.isawaitable(result):
+            result = await result
+        await offload_state(callback_context, *keys)
+        return result
+
+    return wrapper
+
+
+async def load_state_value(key: str, tool_context: ToolContext) -> Any:
+    """
+    Load the full value of a session state entry, such as 'website_data' or 'comparables'.
+    Large values are kept out of the conversation and state only holds their summary; call this when you need the details.
+
+    Args:
+        key: State key to load
+    Returns:
+        The full value, or an error message
+    """
+    value = tool_context.state.get(key)
+    if value is None:
+        return f"Error loading state value: no '{key}' in state"
+    if not is_ref(value):
+        return value
+    try:
+        return await load_value(tool_context, value)
+    except Exception as e:
+        logger.error(f"Error loading state value {key}: {str(e)}")
+        return f"Error loading state value: {str(e)}"
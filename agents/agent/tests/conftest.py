@@ -0,0 +1,7 @@
+"""Test setup: the package imports itself as `agent`, so its parent directory goes on sys.path"""
+import os
+import sys
+
+AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AGENTS_DIR)
@@ -0,0 +1,77 @@
+import asyncio
+import gzip
+
+import google.genai.types as types
+import pytest
+
+from agent.artifact_store import ContentAddressedArtifactService, LocalBlobStore
+
+REPORT = b"<html>" + b"<p>Comparable property</p>" * 200 + b"</html>"
+
+
+@pytest.fixture
+def service(tmp_path):
+    return ContentAddressedArtifactService(LocalBlobStore(str(tmp_path)))
+
+
+def _save(service, filename, data, session_id="s1"):
+    return asyncio.run(service.save_artifact(
+        app_name="agent",
+        user_id="u1",
+        session_id=session_id,
+        filename=filename,
+        artifact=types.Part.from_bytes(data=data, mime_type="text/html"),
+    ))
+
+
+def _blobs(service):
+    return service.store.list("blobs/")
+
+
+def test_round_trip_stores_one_compressed_blob(service):
+    assert _save(service, "report.html", REPORT) == 0
+    loaded = asyncio.run(service.load_artifact(app_name="agent", user_id="u1", session_id="s1", filename="report.html"))
+    assert loaded.inline_data.data == REPORT
+    assert loaded.inline_data.mime_type == "text/html"
+    (blob,) = _blobs(service)
+    assert blob.endswith(".gz")
+    assert gzip.decompress(service.store.read(blob)) == REPORT
+
+
+def test_identical_payloads_share_blobs_and_versions(service):
+    assert _save(service, "report.html", REPORT) == 0
+    assert _save(service, "report.html", REPORT) == 0
+    assert _save(service, "copy.html", REPORT, session_id="s2") == 0
+    assert _save(service, "report.html", REPORT + b"<!-- v2 -->") == 1
+    assert len(_blobs(service)) == 2
+    assert service.stats["deduplicated_versions"] == 1
+    assert service.stats["shared_blobs"] == 1
+
+
+def test_open_artifact_serves_the_stored_encoding(service):
+    _save(service, "report.html", REPORT)
+    body, headers = asyncio.run(service.open_artifact(
+        app_name="agent", user_id="u1", session_id="s1", filename="report.html", accept_encoding="gzip, br"
+    ))
+    assert headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == REPORT
+    body, headers = asyncio.run(service.open_artifact(
+        app_name="agent", user_id="u1", session_id="s1", filename="report.html", accept_encoding="identity"
+    ))
+    assert "Content-Encoding" not in headers
+    assert body == REPORT
+
+
+def test_garbage_collection_keeps_referenced_and_recent_blobs(service):
+    _save(service, "report.html", REPORT)
+    _save(service, "copy.html", REPORT)
+    _save(service, "other.html", REPORT + b"<!-- other -->")
+    asyncio.run(service.delete_artifact(app_name="agent", user_id="u1", session_id="s1", filename="report.html"))
+    asyncio.run(service.delete_artifact(app_name="agent", user_id="u1", session_id="s1", filename="other.html"))
+
+    # The unreferenced blob was just written: another process may still be saving its manifest
+    assert service.collect_garbage() == 0
+    assert service.collect_garbage(min_age=0) == 1
+    (blob,) = _blobs(service)
+    loaded = asyncio.run(service.load_artifact(app_name="agent", user_id="u1", session_id="s1", filename="copy.html"))
+    assert loaded.inline_data.data == REPORT
@@ -0,0 +1,54 @@
+from agent.agents.bridgeoutput_agent.bridge_api.compact import LEVELS, compact_value, compact_to_budget
+
+LISTING = {
+    "ListPrice": 452300.75,
+    "ClosePrice": 449999.5,
+    "LivingArea": 1523.6,
+    "LotSizeSquareFeet": 7405.2,
+    "BathroomsTotalDecimal": 2.5,
+    "distance_km": 1.26,
+    "score": 0.8734,
+    "Latitude": 25.7616798,
+    "Longitude": -80.1917902,
+    "BedroomsTotal": 3,
+    "PublicRemarks": "Renovated kitchen. New roof in 2021. Walk to the park.",
+    "Media": [],
+    "SubdivisionName": None,
+}
+
+
+def test_last_level_rounds_only_prices_and_areas():
+    compacted = compact_value(LISTING, LEVELS[3])
+    assert compacted["ListPrice"] == 452301
+    assert compacted["ClosePrice"] == 450000
+    assert compacted["LivingArea"] == 1524
+    assert compacted["LotSizeSquareFeet"] == 7405
+    assert compacted["BathroomsTotalDecimal"] == 2.5
+    assert compacted["distance_km"] == 1.3
+    assert compacted["score"] == 0.9
+    assert compacted["Latitude"] == 25.76168
+    assert compacted["Longitude"] == -80.19179
+    assert compacted["BedroomsTotal"] == 3
+
+
+def test_last_level_drops_remarks_and_empty_members():
+    compacted = compact_value(LISTING, LEVELS[3])
+    assert "PublicRemarks" not in compacted
+    assert "Media" not in compacted
+    assert "SubdivisionName" not in compacted
+
+
+def test_first_level_keeps_two_decimals_and_whole_remarks():
+    compacted = compact_value(LISTING, LEVELS[0])
+    assert compacted["ListPrice"] == 452300.75
+    assert compacted["distance_km"] == 1.26
+    assert compacted["PublicRemarks"] == LISTING["PublicRemarks"]
+
+
+def test_budget_drops_trailing_items_after_the_last_level():
+    listings = [dict(LISTING, ListingKey=str(i)) for i in range(20)]
+    compacted, stats = compact_to_budget(listings, max_tokens=200)
+    assert stats.tokens_after <= 200
+    assert stats.dropped_items == 20 - len(compacted)
+    assert [listing["ListingKey"] for listing in compacted] == [str(i) for i in range(len(compacted))]
+    assert compacted[0]["BathroomsTotalDecimal"] == 2.5
@@ -0,0 +1,53 @@
+import pytest
+
+from agent.agents.bridgeoutput_agent.bridge_api import schema
+from agent.agents.bridgeoutput_agent.bridge_api.query import ListingQuery, InvalidQuery, build_listing_query
+
+
+@pytest.fixture(autouse=True)
+def bundled_schema(monkeypatch):
+    # Validate against the bundled field lists, not a snapshot left by another run
+    monkeypatch.setattr(schema, "_default_schema", schema.SchemaRegistry(path=None))
+
+
+def test_duplicate_parameters_render_once():
+    query = build_listing_query(min_price=300000, ListPrice_min=300000)
+    assert query.to_odata() == "ListPrice ge 300000"
+
+
+def test_only_the_tightest_bound_per_field_is_kept():
+    query = build_listing_query(min_price=200000, ListPrice_min=250000, max_price=500000, ListPrice_max=450000)
+    assert query.to_odata() == "ListPrice ge 250000 and ListPrice le 450000"
+
+
+def test_equivalent_searches_render_the_same_filter():
+    first = build_listing_query(city="Miami", beds_min=3, max_price=500000)
+    second = build_listing_query(max_price=500000, city="Miami", beds_min=3)
+    assert first.to_odata() == second.to_odata()
+    assert first.to_odata() == "BedroomsTotal ge 3 and City eq 'Miami' and ListPrice le 500000"
+
+
+def test_raw_expressions_are_normalized_and_deduplicated():
+    query = build_listing_query("MlsStatus  eq 'Active'", min_price=1).raw("MlsStatus eq 'Active'")
+    assert query.to_odata() == "ListPrice ge 1 and (MlsStatus eq 'Active')"
+
+
+def test_case_insensitive_parameters_and_quoting():
+    query = build_listing_query(StreetName="Main", city="O'Brien")
+    assert query.to_odata() == "City eq 'O''Brien' and tolower(StreetName) eq 'main'"
+
+
+def test_none_values_are_ignored():
+    assert build_listing_query(min_price=None, city=None).to_odata() == ""
+
+
+@pytest.mark.parametrize("build", [
+    lambda: ListingQuery().where("ListPrise", "ge", 1),
+    lambda: ListingQuery().raw("Bogus eq 1"),
+    lambda: build_listing_query(price_min=1),
+    lambda: build_listing_query(mls_status="Pending"),
+    lambda: ListingQuery().where("ListPrice", "between", 1),
+])
+def test_invalid_queries_are_rejected(build):
+    with pytest.raises(InvalidQuery):
+        build()
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from agent.agents.bridgeoutput_agent.bridge_api.stream import RecordStream
+
+RECORDS = [
+    {"ListingKey": "a1", "ListPrice": 450000, "PublicRemarks": "Quote \" and brace } inside", "Media": [{"MediaURL": "x"}]},
+    {"ListingKey": "b2", "City": "Miami", "Media": [], "Rooms": [{"Name": "[Den]"}], "Latitude": 25.7617},
+    {"ListingKey": "c3", "UnparsedAddress": "12 Ñandú St \\ Unit 4", "PoolYN": True, "LotSizeSquareFeet": None},
+]
+BODY = json.dumps({"@odata.context": "ctx", "value": RECORDS, "@odata.nextLink": "https://next"})
+
+
+def _without_media(records):
+    return [{key: value for key, value in record.items() if key != "Media"} for record in records]
+
+
+def _decode(chunks, **options):
+    stream = RecordStream(**options)
+    records = []
+    for chunk in chunks:
+        records.extend(stream.feed(chunk))
+    stream.close()
+    return records, stream
+
+
+@pytest.mark.parametrize("split", range(1, len(BODY)))
+def test_records_survive_every_chunk_boundary(split):
+    records, stream = _decode([BODY[:split], BODY[split:]], skip_fields=["Media"])
+    assert records == _without_media(RECORDS)
+    assert stream.metadata == {"@odata.context": "ctx", "@odata.nextLink": "https://next"}
+    assert stream.records_parsed == len(RECORDS)
+
+
+def test_one_character_chunks():
+    records, _ = _decode(BODY, skip_fields=["Media"])
+    assert records == _without_media(RECORDS)
+
+
+def test_fields_are_kept_unless_skipped():
+    records, _ = _decode([BODY])
+    assert records == RECORDS
+
+
+def test_single_record_body():
+    records, _ = _decode([json.dumps(RECORDS[0])[:10], json.dumps(RECORDS[0])[10:]], array_key=None, skip_fields=["Media"])
+    assert records == _without_media(RECORDS[:1])
+
+
+def test_truncated_body_raises_on_close():
+    stream = RecordStream()
+    stream.feed(BODY[:len(BODY) // 2])
+    with pytest.raises(ValueError):
+        stream.close()
+
+
+def test_reset_decodes_a_new_body_from_its_start():
+    stream = RecordStream(skip_fields=["Media"])
+    stream.feed(BODY[:len(BODY) // 2])
+    stream.reset()
+    records = stream.feed(BODY)
+    stream.close()
+    assert records == _without_media(RECORDS)
+    assert stream.records_parsed == len(RECORDS)
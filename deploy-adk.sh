@@ -1,9 +1,21 @@
 source .env
-uv run adk deploy cloud_run \
+# Builds $AGENT_PATH/Dockerfile, whose entry point (main.py) serves the ADK API
+# server and the web UI (SERVE_WEB_INTERFACE=true, as `adk deploy --with_ui`
+# did) and starts the shared MCP servers with the service. The ADK app is
+# named after the package directory, "agent" (see the Dockerfile), so
+# APP_NAME no longer applies.
+#
+# The Bridge and Maps API keys come from Secret Manager. Create the secrets
+# once, e.g.:
+#   printf %s "$BRIDGE_OUTPUT_DATA_API_KEY" | gcloud secrets create bridge-output-data-api-key --data-file=-
+#   printf %s "$GOOGLE_MAPS_API_KEY" | gcloud secrets create google-maps-api-key --data-file=-
+# and grant the service account roles/secretmanager.secretAccessor on them.
+BRIDGE_API_KEY_SECRET=${BRIDGE_API_KEY_SECRET:-bridge-output-data-api-key}
+MAPS_API_KEY_SECRET=${MAPS_API_KEY_SECRET:-google-maps-api-key}
+
+gcloud run deploy $SERVICE_NAME \
+--source=$AGENT_PATH \
 --project=$GOOGLE_CLOUD_PROJECT \
 --region=$GOOGLE_CLOUD_LOCATION \
---service_name=$SERVICE_NAME \
---app_name=$APP_NAME \
---with_ui \
---trace_to_cloud \
-$AGENT_PATH
+--set-env-vars=GOOGLE_GENAI_USE_VERTEXAI=${GOOGLE_GENAI_USE_VERTEXAI:-TRUE},GOOGLE_CLOUD_PROJECT=$GOOGLE_CLOUD_PROJECT,GOOGLE_CLOUD_LOCATION=$GOOGLE_CLOUD_LOCATION,BRIDGE_DATASET_ID=$BRIDGE_DATASET_ID,SERVE_WEB_INTERFACE=true,TRACE_TO_CLOUD=true \
+--set-secrets=BRIDGE_OUTPUT_DATA_API_KEY=$BRIDGE_API_KEY_SECRET:latest,GOOGLE_MAPS_API_KEY=$MAPS_API_KEY_SECRET:latest